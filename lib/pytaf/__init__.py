@@ -1,3 +1,16 @@
 import re
 from .taf import TAF, MalformedTAF
 from .tafdecoder import Decoder, DecodeError
+from .bulk import parse_many, decode_many, RecordError
+from .parallel import decode_parallel, DecodedTaf
+from .cache import TafCache
+from .features import FeatureSchema, feature_matrix, sparse_features
+from .timeline import StationTimeline, TimelineIndex
+from .runways import RunwayTable, runway_winds
+from .categories import CategoryTable, worst_over_window
+from .archive import Archive, ArchiveWriter, ArchiveError, write_archive
+from .index import TafIndex, IndexEntry
+from .query import Query, QueryResult
+from .aio import TafStream
+from .splitter import ReportFile, iter_reports, scan_reports
+from .compact import CompactGroup, compact_groups
@@ -0,0 +1,190 @@
+""" asyncio pipeline decoding TAF bulletins from a stream
+
+Bulletins are framed with SOH (0x01) and ETX (0x03) as on WMO/NOAA
+feeds. Reports are parsed and decoded in an executor, so the event loop is
+never blocked by parsing, and at most max_pending reports are in flight:
+when results are not consumed, reading from the stream stops.
+
+    async def consume(reader):
+        stream = TafStream(max_pending=128)
+        async for result in stream.decode(reader):
+            if result:
+                ...
+        print(stream.stats)
+"""
+
+import asyncio
+
+from .bulk import RecordError, _decode_record
+from .splitter import iter_reports
+
+SOH = b'\x01'
+ETX = b'\x03'
+
+# Bytes dropped at once when a read over the reader's limit does not say
+# how far it got
+_DROP_SIZE = 65536
+
+
+async def read_bulletins(reader):
+    """ Yields the bulletins of a stream, without the SOH and ETX framing
+
+    Data outside of the framing is skipped, as is a last bulletin cut off
+    by the end of the stream. A bulletin longer than the reader's limit is
+    skipped too, and reported with a RecordError.
+
+    Args:
+        reader: asyncio.StreamReader
+
+    Yields:
+        bytes of every bulletin, or RecordError with the start of the
+        bulletin as raw if it was too long to read
+    """
+    index = 0
+    while True:
+        try:
+            await _skip_until(reader, SOH)
+            try:
+                bulletin = (await reader.readuntil(ETX))[:-1]
+            except (asyncio.LimitOverrunError, ValueError) as e:
+                bulletin = RecordError(index, await _drop(reader, e), e)
+                await _skip_until(reader, ETX)
+        except asyncio.IncompleteReadError:
+            return
+        index += 1
+        yield bulletin
+
+
+async def _skip_until(reader, separator):
+    """ Reads past the next separator, however far it is """
+    while True:
+        try:
+            await reader.readuntil(separator)
+            return
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            await _drop(reader, e)
+
+
+async def _drop(reader, error):
+    """ Reads and returns the data a read over the reader's limit left
+    in its buffer, without the separator it was looking for """
+    return await reader.read(getattr(error, 'consumed', 0) or _DROP_SIZE)
+
+
+class PipelineStats(object):
+    """ Counters of a TafStream
+
+    Attributes:
+        bulletins: bulletins read
+        reports: reports split from them and submitted for decoding, and
+            bulletins too long to read
+        decoded: reports decoded
+        failed: reports that could not be parsed or decoded
+        queue_depth: reports submitted but not yet consumed
+        max_queue_depth: highest queue_depth seen
+        latency_total, latency_max: seconds from submitting a report to
+            its result being consumed
+    """
+
+    __slots__ = ('bulletins', 'reports', 'decoded', 'failed', 'queue_depth', 'max_queue_depth',
+                 'latency_total', 'latency_max')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    @property
+    def latency_mean(self):
+        done = self.decoded + self.failed
+        return self.latency_total / done if done else 0.0
+
+    def __repr__(self):
+        return ('<PipelineStats bulletins=%d reports=%d decoded=%d failed=%d queue_depth=%d/%d '
+                'latency=%.3fs/%.3fs>' % (self.bulletins, self.reports, self.decoded, self.failed,
+                                          self.queue_depth, self.max_queue_depth, self.latency_mean,
+                                          self.latency_max))
+
+
+class TafStream(object):
+    """ Decodes the reports of bulletins read from a stream """
+
+    def __init__(self, timestamp=None, executor=None, max_pending=64):
+        """
+        Args:
+            timestamp: passed to Decoder, the current time if None
+            executor: concurrent.futures executor to decode in, the loop's
+                default executor if None
+            max_pending: maximum number of reports submitted but not consumed
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+        self.timestamp = timestamp
+        self.executor = executor
+        self.max_pending = max_pending
+        self.stats = PipelineStats()
+
+    async def decode(self, reader):
+        """ Decodes the reports of the bulletins of a stream
+
+        Args:
+            reader: asyncio.StreamReader of SOH/ETX framed bulletins
+
+        Yields:
+            Decoder for every report in the order read, or RecordError if it
+            could not be parsed or decoded, or in place of the reports of a
+            bulletin too long to read
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_pending)
+        producer = loop.create_task(self._produce(reader, queue, slots, loop))
+        # Unbounded queue, so that the end marker always fits
+        producer.add_done_callback(lambda _: queue.put_nowait(None))
+
+        stats = self.stats
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                submitted, future = item
+                result = await future
+
+                latency = loop.time() - submitted
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+                if result:
+                    stats.decoded += 1
+                else:
+                    stats.failed += 1
+                stats.queue_depth -= 1
+                slots.release()
+                yield result
+            # Raises what the producer failed with, if anything
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+
+    async def _produce(self, reader, queue, slots, loop):
+        stats = self.stats
+        async for bulletin in read_bulletins(reader):
+            stats.bulletins += 1
+            # A bulletin too long to read stands for one failed report
+            records = [bulletin] if isinstance(bulletin, RecordError) else iter_reports(bulletin)
+            for record in records:
+                await slots.acquire()
+                if isinstance(record, RecordError):
+                    future = loop.create_future()
+                    future.set_result(RecordError(stats.reports, record.raw, record.error))
+                else:
+                    future = loop.run_in_executor(self.executor, _decode_record, stats.reports, record,
+                                                  self.timestamp)
+                stats.reports += 1
+                stats.queue_depth += 1
+                stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+                queue.put_nowait((loop.time(), future))
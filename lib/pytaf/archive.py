@@ -0,0 +1,353 @@
+""" Binary archive of decoded TAF reports with memory-mapped reading
+
+Requires numpy, which is an optional dependency of pytaf.
+
+File layout, little-endian, every table starting at a multiple of 8 bytes:
+
+    header          struct HEADER_FORMAT
+    feature names   UTF-8, every name followed by a NUL byte
+    group types     UTF-8, every type followed by a NUL byte
+    fill values     FILL_DTYPE per feature, its value when absent
+    report table    REPORT_FIELDS record per report
+    group table     GROUP_FIELDS record per group, groups of a report
+                    are consecutive and in report order
+    feature block   FEATURE_DTYPE matrix, one column per feature: all
+                    values of the first feature, then the second...
+
+Times are minutes since the epoch (see timeutil), MISSING_MINUTES if not known.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+from .features import FEATURES, NAN, DEFAULT_SCHEMA, FeatureSchema
+from .parallel import DecodedTaf
+from .timeutil import np, _require_numpy, to_epoch_minutes, from_epoch_minutes
+
+MAGIC = b'PYTAFARC'
+FORMAT_VERSION = 2
+
+# magic, format version, schema version, report count, group count,
+# feature count, feature names length, group types length, and the
+# report table, group table and feature block offsets
+HEADER_FORMAT = '<8sIIQQIIIQQQ'
+
+REPORT_FIELDS = [
+    ('issued', '<i8'), ('valid_from', '<i8'), ('valid_till', '<i8'),
+    ('first_group', '<i8'), ('group_count', '<i4'),
+    ('icao', 'S4'), ('modifier', 'S4'),
+]
+
+# type is an index into the group types, prob is 0 if not given
+GROUP_FIELDS = [
+    ('start', '<i8'), ('end', '<i8'), ('report', '<i4'), ('type', 'u1'), ('prob', 'u1'),
+]
+
+FEATURE_DTYPE = '<f4'
+
+FILL_DTYPE = '<f8'
+
+# Rows transposed into the feature block at once when writing
+_CHUNK_ROWS = 65536
+
+
+class ArchiveError(Exception):
+    def __init__(self, msg):
+        self.strerror = msg
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _join_strings(strings):
+    # Group types are taken from the report text and may hold any whitespace
+    return b''.join(string.encode('utf-8') + b'\0' for string in strings)
+
+
+def _split_strings(data):
+    return data.decode('utf-8').split('\0')[:-1]
+
+
+def _report_dtype():
+    return np.dtype(REPORT_FIELDS, align=True)
+
+
+def _group_dtype():
+    return np.dtype(GROUP_FIELDS, align=True)
+
+
+class ArchiveWriter(object):
+    """ Writes decoded TAF reports to an archive file
+
+    Reports are added one at a time, feature rows are spooled to a
+    temporary file next to the archive, so memory use only grows with the
+    report and group tables. The archive is written when the writer is
+    closed, under a temporary name that replaces path once complete.
+
+        with ArchiveWriter("tafs.arc") as writer:
+            for decoder in decoders:
+                writer.add(decoder)
+    """
+
+    def __init__(self, path, schema=DEFAULT_SCHEMA):
+        """
+        Args:
+            path: archive file to write
+            schema: FeatureSchema, one column of the feature block per feature
+        """
+        _require_numpy()
+        self.path = path
+        self.schema = schema
+        self._reports = []
+        self._groups = []
+        self._types = {}
+        self._spool = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+
+    def __len__(self):
+        return len(self._reports)
+
+    def add(self, decoded):
+        """ Adds a decoded report
+
+        Args:
+            decoded: Decoder or DecodedTaf
+        """
+        if self._spool.closed:
+            raise ArchiveError("Archive writer is closed")
+
+        if isinstance(decoded, DecodedTaf):
+            icao_code = decoded.icao_code
+            modifier = None
+            groups = decoded.groups
+        else:
+            header = decoded._taf.get_header()
+            icao_code = header['icao_code']
+            modifier = header.get('modifier')
+            groups = [(group.start_time, group.end_time, group.type, group.forecast) for group in decoded.groups]
+
+        report = len(self._reports)
+        self._reports.append((
+            to_epoch_minutes(decoded.issued_timestamp),
+            to_epoch_minutes(groups[0][0]) if groups else to_epoch_minutes(None),
+            to_epoch_minutes(groups[-1][1]) if groups else to_epoch_minutes(None),
+            len(self._groups), len(groups),
+            icao_code.encode('ascii'), (modifier or '').encode('ascii'),
+        ))
+
+        rows = self.schema.empty(len(groups), FEATURE_DTYPE)
+        for row, (start_time, end_time, group_type, forecast) in enumerate(groups):
+            type_code = self._types.setdefault(group_type, len(self._types))
+            if type_code > 255:
+                raise ArchiveError("Too many group types")
+            self._groups.append((to_epoch_minutes(start_time), to_epoch_minutes(end_time),
+                                 report, type_code, forecast.get('prob', 0)))
+            columns, values = self.schema.columns(forecast)
+            rows[row, columns] = values
+        self._spool.write(rows.tobytes())
+
+    def close(self):
+        """ Writes the archive """
+        if self._spool.closed:
+            return
+        try:
+            self._write()
+        finally:
+            self._spool.close()
+
+    def _write(self):
+        reports = np.array(self._reports, dtype=_report_dtype())
+        groups = np.array(self._groups, dtype=_group_dtype())
+        names = _join_strings(self.schema.names)
+        types = _join_strings(sorted(self._types, key=self._types.get))
+        fill_values = np.array(self.schema.fill_values, dtype=FILL_DTYPE)
+        feature_count = len(self.schema)
+        group_count = len(groups)
+
+        fill_values_offset = _align(struct.calcsize(HEADER_FORMAT) + len(names) + len(types))
+        reports_offset = _align(fill_values_offset + fill_values.nbytes)
+        groups_offset = _align(reports_offset + reports.nbytes)
+        features_offset = _align(groups_offset + groups.nbytes)
+        size = features_offset + feature_count * group_count * np.dtype(FEATURE_DTYPE).itemsize
+
+        header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, self.schema.version,
+                             len(reports), group_count, feature_count, len(names), len(types),
+                             reports_offset, groups_offset, features_offset)
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(header + names + types)
+            f.seek(fill_values_offset)
+            f.write(fill_values.tobytes())
+            f.seek(reports_offset)
+            f.write(reports.tobytes())
+            f.seek(groups_offset)
+            f.write(groups.tobytes())
+            f.truncate(size)
+
+        if feature_count and group_count:
+            block = np.memmap(temp_path, FEATURE_DTYPE, 'r+', features_offset, (feature_count, group_count))
+            self._spool.seek(0)
+            for start in range(0, group_count, _CHUNK_ROWS):
+                rows = np.fromfile(self._spool, FEATURE_DTYPE, min(_CHUNK_ROWS, group_count - start) * feature_count)
+                rows = rows.reshape(-1, feature_count)
+                block[:, start:start + len(rows)] = rows.T
+            block.flush()
+            del block
+
+        os.replace(temp_path, self.path)
+
+
+def write_archive(path, decoded, schema=DEFAULT_SCHEMA):
+    """ Writes decoded reports to an archive file
+
+    Args:
+        path: archive file to write
+        decoded: iterable of Decoder or DecodedTaf objects, RecordError
+            items (as yielded by decode_many) are skipped
+        schema: FeatureSchema
+
+    Returns:
+        Number of reports written
+    """
+    with ArchiveWriter(path, schema) as writer:
+        for item in decoded:
+            if item:
+                writer.add(item)
+        return len(writer)
+
+
+class Archive(object):
+    """ Memory-mapped archive of decoded TAF reports
+
+    Opening an archive only reads its header, the tables are NumPy views
+    of the mapped file and pages are read as they are used. The views are
+    read-only and must not be used after the archive is closed.
+
+    Attributes:
+        reports: structured array of REPORT_FIELDS, one record per report
+        groups: structured array of GROUP_FIELDS, one record per group
+        features: (feature, group) matrix of feature values
+        schema: FeatureSchema of the feature block
+        types: tuple of group type names, indexed by groups['type']
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: archive file
+
+        Raises:
+            ArchiveError: if the file is not an archive of a known format
+        """
+        _require_numpy()
+        self.path = path
+        header_size = struct.calcsize(HEADER_FORMAT)
+        with open(path, 'rb') as f:
+            header = f.read(header_size)
+            if len(header) < header_size or header[:len(MAGIC)] != MAGIC:
+                raise ArchiveError("%s is not a TAF archive" % path)
+
+            (_, version, schema_version, report_count, group_count, feature_count, names_length, types_length,
+             reports_offset, groups_offset, features_offset) = struct.unpack(HEADER_FORMAT, header)
+            if version not in (1, FORMAT_VERSION):
+                raise ArchiveError("Unsupported TAF archive format version %d" % version)
+
+            # Version 1 archives have no fill values, those of FEATURES are taken
+            fill_values_offset = _align(header_size + names_length + types_length)
+            fill_values_length = feature_count * np.dtype(FILL_DTYPE).itemsize if version > 1 else 0
+
+            # Tables running past the end of the file would only fail once mapped
+            tables = [(header_size, names_length + types_length),
+                      (fill_values_offset, fill_values_length),
+                      (reports_offset, report_count * _report_dtype().itemsize),
+                      (groups_offset, group_count * _group_dtype().itemsize),
+                      (features_offset, feature_count * group_count * np.dtype(FEATURE_DTYPE).itemsize)]
+            size = os.fstat(f.fileno()).st_size
+            if any(offset + length > size for offset, length in tables):
+                raise ArchiveError("%s is truncated" % path)
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offset = header_size
+        names = _split_strings(self._mmap[offset:offset + names_length])
+        offset += names_length
+        types = _split_strings(self._mmap[offset:offset + types_length])
+
+        if fill_values_length:
+            fill_values = np.frombuffer(self._mmap, FILL_DTYPE, feature_count, fill_values_offset).tolist()
+        else:
+            default_fill_values = dict(FEATURES)
+            fill_values = [default_fill_values.get(name, NAN) for name in names]
+        self.schema = FeatureSchema(list(zip(names, fill_values)), schema_version)
+        self.types = tuple(types)
+
+        self.reports = np.frombuffer(self._mmap, _report_dtype(), report_count, reports_offset)
+        self.groups = np.frombuffer(self._mmap, _group_dtype(), group_count, groups_offset)
+        self.features = np.frombuffer(self._mmap, FEATURE_DTYPE, feature_count * group_count,
+                                      features_offset).reshape(feature_count, group_count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.reports)
+
+    def close(self):
+        """ Releases the archive's views and unmaps the file """
+        self.reports = self.groups = self.features = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views handed out are still alive, the mapping goes with them
+            pass
+
+    def column(self, name):
+        """ Returns the values of a feature for every group """
+        return self.features[self.schema.index[name]]
+
+    def report_groups(self, report):
+        """ Returns slice of the groups of a report """
+        first = int(self.reports['first_group'][report])
+        return slice(first, first + int(self.reports['group_count'][report]))
+
+    def forecast(self, group):
+        """ Returns forecast dict of a group
+
+        Features at their absent value (the fill value of the schema the
+        archive was written with, NaN or 0 for indicators) are left out.
+        The archive does not tell an absent feature from one at its fill
+        value, so unlike TafGroup.forecast there are no zero indicators
+        ('weather': 0, 'windshear': 0 and the like), and the forecast does
+        not round-trip TafGroup.forecast.
+        """
+        forecast = {}
+        for name, fill, value in zip(self.schema.names, self.schema.fill_values, self.features[:, group]):
+            if value == value and value != fill:
+                forecast[name] = value.item()
+        return forecast
+
+    def decoded_taf(self, report):
+        """ Returns DecodedTaf of a report, see forecast() for what the groups hold """
+        record = self.reports[report]
+        groups = []
+        for group in range(*self.report_groups(report).indices(len(self.groups))):
+            start, end, _, type_code, _ = self.groups[group].tolist()
+            groups.append((from_epoch_minutes(start), from_epoch_minutes(end), self.types[type_code],
+                           self.forecast(group)))
+        return DecodedTaf(report, record['icao'].decode('ascii'),
+                          from_epoch_minutes(record['issued']), groups)
@@ -0,0 +1,98 @@
+""" Streaming parse/decode of many TAF reports """
+
+from .taf import TAF
+from .tafdecoder import Decoder, DecodeError, _projection
+
+
+class RecordError(object):
+    """ Stands in for a report that could not be parsed or decoded """
+
+    __slots__ = ('index', 'raw', 'error')
+
+    def __init__(self, index, raw, error):
+        """
+        Args:
+            index: position of the record in the input
+            raw: raw TAF report as it was given
+            error: exception raised while handling the record
+        """
+        self.index = index
+        self.raw = raw
+        self.error = error
+
+    @property
+    def message(self):
+        return getattr(self.error, 'strerror', None) or str(self.error)
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return '<RecordError #%d %s: %s>' % (self.index, type(self.error).__name__, self.message)
+
+
+def parse_many(reports, cache=None, lazy=False):
+    """ Parses TAF reports one at a time
+
+    Args:
+        reports: iterable of raw TAF report strings
+        cache: optional TafCache to look repeated reports up in
+        lazy: parse the groups of the reports only when they are accessed,
+            see TAF; reports looked up in cache are parsed eagerly
+
+    Yields:
+        TAF object for every report, or RecordError if it could not be parsed
+    """
+    for index, raw in enumerate(reports):
+        try:
+            if cache is not None:
+                yield cache.get_taf(raw)
+            else:
+                yield TAF(raw, lazy=lazy)
+        except Exception as e:
+            yield RecordError(index, raw, e)
+
+
+def decode_many(records, cache=None, fields=None):
+    """ Parses and decodes TAF reports one at a time
+
+    Only one report is held at a time, so arbitrarily long inputs (e.g. an
+    archive read line by line) are processed in constant memory.
+
+    Args:
+        records: iterable of (raw TAF report, timestamp) pairs, the timestamp
+            is the same as for Decoder
+        cache: optional TafCache to look repeated reports up in
+        fields: feature families and/or features to decode, see Decoder.
+            The reports are then parsed lazily. Cannot be combined with cache.
+
+    Yields:
+        Decoder object for every report, or RecordError if it could not be
+        parsed or decoded
+
+    Raises:
+        ValueError: both cache and fields given, or unknown field
+    """
+    if cache is not None and fields is not None:
+        raise ValueError("fields cannot be used with a cache")
+    if fields is not None:
+        # Fails early on unknown fields
+        _projection(fields)
+    for index, (raw, timestamp) in enumerate(records):
+        yield _decode_record(index, raw, timestamp, cache, fields)
+
+
+def _decode_record(index, raw, timestamp, cache=None, fields=None):
+    try:
+        if cache is not None:
+            decoder = cache.get_decoder(raw, timestamp)
+        elif fields is not None:
+            decoder = Decoder(TAF(raw, lazy=True), timestamp, fields)
+        else:
+            decoder = Decoder(TAF(raw), timestamp)
+        # Decoder logs and swallows ValueError, possibly leaving some groups behind
+        if not decoder._decoded or not decoder.groups:
+            raise DecodeError("Error decoding TAF")
+        return decoder
+    except Exception as e:
+        return RecordError(index, raw, e)
@@ -0,0 +1,120 @@
+""" Bounded cache of parsed and decoded TAF reports """
+
+from collections import OrderedDict
+from datetime import datetime
+
+from .taf import TAF
+from .tafdecoder import Decoder
+
+
+class TafCache(object):
+    """ LRU cache of TAF and Decoder objects keyed on the report text
+
+    The same report often arrives many times (duplicate bulletins,
+    rebroadcasts), this saves parsing and decoding it again. Reports are
+    keyed on their text with surrounding whitespace and "=" stripped, the
+    same way TAF normalizes it. Decoders are additionally keyed on the year
+    and month of the timestamp, which is all Decoder uses it for.
+
+    Every call returns a copy of the cached object, so changing what a
+    caller gets does not change what later callers get. Copying is much
+    cheaper than parsing or decoding again.
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        Args:
+            maxsize: maximum number of cached objects (TAF and Decoder
+                objects count separately), the least recently used ones
+                are evicted first
+        """
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get_taf(self, string):
+        """ Returns copy of the TAF object for the report, parsing it if it is not cached
+
+        Raises:
+            MalformedTAF: An error parsing the TAF report
+        """
+        if not isinstance(string, str):
+            return TAF(string)
+
+        return self._parse(string, True)._copy()
+
+    def get_decoder(self, string, taf_timestamp):
+        """ Returns copy of the Decoder object for the report, decoding it if it is not cached
+
+        Raises:
+            MalformedTAF: An error parsing the TAF report
+        """
+        if not isinstance(string, str):
+            return Decoder(TAF(string), taf_timestamp)
+
+        anchor = taf_timestamp or datetime.utcnow()
+        key = ('decoder', self._normalize(string), anchor.year, anchor.month)
+        decoder = self._get(key)
+        if decoder is None:
+            # Only the lookup of the decoder is counted
+            decoder = Decoder(self._parse(string, False)._copy(), taf_timestamp)
+            self._put(key, decoder)
+        return decoder._copy()
+
+    def stats(self):
+        """ Returns dict of cache counters
+
+        Hits and misses count the get_taf and get_decoder calls, a decoder
+        missing from the cache is decoded from the cached TAF object if
+        there is one, without counting its lookup.
+        """
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        """ Drops all cached objects, counters are kept """
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _normalize(self, string):
+        return string.strip().strip('=').strip()
+
+    def _parse(self, string, count):
+        """ Returns the cached TAF object of a report, parsing and caching it if needed """
+        key = ('taf', self._normalize(string))
+        taf = self._get(key, count)
+        if taf is None:
+            taf = TAF(string)
+            self._put(key, taf)
+        return taf
+
+    def _get(self, key, count=True):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        if count:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _put(self, key, value):
+        if self.maxsize == 0:
+            return
+        self._entries[key] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
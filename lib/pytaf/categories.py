@@ -0,0 +1,161 @@
+""" Flight categories (VFR/MVFR/IFR/LIFR) of decoded forecasts
+
+Requires numpy, which is an optional dependency of pytaf.
+"""
+
+from datetime import timedelta
+
+from .features import NAN, FeatureSchema
+from .parallel import DecodedTaf
+from .timeutil import np, _require_numpy
+
+UNKNOWN, VFR, MVFR, IFR, LIFR = -1, 0, 1, 2, 3
+
+CATEGORY_NAMES = {UNKNOWN: None, VFR: 'VFR', MVFR: 'MVFR', IFR: 'IFR', LIFR: 'LIFR'}
+
+METERS_PER_SM = 1609.344
+
+# (category, ceiling ft, visibility SM, inclusive), worst category first.
+# A category applies when the ceiling or the visibility is below its
+# limits (or at them, if inclusive); VFR is what is left.
+DEFAULT_RULES = (
+    (LIFR, 500, 1, False),
+    (IFR, 1000, 3, False),
+    (MVFR, 3000, 5, True),
+)
+
+# Forecast features the categories are computed from
+CATEGORY_SCHEMA = FeatureSchema([
+    ('visibility_SM', NAN), ('visibility_M', NAN), ('visibility_vertical_ft', NAN),
+    ('clouds_ceiling_ft', NAN), ('clouds_layer_BKN', 0), ('clouds_layer_OVC', 0),
+    ('clouds_ceiling_broken_ft', NAN),
+])
+
+# Decoder fields that give exact categories, see CategoryTable
+CATEGORY_FIELDS = ('visibility', 'clouds', 'clouds_ceiling_broken_ft')
+
+
+class CategoryTable(object):
+    """ Classifies forecasts into flight categories
+
+    Categories are int8 codes (VFR, MVFR, IFR, LIFR), UNKNOWN where no
+    group is in force.
+
+    The ceiling is the vertical visibility or the lowest broken or
+    overcast layer, whichever is lower. The lowest broken or overcast
+    layer is only decoded on request (feature clouds_ceiling_broken_ft,
+    see CATEGORY_FIELDS). Where it was not, the lowest cloud layer
+    stands in for it if there is a broken or overcast layer, so e.g.
+    FEW005 BKN030 counts as a 500 ft ceiling, erring on the worse
+    category. Missing ceiling and visibility are unlimited.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        """
+        Args:
+            rules: sequence of (category, ceiling ft, visibility SM, inclusive)
+                tuples, see DEFAULT_RULES
+        """
+        self.rules = tuple(sorted(rules, key=lambda rule: -rule[0]))
+
+    def classify(self, ceiling_ft, visibility_SM):
+        """ Returns int8 array of the categories of ceiling and visibility arrays
+
+        NaN is taken as unlimited.
+        """
+        _require_numpy()
+        ceiling_ft = np.nan_to_num(np.asarray(ceiling_ft, dtype=np.float64), nan=np.inf)
+        visibility_SM = np.nan_to_num(np.asarray(visibility_SM, dtype=np.float64), nan=np.inf)
+
+        categories = np.full(np.broadcast(ceiling_ft, visibility_SM).shape, VFR, dtype=np.int8)
+        # Best category first, so that worse ones overwrite it
+        for category, ceiling_limit, visibility_limit, inclusive in reversed(self.rules):
+            if inclusive:
+                below = (ceiling_ft <= ceiling_limit) | (visibility_SM <= visibility_limit)
+            else:
+                below = (ceiling_ft < ceiling_limit) | (visibility_SM < visibility_limit)
+            categories[below] = category
+        return categories
+
+    def from_matrix(self, matrix, schema=CATEGORY_SCHEMA, in_force=None):
+        """ Returns categories of the rows of a feature matrix
+
+        Args:
+            matrix: matrix from feature_matrix, Decoder.resample and the like,
+                with (at least) the features of CATEGORY_SCHEMA
+            schema: FeatureSchema of the matrix
+            in_force: boolean array, whether a group is in force for each
+                row; rows it is False for are UNKNOWN. All rows are taken
+                as in force if None.
+        """
+        _require_numpy()
+        column = schema.index
+
+        def feature(name):
+            return matrix[:, column[name]]
+
+        ceiling_ft = feature('clouds_ceiling_broken_ft')
+        broken = (feature('clouds_layer_BKN') > 0) | (feature('clouds_layer_OVC') > 0)
+        ceiling_ft = np.where(np.isnan(ceiling_ft) & broken, feature('clouds_ceiling_ft'), ceiling_ft)
+        ceiling_ft = np.fmin(ceiling_ft, feature('visibility_vertical_ft')) * 100
+
+        visibility_SM = feature('visibility_SM')
+        visibility_SM = np.where(np.isnan(visibility_SM), feature('visibility_M') / METERS_PER_SM, visibility_SM)
+
+        categories = self.classify(ceiling_ft, visibility_SM)
+        if in_force is not None:
+            categories[~np.asarray(in_force, dtype=bool)] = UNKNOWN
+        return categories
+
+    def groups(self, decoded):
+        """ Returns int8 array of the category of every group
+
+        Args:
+            decoded: Decoder or DecodedTaf
+        """
+        if isinstance(decoded, DecodedTaf):
+            forecasts = [group[3] for group in decoded.groups]
+        else:
+            forecasts = [group.forecast for group in decoded.groups]
+
+        matrix = CATEGORY_SCHEMA.empty(len(forecasts))
+        for row, forecast in enumerate(forecasts):
+            columns, values = CATEGORY_SCHEMA.columns(forecast)
+            matrix[row, columns] = values
+        return self.from_matrix(matrix)
+
+    def timeline(self, decoder, step=timedelta(hours=1), origin=None):
+        """ Returns categories on a regular time grid
+
+        Args:
+            decoder: Decoder
+            step, origin: see Decoder.resample
+
+        Returns:
+            (times, categories) arrays
+        """
+        times, matrix = decoder.resample(step, origin, schema=CATEGORY_SCHEMA)
+        return times, self.from_matrix(matrix, in_force=decoder.group_indices(times) >= 0)
+
+
+def worst_over_window(categories, window):
+    """ Returns the worst category over a sliding window of time steps
+
+    Args:
+        categories: category array of consecutive time steps, e.g. from
+            CategoryTable.timeline; several timelines of the same length can
+            be given as rows of a 2D array
+        window: number of steps
+
+    Returns:
+        Array of the same shape, item i is the worst category of steps
+        i .. i + window - 1 (fewer at the end). UNKNOWN steps only count if
+        the whole window is unknown.
+    """
+    _require_numpy()
+    if window < 1:
+        raise ValueError("window must be positive")
+    categories = np.asarray(categories, dtype=np.int8)
+    pad = [(0, 0)] * (categories.ndim - 1) + [(0, window - 1)]
+    padded = np.pad(categories, pad, constant_values=UNKNOWN)
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=-1).max(axis=-1)
@@ -0,0 +1,148 @@
+""" Compact representation of decoded forecast periods
+
+A TafGroup keeps the parsed group, its header, a dict per feature family
+and the merged forecast dict, more than a dozen objects per period.
+CompactGroup keeps the group type, the columns of the features present in
+a FeatureSchema, and one typed array of the start and end times as epoch
+minutes (see timeutil) followed by the feature values. The same sets of
+features come up over and over, so their columns are shared between
+groups. The forecast stays available as a read-only mapping.
+
+    groups = compact_groups(decoder)
+    groups[0].forecast['wind_speed_KT']
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from .features import DEFAULT_SCHEMA
+from .timeutil import to_epoch_minutes, from_epoch_minutes
+
+# Values are kept as doubles, so they compare equal to the decoded ints and
+# floats. Epoch minutes (and MISSING_MINUTES) are exact doubles too.
+VALUE_TYPECODE = 'd'
+
+
+def _column_set(columns, schema):
+    """ Returns the sequence of ascending schema columns shared by the
+    groups of the schema, there are only as many as feature combinations """
+    if len(schema) <= 0x100:
+        columns = bytes(columns)
+        key = columns
+    else:
+        columns = array('H', columns)
+        key = columns.tobytes()
+    return schema._column_sets.setdefault(key, columns)
+
+
+class CompactGroup(object):
+    """ Forecast period with the features in typed arrays
+
+    Attributes:
+        type: group type, e.g. FM or TEMPO
+        schema: FeatureSchema the feature columns refer to
+    """
+
+    __slots__ = ('type', 'schema', '_columns', '_values')
+
+    def __init__(self, start, end, type, columns, values, schema=DEFAULT_SCHEMA):
+        """
+        Args:
+            start, end: epoch minutes
+            type: group type
+            columns: ascending schema columns of the features present
+            values: their values
+            schema: FeatureSchema
+        """
+        # Types repeat in every report, share the strings
+        self.type = sys.intern(type)
+        self.schema = schema
+        self._columns = _column_set(columns, schema)
+        self._values = array(VALUE_TYPECODE, [start, end])
+        self._values.extend(values)
+
+    @classmethod
+    def from_group(cls, group, schema=DEFAULT_SCHEMA):
+        """ Returns CompactGroup of a TafGroup, features not in the schema are dropped """
+        columns, values = group.feature_ids(schema)
+        return cls(to_epoch_minutes(group.start_time), to_epoch_minutes(group.end_time), group.type,
+                   columns, values, schema)
+
+    @property
+    def start(self):
+        """ Start time in epoch minutes, MISSING_MINUTES if not known """
+        return int(self._values[0])
+
+    @property
+    def end(self):
+        """ End time in epoch minutes, MISSING_MINUTES if not known """
+        return int(self._values[1])
+
+    @property
+    def start_time(self):
+        return from_epoch_minutes(self.start)
+
+    @property
+    def end_time(self):
+        return from_epoch_minutes(self.end)
+
+    def feature_ids(self, schema=None):
+        """ Returns the features as (ids, values) sequences, see TafGroup.feature_ids """
+        if schema is None or schema is self.schema:
+            return self._columns, self._values[2:]
+        columns, values = schema.columns(self.forecast)
+        pairs = sorted(zip(columns, values))
+        return [column for column, _ in pairs], [value for _, value in pairs]
+
+    @property
+    def forecast(self):
+        """ Read-only mapping of the feature names to their values """
+        return ForecastView(self)
+
+    def __getstate__(self):
+        return (self.type, self.schema, self._columns, self._values)
+
+    def __setstate__(self, state):
+        self.type, self.schema, columns, self._values = state
+        self.type = sys.intern(self.type)
+        self._columns = _column_set(columns, self.schema)
+
+    def __repr__(self):
+        return '<CompactGroup %s-%s %s>' % (self.start_time, self.end_time, self.type)
+
+
+class ForecastView(Mapping):
+    """ Forecast dict of a CompactGroup, without the dict """
+
+    __slots__ = ('_group',)
+
+    def __init__(self, group):
+        self._group = group
+
+    def __getitem__(self, name):
+        group = self._group
+        column = group.schema.index.get(name)
+        if column is not None:
+            columns = group._columns
+            position = bisect_left(columns, column)
+            if position < len(columns) and columns[position] == column:
+                # After the start and end times
+                return group._values[position + 2]
+        raise KeyError(name)
+
+    def __iter__(self):
+        names = self._group.schema.names
+        return (names[column] for column in self._group._columns)
+
+    def __len__(self):
+        return len(self._group._columns)
+
+    def __repr__(self):
+        return '<ForecastView %r>' % dict(self.items())
+
+
+def compact_groups(decoder, schema=DEFAULT_SCHEMA):
+    """ Returns list of CompactGroup of the groups of a Decoder """
+    return [CompactGroup.from_group(group, schema) for group in decoder.groups]
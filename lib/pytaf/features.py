@@ -0,0 +1,209 @@
+""" Fixed feature schema and NumPy export of decoded forecasts
+
+The column of a feature in a schema is its integer ID, which stays the
+same as the schema grows. Requires numpy, which is an optional
+dependency of pytaf.
+"""
+
+from array import array
+
+from .taf import _modifiers, _phenomena
+from .tafdecoder import WEATHER_INT
+from .timeutil import np, _require_numpy
+
+NAN = float('nan')
+
+SCHEMA_VERSION = 2
+
+# (feature name, value when absent). Indicator features are 0 when absent,
+# measurements are NaN. Columns are only ever appended, bump
+# SCHEMA_VERSION when doing so.
+FEATURES = (
+    [('prob', NAN),
+     ('wind', 0), ('wind_dir', NAN), ('wind_dir_variable', 0),
+     ('wind_speed_KT', NAN), ('wind_speed_MPS', NAN),
+     ('wind_gust_KT', NAN), ('wind_gust_MPS', NAN),
+     ('wind_gust_diff_KT', NAN), ('wind_gust_diff_MPS', NAN),
+     ('wind_crosswind_cos', NAN), ('wind_crosswind_sin', NAN),
+     ('visibility_SM', NAN), ('visibility_M', NAN), ('visibility_vertical_ft', NAN),
+     ('sky_clear', 0), ('clouds_num_layers', NAN),
+     ('clouds_ceiling_ft', NAN), ('clouds_ceiling_max_ft', NAN)]
+    + [('clouds_layer_' + layer, 0) for layer in ['FEW', 'SCT', 'BKN', 'OVC']]
+    + [('clouds_type_' + cloud_type, 0) for cloud_type in ['CU', 'CB', 'TCU', 'CI']]
+    + [('weather', 0)]
+    + [('wx_intensity_' + intensity, 0) for intensity in WEATHER_INT.values()]
+    + [('wx_modifier_' + modifier, 0) for modifier in _modifiers]
+    + [('wx_phenomenon_' + phenomenon, 0) for phenomenon in _phenomena]
+    + [('windshear', 0), ('windshear_alt_ft', NAN), ('windshear_dir', NAN),
+       ('windshear_speed_KT', NAN), ('windshear_speed_MPS', NAN)]
+    + [('clouds_ceiling_broken_ft', NAN)]
+)
+
+
+class FeatureSchema(object):
+    """ Maps forecast feature names to matrix columns """
+
+    def __init__(self, features=FEATURES, version=SCHEMA_VERSION):
+        """
+        Args:
+            features: sequence of (name, value when absent) pairs
+            version: schema version
+        """
+        self.version = version
+        self.names = tuple(name for name, _ in features)
+        self.fill_values = tuple(fill for _, fill in features)
+        self.index = dict((name, column) for column, name in enumerate(self.names))
+        if len(self.index) != len(self.names):
+            raise ValueError("Duplicate feature names in schema")
+        # Column sets shared by the CompactGroup objects of the schema
+        self._column_sets = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __reduce__(self):
+        # The default schema is pickled by reference, others without the
+        # column sets
+        if self is DEFAULT_SCHEMA:
+            return _default_schema, (self.version,)
+        return FeatureSchema, (tuple(zip(self.names, self.fill_values)), self.version)
+
+    def columns(self, forecast):
+        """ Returns (columns, values) lists for the schema features in a forecast dict,
+        features not in the schema are skipped """
+        columns = []
+        values = []
+        index = self.index
+        for name, value in forecast.items():
+            column = index.get(name)
+            if column is not None:
+                columns.append(column)
+                values.append(value)
+        return columns, values
+
+    def empty(self, rows, dtype=None):
+        """ Returns matrix of absent features with the given number of rows """
+        _require_numpy()
+        matrix = np.empty((rows, len(self.names)), dtype=dtype or np.float64)
+        matrix[:] = self.fill_values
+        return matrix
+
+
+DEFAULT_SCHEMA = FeatureSchema()
+
+
+def _default_schema(version):
+    """ Returns the default schema in place of a pickled one
+
+    Columns are only ever appended, so the current schema also fits what
+    was pickled with an earlier version.
+
+    Raises:
+        ValueError: version is newer than the current one
+    """
+    if version > DEFAULT_SCHEMA.version:
+        raise ValueError("Feature schema version %d is newer than %d" % (version, DEFAULT_SCHEMA.version))
+    return DEFAULT_SCHEMA
+
+
+def fill_rows(matrix, row, groups, schema=DEFAULT_SCHEMA):
+    """ Writes forecasts of the groups into consecutive matrix rows
+
+    Rows of the same group in a row are written with one assignment.
+    Rows where the group is None are set to NaN in every column.
+
+    Args:
+        matrix: matrix to write to, from schema.empty
+        row: first row to write
+        groups: sequence of TafGroup objects or None
+
+    Returns:
+        Row after the last written one
+    """
+    run_start = row
+    run_group = None
+    for group in groups:
+        if group is not run_group:
+            _fill_run(matrix, run_start, row, run_group, schema)
+            run_start = row
+            run_group = group
+        row += 1
+    _fill_run(matrix, run_start, row, run_group, schema)
+    return row
+
+
+def _fill_run(matrix, start, end, group, schema):
+    if start == end:
+        return
+    if group is None:
+        matrix[start:end] = NAN
+        return
+    columns, values = group.feature_ids(schema)
+    if columns:
+        matrix[start:end, columns] = values
+
+
+def feature_matrix(decoders, timestamps, schema=DEFAULT_SCHEMA, dtype=None):
+    """ Builds feature matrix of forecasts at the given times
+
+    Args:
+        decoders: sequence of Decoder objects
+        timestamps: sequence of the same length as decoders, every item is
+            the sequence of times to look the forecast of that decoder up at
+            (see Decoder.get_groups), or an array of datetime64 or epoch
+            minutes, which is looked up in one go (see Decoder.group_indices)
+        schema: FeatureSchema, one column per feature
+        dtype: matrix dtype, float64 by default
+
+    Returns:
+        Matrix with a row for every timestamp, rows of the first decoder
+        first. Rows of timestamps no group is in force at are all NaN.
+    """
+    if len(decoders) != len(timestamps):
+        raise ValueError("Expecting timestamps for every decoder")
+
+    matrix = schema.empty(sum(len(times) for times in timestamps), dtype)
+    row = 0
+    for decoder, times in zip(decoders, timestamps):
+        if isinstance(times, np.ndarray):
+            groups = decoder.groups
+            groups = [groups[index] if index >= 0 else None for index in decoder.group_indices(times).tolist()]
+        else:
+            groups = decoder.get_groups(times)
+        row = fill_rows(matrix, row, groups, schema)
+    return matrix
+
+
+def sparse_features(groups, schema=DEFAULT_SCHEMA, dtype=None):
+    """ Builds CSR arrays of the forecasts of groups, one row per group
+
+    Only the features present in a forecast are stored, with their
+    schema columns as indices. Absent features are left out rather than
+    set to their fill values.
+
+        indptr, indices, data = sparse_features(groups)
+        scipy.sparse.csr_matrix((data, indices, indptr), shape=(len(groups), len(schema)))
+
+    Args:
+        groups: iterable of TafGroup or CompactGroup objects, or None for
+            an empty row
+        schema: FeatureSchema, one column per feature
+        dtype: data dtype, float64 by default
+
+    Returns:
+        (indptr, indices, data) tuple: int64 array of the start of every
+        row in the other two, int32 array of the columns in ascending
+        order within a row, and the array of the values
+    """
+    _require_numpy()
+    indptr = array('q', [0])
+    indices = array('i')
+    data = array('d')
+    for group in groups:
+        if group is not None:
+            columns, values = group.feature_ids(schema)
+            indices.extend(columns)
+            data.extend(values)
+        indptr.append(len(indices))
+    return (np.frombuffer(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32),
+            np.frombuffer(data, dtype=np.float64).astype(dtype or np.float64, copy=False))
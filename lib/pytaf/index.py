@@ -0,0 +1,314 @@
+""" Station and issue time index over TAF archive files
+
+The index maps (station, issue time, validity) of every report to where it
+is stored, so finding reports does not need parsing the archives. It
+covers raw text files of reports (see splitter for the layouts they can
+have) and binary archives written by ArchiveWriter.
+
+The index is kept in a tab separated text file that is only ever appended
+to. Its lines are
+
+    F  file id  kind  path  indexed size
+    R  file id  ICAO  issued  valid from  valid till  offset  length  [prefix]
+
+Paths are relative to the directory of the index file, times are epoch
+minutes (see timeutil). Offset and length are in bytes for raw files; for
+binary archives the offset is the report number and the length its
+number of groups. The prefix is the "TAF" line of the bulletin a raw
+report is in, when the report does not start with it. An F line is
+repeated with a larger size when more of a growing raw file is indexed.
+"""
+
+import os
+from bisect import bisect_left
+
+from .bulk import _decode_record
+from .splitter import ReportFile
+from .taf import TAF
+from .timeutil import to_epoch_minutes, from_epoch_minutes
+
+RAW = 'raw'
+ARCHIVE = 'archive'
+
+
+class IndexEntry(object):
+    """ Indexed report
+
+    Times are epoch minutes, see the *_timestamp properties for datetimes.
+    """
+
+    __slots__ = ('icao_code', 'issued', 'valid_from', 'valid_till', 'kind', 'path', 'offset', 'length',
+                 'prefix')
+
+    def __init__(self, icao_code, issued, valid_from, valid_till, kind, path, offset, length, prefix=''):
+        self.icao_code = icao_code
+        self.issued = issued
+        self.valid_from = valid_from
+        self.valid_till = valid_till
+        self.kind = kind
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.prefix = prefix
+
+    @property
+    def issued_timestamp(self):
+        return from_epoch_minutes(self.issued)
+
+    @property
+    def valid_from_timestamp(self):
+        return from_epoch_minutes(self.valid_from)
+
+    @property
+    def valid_till_timestamp(self):
+        return from_epoch_minutes(self.valid_till)
+
+    def __lt__(self, other):
+        return (self.issued, self.path, self.offset) < (other.issued, other.path, other.offset)
+
+    def __repr__(self):
+        return '<IndexEntry %s %s %s@%d>' % (self.icao_code, self.issued_timestamp, self.path, self.offset)
+
+
+class TafIndex(object):
+    """ Index of the reports of a set of archive files
+
+        index = TafIndex("archive/tafs.idx")
+        index.add_raw("archive/2016-03.txt", datetime(2016, 3, 1))
+        for taf in index.tafs(index.find("KDEN", datetime(2016, 3, 1), datetime(2016, 4, 1))):
+            ...
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: index file, loaded if it exists and created when the
+                first file is added
+        """
+        self.path = path
+        self._directory = os.path.dirname(os.path.abspath(path))
+        self._files = {}        # path -> [file id, kind, indexed size]
+        self._file_paths = {}   # file id -> path
+        self._stations = {}     # ICAO code -> sorted list of entries
+        self._issued = {}       # ICAO code -> issue times of those entries
+        if os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._stations.values())
+
+    def __contains__(self, icao_code):
+        return icao_code in self._stations
+
+    def stations(self):
+        """ Returns sorted list of the ICAO codes in the index """
+        return sorted(self._stations)
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if fields[0] == 'F':
+                    file_id, kind, path, size = fields[1:]
+                    self._add_file(int(file_id), kind, path, int(size))
+                elif fields[0] == 'R':
+                    file_id = int(fields[1])
+                    path = self._file_paths[file_id]
+                    prefix = fields[8] if len(fields) > 8 else ''
+                    self._insert(IndexEntry(fields[2], int(fields[3]), int(fields[4]), int(fields[5]),
+                                            self._files[path][1], path, int(fields[6]), int(fields[7]),
+                                            prefix))
+
+    def _add_file(self, file_id, kind, path, size):
+        self._files[path] = [file_id, kind, size]
+        self._file_paths[file_id] = path
+
+    def _insert(self, entry):
+        entries = self._stations.setdefault(entry.icao_code, [])
+        issued = self._issued.setdefault(entry.icao_code, [])
+        if not entries or not entry < entries[-1]:
+            entries.append(entry)
+            issued.append(entry.issued)
+        else:
+            index = bisect_left(entries, entry)
+            entries.insert(index, entry)
+            issued.insert(index, entry.issued)
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self._directory)
+
+    def resolve(self, path):
+        """ Returns the path of an indexed file relative to the working directory """
+        return os.path.join(self._directory, path)
+
+    def _append(self, path, kind, size, entries):
+        if path in self._files:
+            file_id = self._files[path][0]
+        else:
+            file_id = len(self._files)
+        self._add_file(file_id, kind, path, size)
+
+        lines = ['F\t%d\t%s\t%s\t%d\n' % (file_id, kind, path, size)]
+        for entry in entries:
+            line = 'R\t%d\t%s\t%d\t%d\t%d\t%d\t%d' % (
+                file_id, entry.icao_code, entry.issued, entry.valid_from, entry.valid_till,
+                entry.offset, entry.length)
+            if entry.prefix:
+                line += '\t' + entry.prefix
+            lines.append(line + '\n')
+            self._insert(entry)
+        with open(self.path, 'a') as f:
+            f.writelines(lines)
+
+    def add_raw(self, path, timestamp):
+        """ Indexes the reports of a raw text file
+
+        A file that is already in the index is only indexed from where the
+        previous indexing ended, so files that are appended to can be added
+        again as they grow. Text after the last complete report is left for
+        then. Reports that cannot be decoded are not indexed.
+
+        Args:
+            path: file of reports, see splitter
+            timestamp: datetime in the month (and year) the reports were
+                issued in, see Decoder
+
+        Returns:
+            Number of reports added to the index
+        """
+        relative = self._relative(path)
+        known = self._files.get(relative)
+        if known and known[1] != RAW:
+            raise ValueError("%s is indexed as %s" % (path, known[1]))
+        start = known[2] if known else 0
+
+        entries = []
+        indexed = start
+        with ReportFile(path) as reports:
+            for span in reports.spans(start, final=False):
+                indexed = span.consumed
+                decoder = _decode_record(0, span.report(reports.buffer), timestamp)
+                if not decoder:
+                    continue
+                entries.append(IndexEntry(
+                    decoder._taf.get_header()['icao_code'], to_epoch_minutes(decoder.issued_timestamp),
+                    to_epoch_minutes(decoder.start_time), to_epoch_minutes(decoder.end_time),
+                    RAW, relative, span.start, span.end - span.start, span.prefix.decode('latin-1')))
+
+        if indexed > start or not known:
+            self._append(relative, RAW, indexed, entries)
+        return len(entries)
+
+    def add_archive(self, path):
+        """ Indexes the reports of a binary archive
+
+        Archives are written once, an archive already in the index is skipped.
+
+        Returns:
+            Number of reports added to the index
+        """
+        from .archive import Archive
+
+        relative = self._relative(path)
+        if relative in self._files:
+            return 0
+
+        entries = []
+        with Archive(path) as archive:
+            reports = archive.reports
+            for number, (icao_code, issued, valid_from, valid_till, count) in enumerate(zip(
+                    reports['icao'].tolist(), reports['issued'].tolist(), reports['valid_from'].tolist(),
+                    reports['valid_till'].tolist(), reports['group_count'].tolist())):
+                entries.append(IndexEntry(icao_code.decode('ascii'), issued, valid_from, valid_till,
+                                          ARCHIVE, relative, number, count))
+            del reports
+        self._append(relative, ARCHIVE, os.path.getsize(path), entries)
+        return len(entries)
+
+    def find(self, icao_codes=None, issued_from=None, issued_till=None, valid_at=None):
+        """ Returns the indexed reports matching all of the given conditions
+
+        Args:
+            icao_codes: ICAO code or collection of them, all stations if None
+            issued_from: datetime, reports issued at or after it
+            issued_till: datetime, reports issued before it
+            valid_at: datetime the report must be valid at
+
+        Returns:
+            List of IndexEntry objects, ordered by station and issue time
+        """
+        if icao_codes is None:
+            icao_codes = sorted(self._stations)
+        elif isinstance(icao_codes, str):
+            icao_codes = [icao_codes]
+        else:
+            icao_codes = sorted(icao_codes)
+
+        low = to_epoch_minutes(issued_from) if issued_from is not None else None
+        high = to_epoch_minutes(issued_till) if issued_till is not None else None
+        at = to_epoch_minutes(valid_at) if valid_at is not None else None
+
+        result = []
+        for icao_code in icao_codes:
+            entries = self._stations.get(icao_code)
+            if not entries:
+                continue
+            issued = self._issued[icao_code]
+            first = bisect_left(issued, low) if low is not None else 0
+            last = bisect_left(issued, high) if high is not None else len(issued)
+            if at is None:
+                result.extend(entries[first:last])
+            else:
+                result.extend(entry for entry in entries[first:last]
+                              if entry.valid_from <= at <= entry.valid_till)
+        return result
+
+    def tafs(self, entries):
+        """ Parses the reports of index entries of raw files
+
+        Args:
+            entries: IndexEntry objects of raw files, as returned by find
+
+        Yields:
+            TAF object of every entry
+        """
+        files = {}
+        try:
+            for entry in entries:
+                if entry.kind != RAW:
+                    raise ValueError("%r is not in a raw file" % entry)
+                f = files.get(entry.path)
+                if f is None:
+                    f = files[entry.path] = open(self.resolve(entry.path), 'rb')
+                f.seek(entry.offset)
+                report = f.read(entry.length)
+                if entry.prefix:
+                    report = entry.prefix.encode('latin-1') + b'\n' + report
+                yield TAF(report)
+        finally:
+            for f in files.values():
+                f.close()
+
+    def decoded(self, entries):
+        """ Reads the reports of index entries of binary archives
+
+        Args:
+            entries: IndexEntry objects of binary archives, as returned by find
+
+        Yields:
+            DecodedTaf of every entry, see Archive.decoded_taf
+        """
+        from .archive import Archive
+
+        archives = {}
+        try:
+            for entry in entries:
+                if entry.kind != ARCHIVE:
+                    raise ValueError("%r is not in a binary archive" % entry)
+                archive = archives.get(entry.path)
+                if archive is None:
+                    archive = archives[entry.path] = Archive(self.resolve(entry.path))
+                yield archive.decoded_taf(entry.offset)
+        finally:
+            for archive in archives.values():
+                archive.close()
@@ -0,0 +1,119 @@
+""" Parallel decoding of TAF archives in a process pool """
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from .bulk import _decode_record
+
+
+class DecodedTaf(object):
+    """ Compact, picklable result of decoding a TAF
+
+    Unlike Decoder it holds no reference to the TAF object or to the parsed
+    group dicts, only what is needed to use the forecast.
+    """
+
+    __slots__ = ('index', 'icao_code', 'issued_timestamp', 'groups')
+
+    def __init__(self, index, icao_code, issued_timestamp, groups):
+        """
+        Args:
+            index: position of the record in the input
+            icao_code: station ICAO code
+            issued_timestamp: issue time of the report
+            groups: list of (start_time, end_time, type, forecast) tuples
+        """
+        self.index = index
+        self.icao_code = icao_code
+        self.issued_timestamp = issued_timestamp
+        self.groups = groups
+
+    @classmethod
+    def from_decoder(cls, index, decoder):
+        groups = [(group.start_time, group.end_time, group.type, group.forecast) for group in decoder.groups]
+        return cls(index, decoder._taf.get_header()['icao_code'], decoder.issued_timestamp, groups)
+
+    @property
+    def start_time(self):
+        return self.groups[0][0]
+
+    @property
+    def end_time(self):
+        return self.groups[-1][1]
+
+    def __getstate__(self):
+        return (self.index, self.icao_code, self.issued_timestamp, self.groups)
+
+    def __setstate__(self, state):
+        self.index, self.icao_code, self.issued_timestamp, self.groups = state
+
+    def __repr__(self):
+        return '<DecodedTaf #%d %s %s>' % (self.index, self.icao_code, self.issued_timestamp)
+
+
+def _decode_chunk(chunk):
+    results = []
+    for index, (raw, timestamp) in chunk:
+        result = _decode_record(index, raw, timestamp)
+        if result:
+            result = DecodedTaf.from_decoder(index, result)
+        results.append(result)
+    return results
+
+
+def decode_parallel(records, workers=None, chunk_size=500, ordered=True):
+    """ Decodes TAF reports in a pool of worker processes
+
+    The input is consumed in chunks of chunk_size records, and only a couple
+    of chunks per worker are in flight at any time, so memory use does not
+    depend on the input length.
+
+    Args:
+        records: iterable of (raw TAF report, timestamp) pairs, as for decode_many
+        workers: number of worker processes, defaults to the number of CPUs
+        chunk_size: number of records sent to a worker at once
+        ordered: yield results in input order; otherwise results are yielded
+            as soon as their chunk is done, use the index attribute to match
+            them with the input
+
+    Yields:
+        DecodedTaf for every report, or RecordError if it could not be
+        parsed or decoded
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_pending = 2 * workers
+
+    numbered = enumerate(records)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def submit():
+            chunk = list(islice(numbered, chunk_size))
+            if chunk:
+                pending.append(executor.submit(_decode_chunk, chunk))
+            return bool(chunk)
+
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                exhausted = not submit()
+            if not pending:
+                break
+
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+
+            for future in done:
+                for result in future.result():
+                    yield result
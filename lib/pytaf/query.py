@@ -0,0 +1,183 @@
+""" Predicate queries over binary archives of decoded reports
+
+Requires numpy, which is an optional dependency of pytaf.
+"""
+
+import operator
+
+from .timeutil import np, _require_numpy, to_epoch_minutes, from_epoch_minutes
+
+_OPERATORS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+}
+
+
+def _in(values, choices):
+    return np.isin(values, choices)
+
+
+class Query(object):
+    """ Selects forecast periods (groups) of an Archive
+
+    Conditions are collected with the chainable methods and all have to
+    hold. When the query is run, the station and issue time conditions are
+    evaluated on the report table first, then validity on the group table,
+    then feature predicates one after the other, each only on the groups
+    left by the previous ones. Give the most selective predicates first.
+
+        result = (Query(archive)
+                  .stations(['KDEN', 'KMSP'])
+                  .valid(datetime(2015, 12, 1), datetime(2016, 3, 1))
+                  .where('clouds_ceiling_ft', '<', 10)
+                  .where('wx_modifier_FZ', '==', 1)
+                  .run())
+    """
+
+    def __init__(self, archive):
+        """
+        Args:
+            archive: Archive to query
+        """
+        _require_numpy()
+        self.archive = archive
+        self._stations = None
+        self._issued = None
+        self._valid = None
+        self._predicates = []
+
+    def stations(self, icao_codes):
+        """ Only selects groups of reports of the given stations """
+        if isinstance(icao_codes, str):
+            icao_codes = [icao_codes]
+        self._stations = np.array([code.encode('ascii') for code in icao_codes], dtype='S4')
+        return self
+
+    def issued(self, start=None, end=None):
+        """ Only selects groups of reports issued at or after start and before end """
+        self._issued = (start, end)
+        return self
+
+    def valid(self, start=None, end=None):
+        """ Only selects groups in force at some time at or after start and before end """
+        self._valid = (start, end)
+        return self
+
+    def where(self, name, op, value):
+        """ Only selects groups whose feature compares to value
+
+        A feature a group does not have is stored at its fill value in the
+        archive's schema: NaN for measurements, which then only match '!=',
+        and 0 for indicators, which then compare as 0 (e.g. 'wx_modifier_FZ'
+        '==' 0 matches every group without freezing weather).
+
+        Args:
+            name: feature name, see FeatureSchema
+            op: one of <, <=, >, >=, ==, != or 'in' (value is then a sequence)
+            value: number to compare the feature to
+
+        Raises:
+            ValueError: unknown feature or operator
+        """
+        if name not in self.archive.schema.index:
+            raise ValueError("Unknown feature %s" % name)
+        if op == 'in':
+            function = _in
+            value = np.asarray(value, dtype=self.archive.features.dtype)
+        elif op in _OPERATORS:
+            function = _OPERATORS[op]
+        else:
+            raise ValueError("Unknown operator %s" % op)
+        self._predicates.append((name, function, value))
+        return self
+
+    def run(self):
+        """ Returns QueryResult of the selected groups, in archive order """
+        archive = self.archive
+        reports = archive.reports
+
+        report_mask = None
+        if self._stations is not None:
+            report_mask = np.isin(reports['icao'], self._stations)
+        if self._issued is not None:
+            start, end = self._issued
+            issued = reports['issued']
+            if start is not None:
+                report_mask = _and(report_mask, issued >= to_epoch_minutes(start))
+            if end is not None:
+                report_mask = _and(report_mask, issued < to_epoch_minutes(end))
+
+        if report_mask is None:
+            candidates = np.arange(len(archive.groups))
+        else:
+            candidates = _report_groups(reports, np.flatnonzero(report_mask))
+
+        if self._valid is not None:
+            start, end = self._valid
+            groups = archive.groups[candidates]
+            mask = None
+            if start is not None:
+                mask = _and(mask, groups['end'] > to_epoch_minutes(start))
+            if end is not None:
+                mask = _and(mask, groups['start'] < to_epoch_minutes(end))
+            if mask is not None:
+                candidates = candidates[mask]
+
+        for name, function, value in self._predicates:
+            if not len(candidates):
+                break
+            candidates = candidates[function(archive.column(name)[candidates], value)]
+
+        return QueryResult(archive, candidates)
+
+
+def _and(mask, condition):
+    return condition if mask is None else mask & condition
+
+
+def _report_groups(reports, selected):
+    """ Returns indices of the groups of the selected reports """
+    counts = reports['group_count'][selected].astype(np.intp)
+    firsts = reports['first_group'][selected].astype(np.intp)
+    total = int(counts.sum())
+    # Position of every group within its report, added to the report's first group
+    starts = np.cumsum(counts) - counts
+    return np.repeat(firsts - starts, counts) + np.arange(total, dtype=np.intp)
+
+
+class QueryResult(object):
+    """ Groups selected by a Query
+
+    Attributes:
+        archive: the queried Archive
+        groups: indices of the selected groups in the archive
+    """
+
+    __slots__ = ('archive', 'groups')
+
+    def __init__(self, archive, groups):
+        self.archive = archive
+        self.groups = groups
+
+    def __len__(self):
+        return len(self.groups)
+
+    @property
+    def reports(self):
+        """ Report numbers of the selected groups """
+        return self.archive.groups['report'][self.groups]
+
+    def column(self, name):
+        """ Returns the values of a feature for the selected groups """
+        return self.archive.column(name)[self.groups]
+
+    def rows(self):
+        """ Yields (ICAO code, issue time, start time, end time, group type) of the selected groups """
+        archive = self.archive
+        groups = archive.groups[self.groups]
+        reports = archive.reports[groups['report']]
+        for icao_code, issued, start, end, type_code in zip(
+                reports['icao'].tolist(), reports['issued'].tolist(),
+                groups['start'].tolist(), groups['end'].tolist(), groups['type'].tolist()):
+            yield (icao_code.decode('ascii'), from_epoch_minutes(issued), from_epoch_minutes(start),
+                   from_epoch_minutes(end), archive.types[type_code])
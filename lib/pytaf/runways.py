@@ -0,0 +1,211 @@
+""" Runway-relative wind components of decoded forecasts
+
+Requires numpy, which is an optional dependency of pytaf.
+"""
+
+import csv
+
+from .parallel import DecodedTaf
+from .timeutil import np, _require_numpy
+
+KNOTS_PER_MPS = 1.943844
+
+# Added to the crosswind of runways with a tailwind when picking the best
+# runway, so that they are only picked if every runway has a tailwind
+_TAILWIND_PENALTY = 1000.0
+
+
+class RunwayWinds(object):
+    """ Wind components of the groups of a forecast on the runways of its station
+
+    All arrays are indexed [group, runway] and in knots. Components of groups
+    without wind are NaN.
+
+    Attributes:
+        runways: tuple of runway names
+        headings: runway headings in degrees
+        headwind: wind along the runway, negative for a tailwind
+        crosswind: wind across the runway, always positive
+        gust_crosswind: gust across the runway, NaN if the wind is not gusting
+        best: index of the best runway of every group, -1 for groups without
+            wind. It is the runway with the least (gust) crosswind, runways
+            with a tailwind are only picked if there is no other.
+    """
+
+    __slots__ = ('runways', 'headings', 'headwind', 'crosswind', 'gust_crosswind', 'best')
+
+    def __init__(self, runways, headings, headwind, crosswind, gust_crosswind, best):
+        self.runways = runways
+        self.headings = headings
+        self.headwind = headwind
+        self.crosswind = crosswind
+        self.gust_crosswind = gust_crosswind
+        self.best = best
+
+    def best_runways(self):
+        """ Returns the name of the best runway of every group, None for groups without wind """
+        return [self.runways[index] if index >= 0 else None for index in self.best]
+
+
+class RunwayTable(object):
+    """ Runway headings of stations, keyed by ICAO code """
+
+    def __init__(self):
+        self._runways = {}
+        self._arrays = {}
+
+    @classmethod
+    def from_csv(cls, csvfile):
+        """ Loads runways from a CSV file
+
+        The file must have a header row with 'icao', 'runway' and 'heading'
+        columns, other columns are ignored. Headings are true headings in
+        degrees, both ends of a runway are separate rows.
+
+        Args:
+            csvfile: path of the file, or an open file object
+
+        Raises:
+            ValueError: if a row is missing a column or the heading is not a number
+        """
+        table = cls()
+        if hasattr(csvfile, 'read'):
+            table._load(csvfile)
+        else:
+            with open(csvfile, newline='') as f:
+                table._load(f)
+        return table
+
+    def _load(self, f):
+        for line, row in enumerate(csv.DictReader(f), 2):
+            try:
+                self.add(row['icao'], row['runway'], float(row['heading']))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Invalid runway on line %d: %r" % (line, row))
+
+    def add(self, icao_code, runway, heading):
+        """ Adds a runway end to a station """
+        icao_code = icao_code.strip().upper()
+        self._runways.setdefault(icao_code, []).append((runway.strip(), float(heading) % 360))
+        self._arrays.pop(icao_code, None)
+
+    def runways(self, icao_code):
+        """ Returns (runway names, numpy array of headings) of a station
+
+        Raises:
+            KeyError: if the station has no runways in the table
+        """
+        arrays = self._arrays.get(icao_code)
+        if arrays is None:
+            _require_numpy()
+            runways = self._runways[icao_code]
+            arrays = (tuple(name for name, _ in runways),
+                      np.array([heading for _, heading in runways], dtype=np.float64))
+            self._arrays[icao_code] = arrays
+        return arrays
+
+    def __contains__(self, icao_code):
+        return icao_code in self._runways
+
+    def __len__(self):
+        return len(self._runways)
+
+    def winds(self, decoded):
+        """ Computes wind components on the runways of the station of a forecast
+
+        Args:
+            decoded: Decoder or DecodedTaf
+
+        Returns:
+            RunwayWinds with a row for every group of the forecast
+
+        Raises:
+            KeyError: if the station has no runways in the table
+        """
+        if isinstance(decoded, DecodedTaf):
+            icao_code = decoded.icao_code
+            forecasts = [group[3] for group in decoded.groups]
+        else:
+            icao_code = decoded._taf.get_header()['icao_code']
+            forecasts = [group.forecast for group in decoded.groups]
+
+        runways, headings = self.runways(icao_code)
+        return runway_winds(forecasts, headings, runways)
+
+
+def wind_arrays(forecasts):
+    """ Collects the wind of forecasts into arrays
+
+    Args:
+        forecasts: sequence of forecast dicts (TafGroup.forecast)
+
+    Returns:
+        (direction, speed, gust, variable) arrays with an item per forecast.
+        Speeds are in knots. Direction is NaN for variable wind, everything
+        but variable is NaN for forecasts without wind, gust is NaN if the
+        wind is not gusting.
+    """
+    _require_numpy()
+    count = len(forecasts)
+    direction = np.full(count, np.nan)
+    speed = np.full(count, np.nan)
+    gust = np.full(count, np.nan)
+    variable = np.zeros(count, dtype=bool)
+
+    for i, forecast in enumerate(forecasts):
+        if not forecast.get('wind'):
+            continue
+        if 'wind_speed_KT' in forecast:
+            speed[i] = forecast['wind_speed_KT']
+            gust[i] = forecast.get('wind_gust_KT', np.nan)
+        elif 'wind_speed_MPS' in forecast:
+            speed[i] = forecast['wind_speed_MPS'] * KNOTS_PER_MPS
+            gust[i] = forecast.get('wind_gust_MPS', np.nan) * KNOTS_PER_MPS
+        if forecast.get('wind_dir_variable'):
+            variable[i] = True
+        else:
+            direction[i] = forecast.get('wind_dir', np.nan)
+
+    return direction, speed, gust, variable
+
+
+def runway_winds(forecasts, headings, runways=None):
+    """ Computes wind components of forecasts on a set of runways
+
+    Variable wind is taken at its worst, that is a full crosswind on every
+    runway with no headwind.
+
+    Args:
+        forecasts: sequence of forecast dicts (TafGroup.forecast)
+        headings: sequence of runway headings in degrees
+        runways: runway names, the headings formatted as integers by default
+
+    Returns:
+        RunwayWinds
+    """
+    direction, speed, gust, variable = wind_arrays(forecasts)
+    headings = np.asarray(headings, dtype=np.float64)
+    if runways is None:
+        runways = tuple('%03d' % heading for heading in headings)
+
+    angle = np.radians(direction[:, np.newaxis] - headings[np.newaxis, :])
+    along = np.cos(angle)
+    across = np.abs(np.sin(angle))
+
+    # Variable wind: no help from a headwind, all of it across
+    along[variable] = 0.0
+    across[variable] = 1.0
+
+    headwind = speed[:, np.newaxis] * along
+    crosswind = speed[:, np.newaxis] * across
+    gust_crosswind = gust[:, np.newaxis] * across
+
+    best = np.full(len(direction), -1, dtype=np.intp)
+    if len(headings):
+        score = np.where(np.isnan(gust_crosswind), crosswind, gust_crosswind)
+        score = score + np.where(headwind < 0, _TAILWIND_PENALTY, 0.0)
+        known = ~np.isnan(speed)
+        if known.any():
+            best[known] = np.argmin(score[known], axis=1)
+
+    return RunwayWinds(tuple(runways), headings, headwind, crosswind, gust_crosswind, best)
@@ -0,0 +1,195 @@
+""" Splitting of files and buffers holding many TAF reports
+
+Handles concatenated reports as found in NOAA cycle files and WMO
+bulletins: reports end with "=", bulletins are framed with SOH/ETX and
+start with heading lines, cycle files have a date line before every
+report, and reports are wrapped over several lines.
+
+Reports are found in a single pass over the buffer, which may be a
+memory-mapped file, so memory use does not depend on the size of the
+input. Only the reports themselves are copied out of it.
+
+    with ReportFile("cycle.txt") as reports:
+        for report in reports:
+            taf = TAF(report)
+"""
+
+import mmap
+import re
+
+# Reports end with "=", bulletins are framed with SOH/ETX. Every report of
+# a cycle file comes after a date line, the only place a ":" can be in.
+_TERMINATOR = b"="
+_SOH = b"\x01"
+_ETX = b"\x03"
+_COLON = b":"
+_DATE_LINE_RE = re.compile(rb"[ \t]*\d{4}/\d{2}/\d{2}[ \t]+\d{2}:\d{2}[ \t\r]*(?:\n|$)")
+
+# Whitespace and lines that come before the first report of a bulletin:
+# WMO abbreviated heading (e.g. FTUS43 KMSP 212348), sequence number, AWIPS
+# identifier or end of message marker. Then the "TAF" (and modifier) line
+# of a bulletin, which applies to all its reports.
+_HEAD_RE = re.compile(rb"""
+    (?: \s+
+      | [ \t]* (?: [A-Z]{4}\d{2} [ \t]+ [A-Z]{4} [ \t]+ \d{6} (?:[ \t]+[A-Z]{3})? | \d{3,5} | [A-Z0-9]{4,6} )
+        [ \t\r]* (?:\n|$)
+    )*
+    (?: [ \t]* (?P<taf> TAF (?:[ \t]+(?:AMD|COR|RTD))? ) [ \t\r]* \n \s* )?
+""", re.VERBOSE)
+
+_TAF = b"TAF"
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+
+class ReportSpan(object):
+    """ Location of a report in a buffer
+
+    Attributes:
+        start, end: offsets of the report text, without the terminating "="
+            and surrounding whitespace
+        prefix: "TAF" line of the bulletin the report is in, if the report
+            does not start with "TAF" itself, otherwise empty
+        consumed: offset right after the report and its terminator
+    """
+
+    __slots__ = ('start', 'end', 'prefix', 'consumed')
+
+    def __init__(self, start, end, prefix, consumed):
+        self.start = start
+        self.end = end
+        self.prefix = prefix
+        self.consumed = consumed
+
+    def report(self, buffer):
+        """ Returns the report as bytes, with its prefix """
+        if self.prefix:
+            return self.prefix + b"\n" + buffer[self.start:self.end]
+        return buffer[self.start:self.end]
+
+    def __repr__(self):
+        return '<ReportSpan %d-%d %r>' % (self.start, self.end, self.prefix)
+
+
+def scan_reports(buffer, start=0, end=None, final=True):
+    """ Yields the reports of a buffer
+
+    Args:
+        buffer: bytes, bytearray or mmap
+        start, end: part of the buffer to scan
+        final: whether the end of the buffer ends a report; if not, text
+            after the last terminator is left alone, e.g. for a file that
+            is still being written
+
+    Yields:
+        ReportSpan of every report
+    """
+    if end is None:
+        end = len(buffer)
+
+    prefix = _TAF
+    position = start
+    for boundary, after, terminator in _boundaries(buffer, start, end):
+        span = _report_span(buffer, position, boundary, prefix, after)
+        if span is not None:
+            prefix = span.prefix or _TAF
+            yield span
+        if not terminator:
+            # New bulletin or cycle file record
+            prefix = _TAF
+        position = after
+
+    if final:
+        span = _report_span(buffer, position, end, prefix, end)
+        if span is not None:
+            yield span
+
+
+def _boundaries(buffer, start, end):
+    """ Yields (start, end, is terminator) of the boundaries between reports
+
+    Every kind of boundary is looked for with find, which is much faster
+    than a regular expression matching any of them.
+    """
+    def find(separator, position):
+        found = buffer.find(separator, position, end)
+        return end if found < 0 else found
+
+    terminator = find(_TERMINATOR, start)
+    soh = find(_SOH, start)
+    etx = find(_ETX, start)
+    colon = find(_COLON, start)
+    while True:
+        position = min(terminator, soh, etx, colon)
+        if position >= end:
+            return
+        if position == terminator:
+            terminator = find(_TERMINATOR, position + 1)
+            yield position, position + 1, True
+        elif position == soh:
+            soh = find(_SOH, position + 1)
+            yield position, position + 1, False
+        elif position == etx:
+            etx = find(_ETX, position + 1)
+            yield position, position + 1, False
+        else:
+            colon = find(_COLON, position + 1)
+            line = buffer.rfind(b"\n", start, position) + 1 or start
+            date = _DATE_LINE_RE.match(buffer, line, end)
+            if date is not None and date.end() > position:
+                colon = find(_COLON, date.end())
+                yield line, date.end(), False
+
+
+def _report_span(buffer, start, end, prefix, consumed):
+    """ Returns ReportSpan of the text between two boundaries, None if there is no report """
+    head = _HEAD_RE.match(buffer, start, end)
+    start = head.end()
+    if start >= end:
+        return None
+    if head.group('taf'):
+        prefix = head.group('taf')
+    elif buffer[start:start + len(_TAF)] == _TAF:
+        prefix = b""
+    while buffer[end - 1] in _WHITESPACE:
+        end -= 1
+    return ReportSpan(start, end, prefix, consumed)
+
+
+def iter_reports(buffer, start=0, end=None, final=True):
+    """ Yields the reports of a buffer as bytes, see scan_reports """
+    for span in scan_reports(buffer, start, end, final):
+        yield span.report(buffer)
+
+
+class ReportFile(object):
+    """ Memory-mapped file of reports
+
+    Iterating over it yields the reports as bytes. The file is mapped
+    read-only until closed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                self.buffer = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return iter_reports(self.buffer)
+
+    def spans(self, start=0, final=True):
+        """ Yields ReportSpan of the reports from start on, see scan_reports """
+        return scan_reports(self.buffer, start, None, final)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
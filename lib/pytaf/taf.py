@@ -1,5 +1,8 @@
 import re
+import mmap
 import logging
+from bisect import bisect_left
+from collections.abc import Mapping
 
 _modifiers = ['MI', 'BC', 'DR', 'BL', 'SH', 'TS', 'FZ', 'PR' ]
 _phenomena = ['DZ', 'RA', 'SN', 'SG', 'IC', 'PL', 'GR', 'GS', 'UP', 'BR', 'FG', 'FU', 'DU', 'SA', 'HZ', 'PY', 'VA',
@@ -9,19 +12,407 @@ _phenomena = ['DZ', 'RA', 'SN', 'SG', 'IC', 'PL', 'GR', 'GS', 'UP', 'BR', 'FG',
 WEATHER_PATTERNS = dict(zip(_modifiers, ['modifier']*len(_modifiers)))
 WEATHER_PATTERNS.update( dict(zip(_phenomena, ['phenomenon']*len(_phenomena))))
 
+# Report header, matched once per report. It is matched at the start of the
+# report, which is not the start of the buffer for bytes-like reports, so
+# it does not begin with ^.
+_TAF_HEADER_RE = re.compile(r"""
+    (TAF\s?)*    # TAF header (at times missing or duplicate)
+    \s+
+    (?P<type> (COR|AMD|RTD)){0,1} # Corrected/Amended/Delayed
+
+    \s* # There may or may not be space as COR/AMD/RTD is optional
+    (?P<icao_code> [A-Z]{4}) # Station ICAO code
+
+    \s* # at some aerodromes does not appear
+    (?P<origin_date> \d{0,2}) # at some aerodromes does not appear
+    (?P<origin_hours> \d{0,2}) # at some aerodromes does not appear
+    (?P<origin_minutes> \d{0,2}) # at some aerodromes does not appear
+    Z? # Zulu time (UTC, that is) # at some aerodromes does not appear
+
+    \s*
+    (?P<valid_from_date> \d{0,2})
+    (?P<valid_from_hours> \d{0,2})
+    /*
+    (?P<valid_till_date> \d{0,2})
+    (?P<valid_till_hours> \d{0,2})
+""", re.VERBOSE)
+
+# Group keywords, and characters a group may not contain (except as its first one)
+_GROUP_KEYWORDS = ("FM", "PROB", "TEMPO", "BECMG")
+_GROUP_UNEXPECTED_CHAR_RE = re.compile(r"[^A-Z0-9\+\-/\s$]")
+_GROUP_PREFIX_RE = re.compile(r"FM|PROB\d{1,2}\s*(?:TEMPO)?|TEMPO|BECMG")
+_GROUP_KEYWORD_RE = re.compile(r"FM|PROB|TEMPO|BECMG")
+_DIGIT_RE = re.compile(r"\d")
+_SPACES_RE = re.compile(r"\s*")
+
+# Precompiled token matchers used by TAF._parse_group.
+# Each one is applied at the start of a whitespace-delimited token,
+# so unlike the search patterns they do not need a lookbehind.
+_TOKEN_RE = re.compile(r"\S+")
+
+_FM_HEADER_RE = re.compile(r"""
+    (?P<type> FM) (?P<from_date>\d{2}) (?P<from_hours>\d{2})(?P<from_minutes> \d{2})
+""", re.VERBOSE)
+
+# PROB|TEMPO|BECMG header pattern, they have almost the same format
+_PTB_HEADER_RE = re.compile(r"""
+    (?P<type> (?:PROB(?P<probability>\d{1,2})\s*(?:TEMPO)?)|TEMPO|BECMG)
+    \s+
+    (?P<from_date> \d{2})
+    (?P<from_hours> \d{2})
+    /
+    (?P<till_date> \d{2})
+    (?P<till_hours> \d{2})
+""", re.VERBOSE)
+
+_WIND_RE = re.compile(r"""
+    (?P<direction> (\d{3}|VRB)) # Three digits or VRB
+    (?P<speed> \d{2,3})         # Next two digits are speed in knots
+    (G(?P<gust> \d{2,3})){0,1}  # Optional gust data (Gxx)
+    (?P<unit> KT|MPS)           # Knots or meters per second
+    (?= \s|$ )
+""", re.VERBOSE)
+
+# Visibility in statute miles, "1 1/2SM" spans two tokens
+_VISIBILITY_RE = re.compile(r"""
+    (?P<more> P){0,1} # "P" prefix indicates visibility more than
+    (?P<range> \d | \d/\d | \d\s\d/\d)    # More than 6 is always just P6SM
+    (?P<unit> SM)                # Statute miles
+    (?= \s|$ )
+""", re.VERBOSE)
+
+# Visibility in meters
+# XXX: In case "TEMPO 1012" style reports still exist,
+# it will not work as is and I haven't came up with a fix yet
+_VISIBILITY_METERS_RE = re.compile(r"""
+    (?P<range> \d{4})
+    (?= \s|$ )
+""", re.VERBOSE)
+
+_CLOUDS_RE = re.compile(r"""
+    (?P<layer> BKN|SCT|FEW|OVC)
+    (?P<ceiling> \d{3})
+    (?P<type> CU|CB|TCU|CI){0,1}
+    (?= \s|$ )
+""", re.VERBOSE)
+
+_SKY_CLEAR_RE = re.compile(r"""(SKC|CLR|NSC|CAVOK|CAVU)""")
+
+_VERTICAL_VISIBILITY_RE = re.compile(r"""
+    VV
+    (?P<vertical_visibility> \d{3} )
+    (?= \s|$ )
+""", re.VERBOSE)
+
+# XXX: The problem here is that from the intensity (+|-|VC), modifier (MI|BC|...)
+# and phenomenon (RA|SN|...) either one, two, or three can be present
+# which makes the detailed regex not specific enough and prone to catching
+# weird stuff.
+# So we first search for words that look like weather descriptors,
+# then analyze them in detail.
+# If there is a better way, it should be used here instead of this hack.
+_WEATHER_CODES = ["VC"] + _modifiers + _phenomena
+_WEATHER_WORD_RE = re.compile(r"(?:\+|\-|%s)+(?=\s|$)" % "|".join(_WEATHER_CODES))
+
+_WEATHER_INTENSITY_RE = re.compile(r"^(?P<intensity>[\+|\-|VC]{0,2})(?P<remainder>\w+)$")
+
+_WIND_SHEAR_RE = re.compile(r"""
+    WS (?P<altitude> \d{3})
+    /
+    (?P<direction> \d{3})
+    (?P<speed> \d{2})
+    (?P<unit> KT|MPS)
+""", re.VERBOSE)
+
+# Wind and windshear are the first kind tried on any token they can match,
+# so a group's wind (windshear) is the first token after its start that the
+# pattern matches, which a single search finds
+_WIND_SEARCH_RE = re.compile(r"(?<=\s)" + _WIND_RE.pattern, re.VERBOSE)
+_WIND_SHEAR_SEARCH_RE = re.compile(r"(?<=\s)" + _WIND_SHEAR_RE.pattern, re.VERBOSE)
+
+# Token kinds, and which of them a token may be judging by its first character
+_WIND, _VISIBILITY, _VISIBILITY_METERS, _CLOUDS, _VERTICAL_VISIBILITY, _WEATHER, _WINDSHEAR = range(7)
+
+_TOKEN_DISPATCH = {}
+for _char in "0123456789":
+    _TOKEN_DISPATCH[_char] = (_WIND, _VISIBILITY, _VISIBILITY_METERS)
+_TOKEN_DISPATCH["V"] = (_WIND, _VERTICAL_VISIBILITY)
+_TOKEN_DISPATCH["P"] = (_VISIBILITY,)
+for _char in "BSFO":
+    _TOKEN_DISPATCH[_char] = (_CLOUDS,)
+_TOKEN_DISPATCH["W"] = (_WINDSHEAR,)
+for _char in ["+", "-"] + [code[0] for code in _WEATHER_CODES]:
+    _TOKEN_DISPATCH[_char] = _TOKEN_DISPATCH.get(_char, ()) + (_WEATHER,)
+# Indexing bytes-like reports gives the character code
+for _char in list(_TOKEN_DISPATCH):
+    _TOKEN_DISPATCH[ord(_char)] = _TOKEN_DISPATCH[_char]
+del _char
+
+# Fields of a group dict, and the token kinds each one is made of. Sky clear
+# codes are looked for in tokens no kind matched, so clouds need all kinds.
+_GROUP_FIELDS = ('header', 'wind', 'visibility', 'clouds', 'vertical_visibility', 'weather', 'windshear')
+_FIELD_KINDS = {
+    'header': (),
+    'wind': (_WIND,),
+    'visibility': (_VISIBILITY, _VISIBILITY_METERS),
+    'clouds': tuple(range(7)),
+    'vertical_visibility': (_VERTICAL_VISIBILITY,),
+    'weather': (_WEATHER,),
+    'windshear': (_WINDSHEAR,),
+}
+_ALL_FIELDS = frozenset(_GROUP_FIELDS)
+
+# Fields found with a single search when parsed on their own -> syntax pattern
+_SEARCHED_FIELDS = {'wind': 'wind_search_re', 'windshear': 'wind_shear_search_re'}
+
+# Kinds that have to be matched along with a kind: those before it in some
+# dispatch tuple may take a token from it
+_KIND_REQUIRES = {kind: set() for kind in range(7)}
+for _kinds in _TOKEN_DISPATCH.values():
+    for _index, _kind in enumerate(_kinds):
+        _KIND_REQUIRES[_kind].update(_kinds[:_index])
+for _kind in _KIND_REQUIRES:
+    _required = _KIND_REQUIRES[_kind]
+    while True:
+        _closure = _required.union(*(_KIND_REQUIRES[k] for k in _required))
+        if _closure == _required:
+            break
+        _required = _closure
+    _KIND_REQUIRES[_kind] = frozenset(_required)
+del _kinds, _index, _kind, _required, _closure
+
+# Kinds to match -> (dispatch table restricted to them, token fields they complete)
+_RESTRICTED_DISPATCH = {}
+
+
+def _restricted_dispatch(fields):
+    """ Returns the dispatch table and the completed token fields (all but
+    the header) for parsing only some fields of a group """
+    kinds = set()
+    for field in fields:
+        for kind in _FIELD_KINDS[field]:
+            kinds.add(kind)
+            kinds.update(_KIND_REQUIRES[kind])
+    kinds = frozenset(kinds)
+    restricted = _RESTRICTED_DISPATCH.get(kinds)
+    if restricted is None:
+        dispatch = {}
+        for char, char_kinds in _TOKEN_DISPATCH.items():
+            char_kinds = tuple(kind for kind in char_kinds if kind in kinds)
+            if char_kinds:
+                dispatch[char] = char_kinds
+        completed = frozenset(field for field in _GROUP_FIELDS
+                              if field != 'header' and kinds.issuperset(_FIELD_KINDS[field]))
+        restricted = _RESTRICTED_DISPATCH[kinds] = (dispatch, completed)
+    return restricted
+
+# Characters str.strip() removes, as far as ASCII reports have them
+_ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_EQUALS = ord("=")
+
+
+class _TextSyntax(object):
+    """ Patterns and substring tests of the parser for str reports """
+
+    header_re = _TAF_HEADER_RE
+    group_unexpected_char_re = _GROUP_UNEXPECTED_CHAR_RE
+    group_prefix_re = _GROUP_PREFIX_RE
+    group_keyword_re = _GROUP_KEYWORD_RE
+    digit_re = _DIGIT_RE
+    spaces_re = _SPACES_RE
+    token_re = _TOKEN_RE
+    fm_header_re = _FM_HEADER_RE
+    ptb_header_re = _PTB_HEADER_RE
+    wind_re = _WIND_RE
+    visibility_re = _VISIBILITY_RE
+    visibility_meters_re = _VISIBILITY_METERS_RE
+    clouds_re = _CLOUDS_RE
+    sky_clear_re = _SKY_CLEAR_RE
+    vertical_visibility_re = _VERTICAL_VISIBILITY_RE
+    weather_word_re = _WEATHER_WORD_RE
+    wind_shear_re = _WIND_SHEAR_RE
+    wind_search_re = _WIND_SEARCH_RE
+    wind_shear_search_re = _WIND_SHEAR_SEARCH_RE
+
+    @staticmethod
+    def find(string, literal, start, end):
+        return string.find(literal, start, end)
+
+    @staticmethod
+    def startswith(string, literal, start, end):
+        return string.startswith(literal, start, end)
+
+    @staticmethod
+    def text(value):
+        return value
+
+    @staticmethod
+    def groupdict(match):
+        return match.groupdict()
+
+
+def _bytes_pattern(pattern):
+    """ Returns a str pattern compiled for bytes-like subjects """
+    return re.compile(pattern.pattern.encode('ascii'), pattern.flags & ~re.UNICODE)
+
+
+class _BytesSyntax(object):
+    """ Patterns and substring tests of the parser for bytes-like reports
+
+    The patterns are compiled from the same source as the str ones.
+    Literals are looked for with patterns as well, as memoryview and mmap
+    objects do not have all the str methods.
+    """
+
+    def __init__(self):
+        for name, value in vars(_TextSyntax).items():
+            if isinstance(value, re.Pattern):
+                setattr(self, name, _bytes_pattern(value))
+        self._literals = {}
+
+    def _literal(self, literal):
+        pattern = self._literals.get(literal)
+        if pattern is None:
+            pattern = self._literals[literal] = re.compile(re.escape(literal.encode('ascii')))
+        return pattern
+
+    def find(self, buffer, literal, start, end):
+        m = self._literal(literal).search(buffer, start, end)
+        return m.start() if m else -1
+
+    def startswith(self, buffer, literal, start, end):
+        return self._literal(literal).match(buffer, start, end) is not None
+
+    @staticmethod
+    def text(value):
+        return str(value, 'latin-1')
+
+    @staticmethod
+    def groupdict(match):
+        return {name: str(value, 'latin-1') if value is not None else None
+                for name, value in match.groupdict().items()}
+
+
+_TEXT_SYNTAX = _TextSyntax()
+_BYTES_SYNTAX = _BytesSyntax()
+
+
+def _strip_span(buffer, start, end):
+    """ Returns (start, end) of a bytes-like report without the whitespace
+    and "=" around it, as str.strip().strip('=').strip() would """
+    for skipped in (_ASCII_WHITESPACE, (_EQUALS,), _ASCII_WHITESPACE):
+        while start < end and buffer[start] in skipped:
+            start += 1
+        while end > start and buffer[end - 1] in skipped:
+            end -= 1
+    return start, end
+
+
+def _copy_fields(fields):
+    """ Returns copy of the parsed fields of a group, with their dicts and
+    lists of dicts copied too """
+    copied = {}
+    for key, value in fields.items():
+        if type(value) is dict:
+            value = value.copy()
+        elif type(value) is list:
+            value = [item.copy() for item in value]
+        copied[key] = value
+    return copied
+
+
 class MalformedTAF(Exception):
     def __init__(self, msg):
         self.strerror = msg
 
+
+def _parse_weather_token(weather_str):
+    """ Splits a present weather token into its codes
+
+    Returns:
+        dict of the 2-character codes mapped to their WEATHER_PATTERNS kind,
+        the intensity mapped to 'intensity' and the whole token to 'weather'
+    """
+    # First parse the intensity, which may or may not be present:
+    m = _WEATHER_INTENSITY_RE.match(weather_str)
+    if not m:
+        logging.warning('Unable to parse weather viscinity %s', weather_str)
+
+    intensity = m.group('intensity')
+    remainder = m.group('remainder')
+    wx_parts = [remainder[i:i + 2] for i in range(0, len(remainder), 2)] # split into 2-character chunks
+
+    results = {x: WEATHER_PATTERNS.get(x, None) for x in wx_parts}
+    results[intensity] = 'intensity'
+    results[weather_str] = 'weather'
+    return results
+
+
+class _LazyGroup(Mapping):
+    """ Group dict of a lazily parsed TAF
+
+    A field is parsed when it is first looked up, along with the fields its
+    tokens depend on, and then kept.
+    """
+
+    __slots__ = ('_taf', '_start', '_end', '_fields')
+
+    def __init__(self, taf, start, end):
+        self._taf = taf
+        self._start = start
+        self._end = end
+        self._fields = {}
+
+    def __getitem__(self, key):
+        fields = self._fields
+        if key not in fields:
+            taf = self._taf
+            if key == 'header':
+                fields[key] = taf._parse_group_header(taf._buffer, self._start, self._end)
+            elif key in _SEARCHED_FIELDS:
+                fields[key] = taf._search_group_field(taf._buffer, self._start, self._end, key)
+            elif key in _FIELD_KINDS:
+                fields.update(taf._parse_group(taf._buffer, self._start, self._end, (key,)))
+            else:
+                raise KeyError(key)
+        return fields[key]
+
+    def _copy(self, taf):
+        """ Returns copy of the group of the report copied to taf, with the fields parsed so far """
+        group = _LazyGroup(taf, self._start, self._end)
+        group._fields = _copy_fields(self._fields)
+        return group
+
+    def __iter__(self):
+        return iter(_GROUP_FIELDS)
+
+    def __len__(self):
+        return len(_GROUP_FIELDS)
+
+    def __repr__(self):
+        return '<_LazyGroup %d-%d %r>' % (self._start, self._end, self._fields)
+
+
 class TAF(object):
     """ TAF "envelope" parser """
 
-    def __init__(self, string):
+    def __init__(self, string, lazy=False):
         """ 
         Initializes the object with TAF report text.
 
+        In lazy mode only the header is parsed here. The groups are split
+        when get_groups() is first called, and each field of a group is
+        parsed when it is first looked up. Errors in the groups are then
+        raised by get_groups().
+
+        The report may also be given as ASCII bytes, bytearray, memoryview
+        or mmap. It is then parsed in place, at offsets into the buffer, and
+        only the field values are copied out of it; the report text itself
+        is only made a str when get_taf() is called.
+
         Args:
             string: TAF report string
+            lazy: whether to parse groups only when they are accessed
 
         Raises:
             MalformedTAF: An error parsing the TAF report
@@ -29,39 +420,55 @@ class TAF(object):
 
         # Instance variables
         self._raw_taf = None
+        self._buffer = None
+        self._span = None
+        self._syntax = _TEXT_SYNTAX
         self._taf_header = None
-        self._raw_weather_groups = []
+        self._group_spans = []
         self._weather_groups = []
         self._maintenance = None
 
         if isinstance(string, str) and string != "":
             # strip out white space and =
             string = string.strip().strip('=')
-            self._raw_taf = string
+            # Patterns use $, so we don't want
+            # leading/trailing spaces
+            self._raw_taf = string.strip()
+            buffer, start, end = self._raw_taf, 0, len(self._raw_taf)
+        elif isinstance(string, (bytes, bytearray, memoryview, mmap.mmap)) and len(string):
+            if isinstance(string, memoryview) and string.format != 'B':
+                string = string.cast('B')
+            self._syntax = _BYTES_SYNTAX
+            buffer = string
+            start, end = _strip_span(buffer, 0, len(buffer))
         else:
             raise MalformedTAF("TAF string expected")
 
-        # Patterns use ^ and $, so we don't want
-        # leading/trailing spaces
-        self._raw_taf = self._raw_taf.strip()
+        self._buffer = buffer
+        self._span = (start, end)
 
         # Initialize header part
-        self._taf_header = self._init_header(self._raw_taf)
+        self._taf_header = self._init_header(buffer, start, end)
+        self._maintenance = self._parse_maintenance(buffer, start, end)
+
+        if lazy:
+            self._group_spans = None
+            self._weather_groups = None
+            return
 
         # Get weather groups
-        self._raw_weather_groups = self._init_groups(self._raw_taf)
+        self._group_spans = self._init_groups(buffer, start, end)
 
-        for group in self._raw_weather_groups:
-            parsed_group = self._parse_group(group)
+        for group_start, group_end in self._group_spans:
+            parsed_group = self._parse_group(buffer, group_start, group_end)
             self._weather_groups.append(parsed_group)
 
-        self._maintenance = self._parse_maintenance(self._raw_taf)
-
-    def _init_header(self, string):
+    def _init_header(self, string, start=0, end=None):
         """ Extracts header part from TAF string and populates header dict
 
         Args:
-            TAF report string
+            string: TAF report string
+            start, end: offsets of the report in the string
 
         Raises:
             MalformedTAF: An error parsing the report
@@ -70,276 +477,328 @@ class TAF(object):
             Header dictionary
         """
 
-        taf_header_pattern = """
-            ^
-            (TAF\s?)*    # TAF header (at times missing or duplicate)
-            \s+
-            (?P<type> (COR|AMD|RTD)){0,1} # Corrected/Amended/Delayed
-             
-            \s* # There may or may not be space as COR/AMD/RTD is optional
-            (?P<icao_code> [A-Z]{4}) # Station ICAO code
-            
-            \s* # at some aerodromes does not appear
-            (?P<origin_date> \d{0,2}) # at some aerodromes does not appear
-            (?P<origin_hours> \d{0,2}) # at some aerodromes does not appear
-            (?P<origin_minutes> \d{0,2}) # at some aerodromes does not appear
-            Z? # Zulu time (UTC, that is) # at some aerodromes does not appear
-            
-            \s*
-            (?P<valid_from_date> \d{0,2})
-            (?P<valid_from_hours> \d{0,2})
-            /*
-            (?P<valid_till_date> \d{0,2})
-            (?P<valid_till_hours> \d{0,2})
-        """
-
-        header = re.match(taf_header_pattern, string, re.VERBOSE)
+        if end is None:
+            end = len(string)
+        header = self._syntax.header_re.match(string, start, end)
 
-        
         if header:
-            header = header.groupdict()
+            header = self._syntax.groupdict(header)
+            # Group type of the initial group, COR/AMD/RTD is kept as modifier
+            header["modifier"] = header["type"]
             header["type"] = "MAIN"
             return header
         else:
             raise MalformedTAF("No valid TAF header found")
 
-    def _init_groups(self, string):
+    def _init_groups(self, string, start=0, end=None):
         """ Extracts weather groups (FM, PROB etc.) and populates group list
 
+        A group starts at a FM/PROB/TEMPO/BECMG keyword (or any other character)
+        and runs up to the next keyword or the end of the report. A group
+        that runs into a character matched by _GROUP_UNEXPECTED_CHAR_RE
+        is dropped. These are the boundaries the old lazy lookahead pattern
+        produced, but keywords and unexpected characters are located once
+        and the report is then walked group by group, so the cost is linear
+        in the report length.
+
         Args:
-            TAF report string
+            string: TAF report string
+            start, end: offsets of the report in the string
 
         Raises:
             MalformedTAF: Group decoding error
-        
-        """
-        
-        taf_group_pattern = """
-            (?:FM|(?:PROB(?:\d{1,2})\s*(?:TEMPO)?)|TEMPO|BECMG|[\S\s])[A-Z0-9\+\-/\s$]+?(?=FM|PROB|TEMPO|BECMG|$)
+
+        Returns:
+            List of (start, end) offsets of the groups in the string
         """
 
+        syntax = self._syntax
+        length = len(string) if end is None else end
+
+        # End of report ends a group just like a keyword does
+        keywords = []
+        for keyword in _GROUP_KEYWORDS:
+            offset = syntax.find(string, keyword, start, length)
+            while offset != -1:
+                keywords.append(offset)
+                offset = syntax.find(string, keyword, offset + 1, length)
+        keywords.sort()
+        keywords.append(length)
+        unexpected = [m.start() for m in syntax.group_unexpected_char_re.finditer(string, start, length)]
+        unexpected.append(length)
+
         group_list = []
 
-        groups = re.findall(taf_group_pattern, string, re.VERBOSE)
-        if not groups:
+        next_keyword = 0
+        while start < length:
+            # Common case: the longest group prefix is followed by a body
+            # that reaches the next keyword
+            end = None
+            prefix = syntax.group_prefix_re.match(string, start, length)
+            body = prefix.end() if prefix else start + 1
+            if body < length:
+                while keywords[next_keyword] <= body:
+                    next_keyword += 1
+                end = keywords[next_keyword]
+                if end > unexpected[bisect_left(unexpected, body)]:
+                    end = None
+
+            # Otherwise try shorter prefixes, as the regex engine would
+            if end is None:
+                for body in self._group_body_offsets(string, start, length):
+                    end = self._group_end(keywords, unexpected, body, length)
+                    if end is not None:
+                        break
+
+            if end is not None:
+                group_list.append((start, end))
+                start = end
+                continue
+
+            # No group can start before the next unexpected character,
+            # except for a keyword right after the failed position
+            next_unexpected = unexpected[bisect_left(unexpected, start + 1)]
+            if start + 1 < next_unexpected and syntax.group_keyword_re.match(string, start + 1, length):
+                start += 1
+            else:
+                start = max(start + 1, next_unexpected)
+
+        if not group_list:
             raise MalformedTAF("No valid groups found")
 
-        for group in groups:
-            group_list.append(group)
-
         return(group_list)
 
-    def _parse_group(self, string):
-        group = {}
+    def _group_body_offsets(self, string, start, end=None):
+        """ Yields possible offsets of the group body following its keyword,
+        in the order a backtracking regex engine would try them """
 
-        group["header"] = self._parse_group_header(string)
-        group["wind"] = self._parse_wind(string)
-        group["visibility"] = self._parse_visibility(string)
-        group["clouds"] = self._parse_clouds(string)
-        group["vertical_visibility"] = self._parse_vertical_visibility(string)
-        group["weather"] = self._parse_weather_phenomena(string)
-        group["windshear"] = self._parse_wind_shear(string)
+        syntax = self._syntax
+        if end is None:
+            end = len(string)
 
-        return(group)
-         
-    def _parse_group_header(self, string):
-        # From header pattern
-        fm_pattern = """
-            (?P<type> FM) (?P<from_date>\d{2}) (?P<from_hours>\d{2})(?P<from_minutes> \d{2})
-        """
-        
-        # PROB|TEMPO|BECMG header pattern, they have almost the same format
-        ptb_pattern = """
-            (?P<type> (?:PROB(?P<probability>\d{1,2})\s*(?:TEMPO)?)|TEMPO|BECMG)
-            \s+
-            (?P<from_date> \d{2})
-            (?P<from_hours> \d{2})
-            /
-            (?P<till_date> \d{2})
-            (?P<till_hours> \d{2})
-        """
+        if syntax.startswith(string, "FM", start, end):
+            yield start + 2
 
-        header = {}
+        if syntax.startswith(string, "PROB", start, end):
+            # PROB\d{1,2}\s*(TEMPO)?
+            digits = start + 4
+            while digits < start + 6 and syntax.digit_re.match(string, digits, end):
+                digits += 1
+            for probability_end in range(digits, start + 4, -1):
+                space_end = syntax.spaces_re.match(string, probability_end, end).end()
+                for body in range(space_end, probability_end - 1, -1):
+                    if syntax.startswith(string, "TEMPO", body, end):
+                        yield body + 5
+                    yield body
 
-        # Get type and associated fields
-        fm = re.search(fm_pattern, string, re.VERBOSE)
-        if fm:
-            header = fm.groupdict()
+        if syntax.startswith(string, "TEMPO", start, end) or syntax.startswith(string, "BECMG", start, end):
+            yield start + 5
 
-        ptb = re.search(ptb_pattern, string, re.VERBOSE)
-        if ptb:
-            header = ptb.groupdict()
+        # Any character may start a group
+        yield start + 1
 
-        return(header)
+    def _group_end(self, keywords, unexpected, body, length):
+        """ Returns the end of a group whose body starts at the given offset,
+        or None if no group can start there """
 
-    def _parse_wind(self, string):
-        wind_pattern = """
-            (?<= \s )
-            (?P<direction> (\d{3}|VRB)) # Three digits or VRB
-            (?P<speed> \d{2,3})         # Next two digits are speed in knots
-            (G(?P<gust> \d{2,3})){0,1}  # Optional gust data (Gxx)
-            (?P<unit> KT|MPS)           # Knots or meters per second
-            (?= \s|$ )
-        """
-
-        wind = re.search(wind_pattern, string, re.VERBOSE)
-
-        if wind:
-            return(wind.groupdict())
-        else:
+        if body >= length:
             return(None)
 
-    def _parse_visibility(self, string):
-        # Visibility in statute miles
-        visibility_pattern = """
-            (?<= \s )
-            (?P<more> P){0,1} # "P" prefix indicates visibility more than
-            (?P<range> \d | \d/\d | \d\s\d/\d)    # More than 6 is always just P6SM
-            (?P<unit> SM)                # Statute miles
-            (?= \s|$ )
-        """
+        # The body is at least one character long
+        end = keywords[bisect_left(keywords, body + 1)]
+        if end <= unexpected[bisect_left(unexpected, body)]:
+            return(end)
+        return(None)
 
-        # Visibility in meters
-        # XXX: In case "TEMPO 1012" style reports still exist,
-        # it will not work as is and I haven't came up with a fix yet
-        visibility_meters_pattern = """
-            (?<= \s )
-            (?P<range> \d{4})
-            (?= \s|$ )
-        """
+    def _parse_group(self, string, start=0, end=None, fields=None):
+        """ Parses a weather group in a single pass over its tokens
 
-        visibility = {}
+        The group is split into whitespace-separated tokens once, and every
+        token is handed only to the matchers that can accept its first
+        character (see _TOKEN_DISPATCH). The first match of each kind wins,
+        cloud layers and weather words accumulate, which gives the same
+        result as searching the whole group with every pattern in turn.
 
-        # US-style
-        visibility_sm = re.search(visibility_pattern, string, re.VERBOSE)
-        if visibility_sm:
-            visibility = visibility_sm.groupdict()
-         
-        # Metric style
-        visibility_meters = re.search(visibility_meters_pattern, string, re.VERBOSE)
-        if visibility_meters:
-            visibility["range"] = visibility_meters.group("range")
-            # 9999 in fact means "more than 10 km"
-            if visibility_meters.group("range") == "9999":
-                visibility["more"] = True
-                visibility["range"] = "10 000"
-            visibility["unit"] = "M"
-
-        return(visibility)
+        Args:
+            string: TAF report string (or a single group string)
+            start, end: offsets of the group in the string
+            fields: names of the group dict fields to parse, all if None.
+                Fields their tokens depend on are parsed as well.
 
-    def _parse_clouds(self, string):
-        clouds_pattern = """
-            (?<= \s )
-            (?P<layer> BKN|SCT|FEW|OVC)
-            (?P<ceiling> \d{3})
-            (?P<type> CU|CB|TCU|CI){0,1}
-            (?= \s|$ )
+        Returns:
+            Group dictionary, of the parsed fields only
         """
 
-        special_case_pattern = """ (SKC|CLR|NSC|CAVOK|CAVU) """
-
+        if fields is None:
+            dispatch, completed = _TOKEN_DISPATCH, _ALL_FIELDS
+        else:
+            dispatch, completed = _restricted_dispatch(fields)
+            if 'header' in fields:
+                completed = completed | {'header'}
+        find_clear = 'clouds' in completed
+
+        syntax = self._syntax
+        wind = None
+        visibility_sm = None
+        visibility_meters = None
         clouds = []
+        clear = None
+        vertical_visibility = None
+        weather = []
+        windshear = None
+
+        if end is None:
+            end = len(string)
+
+        for token_match in syntax.token_re.finditer(string, start, end) if dispatch else ():
+            token_start = token_match.start()
+
+            # All token patterns require whitespace in front of the token
+            kinds = ()
+            if token_start > start:
+                first = string[token_start]
+                kinds = dispatch.get(first, ())
+                if not kinds and isinstance(first, str) and first.isdecimal():
+                    kinds = dispatch.get("0", ())
+
+            matched = False
+            for kind in kinds:
+                if kind == _WIND:
+                    if wind is None:
+                        m = syntax.wind_re.match(string, token_start, end)
+                        if m:
+                            wind = syntax.groupdict(m)
+                            matched = True
+                elif kind == _VISIBILITY:
+                    if visibility_sm is None:
+                        m = syntax.visibility_re.match(string, token_start, end)
+                        if m:
+                            visibility_sm = m
+                            matched = True
+                elif kind == _VISIBILITY_METERS:
+                    if visibility_meters is None:
+                        m = syntax.visibility_meters_re.match(string, token_start, end)
+                        if m:
+                            visibility_meters = m
+                            matched = True
+                elif kind == _CLOUDS:
+                    m = syntax.clouds_re.match(string, token_start, end)
+                    if m:
+                        clouds.append(syntax.groupdict(m))
+                        matched = True
+                elif kind == _VERTICAL_VISIBILITY:
+                    if vertical_visibility is None:
+                        m = syntax.vertical_visibility_re.match(string, token_start, end)
+                        if m:
+                            vertical_visibility = syntax.text(m.group("vertical_visibility"))
+                            matched = True
+                elif kind == _WEATHER:
+                    m = syntax.weather_word_re.match(string, token_start, end)
+                    if m:
+                        weather.append(self._parse_weather_phenomena_str(syntax.text(m.group())))
+                        matched = True
+                elif kind == _WINDSHEAR:
+                    if windshear is None:
+                        m = syntax.wind_shear_re.match(string, token_start, end)
+                        if m:
+                            windshear = syntax.groupdict(m)
+                            matched = True
+                if matched:
+                    break
+
+            # Sky clear codes are not delimited, so they may hide inside
+            # any token that is not a valid token of some other kind, or
+            # after the end of a windshear match, which is not delimited either
+            if clear is None and find_clear and (not matched or m.end() < token_match.end()):
+                m = syntax.sky_clear_re.search(string, token_start, token_match.end())
+                if m:
+                    clear = syntax.text(m.group(0))
 
-        clear = re.search(special_case_pattern, string, re.VERBOSE)
-        if clear:
-            clouds.append({"layer": clear.group(0)})
-            return(clouds)
-
-        cloud_layers = re.finditer(clouds_pattern, string, re.VERBOSE)
-        for layer in cloud_layers:
-            # SKC or CLR mean "sky clear", nothing to do
-#            if layer.group("layer") == "SKC" or layer.group("layer") == "CLR":
-#                clouds = []
-#                break
- #           else:
-            clouds.append(layer.groupdict())
-          
-        return(clouds)
-
-    def _parse_vertical_visibility(self, string):
-
-        vertical_visibility_pattern = """
-            (?<= \s )
-            VV
-            (?P<vertical_visibility> \d{3} )
-            (?= \s|$ )
-        """
+        group = {}
 
-        vertical_visibility = None
+        if "header" in completed:
+            group["header"] = self._parse_group_header(string, start, end)
+        if "wind" in completed:
+            group["wind"] = wind
+        if "visibility" in completed:
+            group["visibility"] = self._build_visibility(visibility_sm, visibility_meters)
+        if "clouds" in completed:
+            if clear:
+                group["clouds"] = [{"layer": clear}]
+            else:
+                group["clouds"] = clouds
+        if "vertical_visibility" in completed:
+            group["vertical_visibility"] = vertical_visibility
+        if "weather" in completed:
+            group["weather"] = weather
+        if "windshear" in completed:
+            group["windshear"] = windshear
 
-        vv = re.search(vertical_visibility_pattern, string, re.VERBOSE)
-        if vv:
-            vertical_visibility = vv.group("vertical_visibility")
+        return(group)
 
-        return(vertical_visibility)
+    def _search_group_field(self, string, start, end, field):
+        """ Returns wind or windshear field of a group, as _parse_group
+        would, see _SEARCHED_FIELDS """
+        syntax = self._syntax
+        m = getattr(syntax, _SEARCHED_FIELDS[field]).search(string, start + 1, end)
+        return syntax.groupdict(m) if m else None
 
-    def _parse_weather_phenomena(self, string):
+    def _parse_group_header(self, string, start=0, end=None):
+        syntax = self._syntax
+        header = {}
 
+        if end is None:
+            end = len(string)
 
-        # XXX: The problem here is that from the intensity (+|-|VC), modifier (MI|BC|...)
-        # and phenomenon (RA|SN|...) either one, two, or three can be present
-        # which makes the detailed regex not specific enough and prone to catching
-        # weird stuff.
-        # So we first search for words that look like weather descriptors,
-        # then analyze them in detail.
-        # If there is a better way, it should be used here instead of this hack.
-        weather_word_pattern = """
-          (?<= \s )
-          ( (?: \+|\-|VC|MI|BC|DR|BL|SH|TS|FZ|PR|DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|DU|SA|HZ|PY|VA|PO|SQ|FC|SS|DS)+ )
-          (?= \s|$)
-        """
-        weather_words = re.findall(weather_word_pattern, string, re.VERBOSE)
+        # Get type and associated fields. Keywords may sit anywhere in the
+        # group, a substring test is much cheaper than a failed search.
+        if syntax.find(string, "FM", start, end) != -1:
+            fm = syntax.fm_header_re.search(string, start, end)
+            if fm:
+                header = syntax.groupdict(fm)
 
-        weather = []
-        for word in weather_words:
-            weather.append(self._parse_weather_phenomena_str(word))
-        return weather
+        if (syntax.find(string, "PROB", start, end) != -1 or syntax.find(string, "TEMPO", start, end) != -1
+                or syntax.find(string, "BECMG", start, end) != -1):
+            ptb = syntax.ptb_header_re.search(string, start, end)
+            if ptb:
+                header = syntax.groupdict(ptb)
 
-    def _parse_weather_phenomena_str(self, weather_str):
-        # First parse the intensity, which may or may not be present:
-        viscinity_pattern = re.compile("^(?P<intensity>[\+|\-|VC]{0,2})(?P<remainder>\w+)$")
-        m = viscinity_pattern.match(weather_str)
-        if not m:
-            logging.warning('Unable to parse weather viscinity %s', weather_str)
-
-        intensity = m.group('intensity')
-        remainder = m.group('remainder')
-        wx_parts = [remainder[i:i + 2] for i in range(0, len(remainder), 2)] # split into 2-character chunks
-
-        results = {x: WEATHER_PATTERNS.get(x, None) for x in wx_parts}
-        results[intensity] = 'intensity'
-        results[weather_str] = 'weather'
-        return results
-
-    def _parse_wind_shear(self, string):
-        wind_shear_pattern = """
-            \s+
-            WS (?P<altitude> \d{3})
-            /
-            (?P<direction> \d{3})
-            (?P<speed> \d{2})
-            (?P<unit> KT|MPS)
-        """
+        return(header)
 
-        windshear = re.search(wind_shear_pattern, string, re.VERBOSE)
+    def _build_visibility(self, visibility_sm, visibility_meters):
+        visibility = {}
 
-        if windshear:
-            return(windshear.groupdict())
-        else:
-            return(None)
+        # US-style
+        if visibility_sm:
+            visibility = self._syntax.groupdict(visibility_sm)
 
-    def _parse_maintenance(self, string):
-        maintenance_pattern = """ ( \$ ) """
+        # Metric style
+        if visibility_meters:
+            visibility["range"] = self._syntax.text(visibility_meters.group("range"))
+            # 9999 in fact means "more than 10 km"
+            if visibility["range"] == "9999":
+                visibility["more"] = True
+                visibility["range"] = "10 000"
+            visibility["unit"] = "M"
 
-        maintenance = re.search(maintenance_pattern, string, re.VERBOSE)
+        return(visibility)
+
+    def _parse_weather_phenomena_str(self, weather_str):
+        return _parse_weather_token(weather_str)
 
-        if maintenance:
-            return(maintenance.group(0))
+    def _parse_maintenance(self, string, start=0, end=None):
+        if end is None:
+            end = len(string)
+        if self._syntax.find(string, "$", start, end) != -1:
+            return("$")
         else:
             return(None)
             
     def get_taf(self):
         """ Return raw TAF string the object was initialized with """
+        if self._raw_taf is None:
+            start, end = self._span
+            self._raw_taf = self._syntax.text(self._buffer[start:end])
         return self._raw_taf
 
     def get_header(self):
@@ -348,11 +807,26 @@ class TAF(object):
 
     def get_groups(self):
         """ Return weather groups (initial and FM's) """
+        if self._weather_groups is None:
+            self._group_spans = self._init_groups(self._buffer, *self._span)
+            self._weather_groups = [_LazyGroup(self, start, end) for start, end in self._group_spans]
         return(self._weather_groups)
 
     def get_maintenance(self):
         """ Return station maintenance indicator """
         return(self._maintenance)
 
+    def _copy(self):
+        """ Returns copy of the object with its own header and groups,
+        sharing only the report text """
+        taf = TAF.__new__(TAF)
+        taf.__dict__.update(self.__dict__)
+        taf._taf_header = self._taf_header.copy()
+        if self._weather_groups is not None:
+            taf._group_spans = list(self._group_spans)
+            taf._weather_groups = [group._copy(taf) if isinstance(group, _LazyGroup) else _copy_fields(group)
+                                   for group in self._weather_groups]
+        return taf
+
     def __repr__(self):
         return self.get_taf()
@@ -1,11 +1,13 @@
-from calendar import monthrange
-import copy
+from bisect import bisect_right
 import re
 from datetime import datetime, timedelta
 import logging
 import math
+import sys
 from operator import attrgetter
-from .taf import TAF
+from collections.abc import Mapping
+from . import timeutil
+from .taf import TAF, _modifiers, _phenomena, _parse_weather_token, _WEATHER_INTENSITY_RE
 
 
 class DecodeError(Exception):
@@ -13,17 +15,138 @@ class DecodeError(Exception):
         self.strerror = msg
 
 
+# Feature name prefixes -> TafGroup attribute (feature family) the feature
+# is decoded in, the first matching prefix wins
+_FEATURE_FAMILY_PREFIXES = (
+    ('windshear', 'windshear'), ('wind', 'wind'), ('visibility', 'visibility'),
+    ('clouds_', 'clouds'), ('sky_clear', 'clouds'), ('weather', 'weather'), ('wx_', 'weather'))
+
+# Features only decoded when asked for by name, see Decoder
+OPT_IN_FEATURES = frozenset(['clouds_ceiling_broken_ft'])
+
+
+def _projection(fields):
+    """ Returns dict of the feature families to decode, mapped to the set of
+    their features to keep, or to None to keep all of them
+
+    Raises:
+        ValueError: unknown family or feature
+    """
+    projection = {}
+    for name in fields:
+        if name in TafGroup.ATTRIBUTES:
+            projection[name] = None
+            continue
+        if name == 'prob':
+            # Kept in every forecast
+            continue
+        for prefix, family in _FEATURE_FAMILY_PREFIXES:
+            if name.startswith(prefix):
+                break
+        else:
+            raise ValueError("Unknown feature %s" % name)
+        if family not in projection:
+            projection[family] = set()
+        if projection[family] is not None:
+            projection[family].add(name)
+    return projection
+
+
+class _Anchorings(object):
+    """ Anchorings of a report, shared by the decoders anchored from one another """
+
+    __slots__ = ('templates', 'groups')
+
+    def __init__(self):
+        # Groups as decoded from the report, before they are anchored
+        self.templates = None
+        # Lengths of the month of issue and of the next one -> (issue
+        # time, groups) anchored for them, see Decoder._anchor_groups
+        self.groups = {}
+
+
 class Decoder(object):
-    def __init__(self, taf, taf_timestamp):
+    def __init__(self, taf, taf_timestamp, fields=None):
+        """
+        Args:
+            taf: TAF object
+            taf_timestamp: datetime in the month the report was issued in,
+                the current time if None
+            fields: feature families ('wind', 'visibility', 'clouds',
+                'weather', 'windshear') and/or individual features (e.g.
+                'wind_speed_KT', 'clouds_ceiling_ft') to decode, all if None.
+                Forecasts then only have these (and 'prob'). With a lazy TAF
+                only the group fields they are decoded from are parsed.
+                Features of OPT_IN_FEATURES are only decoded when named here.
+
+        Raises:
+            DecodeError: taf is not a TAF object
+            ValueError: unknown family or feature
+        """
+        self._projection = _projection(fields) if fields is not None else None
+        self._opt_in = OPT_IN_FEATURES.intersection(fields) if fields is not None else frozenset()
         if isinstance(taf, TAF):
             self._taf = taf
-            try:
-                self._decode_groups(taf_timestamp)
-            except ValueError:
-                logging.warning('Error decoding taf: ' + taf._raw_taf)
+            # Made on the first anchor() call
+            self._anchorings = None
+            self._decode(taf_timestamp)
         else:
             raise DecodeError("Argument is not a TAF parser object")
 
+    def anchor(self, taf_timestamp):
+        """ Returns Decoder of the same report, issued in the month of another timestamp
+
+        The groups of a report are decoded once, whatever month it is
+        anchored in. Anchoring only works out the times of the groups, the
+        groups filling the gaps between them and the groups completed with
+        the ones they temporarily change, which can all differ from month
+        to month (e.g. the 31st of a 30-day month). Use it to try the
+        candidate issue months of a report that lacks them.
+
+        The first call decodes the groups once more, to keep them apart
+        from those of this decoder, the next ones only anchor them.
+
+        Args:
+            taf_timestamp: datetime in the month the report was issued in,
+                the current time if None
+        """
+        decoder = Decoder.__new__(Decoder)
+        decoder._projection = self._projection
+        decoder._opt_in = self._opt_in
+        decoder._taf = self._taf
+        if self._anchorings is None:
+            self._anchorings = _Anchorings()
+        decoder._anchorings = self._anchorings
+        decoder._decode(taf_timestamp)
+        return decoder
+
+    def _copy(self):
+        """ Returns copy of the decoder that shares nothing its user can change
+
+        The copy has its own TAF, group list and groups, with their own
+        headers and decoded values.
+        """
+        decoder = Decoder.__new__(Decoder)
+        decoder.__dict__.update(self.__dict__)
+        decoder._taf = self._taf._copy()
+        decoder.groups = [group._unshared() for group in self.groups]
+        # The arrays handed out by group_times are built again
+        decoder._minutes = None
+        return decoder
+
+    def _decode(self, taf_timestamp):
+        # Whether decoding went through. If it did not, the groups decoded
+        # so far are kept, if any.
+        self._decoded = False
+        try:
+            self._decode_groups(taf_timestamp)
+            self._decoded = True
+        except ValueError:
+            logging.warning('Error decoding taf: ' + self._taf.get_taf())
+            if not hasattr(self, 'groups'):
+                self.groups = []
+        self._index_groups()
+
     def decode_taf(self):
         result = ""
 
@@ -56,17 +179,197 @@ class Decoder(object):
         return(result)
 
     def get_group(self, timestamp):
-        # return the group that contains timestamp
-        for group in self.groups:
-            if group.start_time <= timestamp < group.end_time:
-                return group
+        """ Returns the group in force at timestamp, or None if there is none
+
+        If groups overlap, the one that comes first in self.groups is returned.
+        The end of the last group is still considered to be covered by it.
+        """
+        if self._group_starts is None:
+            return self._scan_groups(timestamp)
+        # Groups are sorted by start time, so the candidates are the ones
+        # before the first group starting later than timestamp. The first of
+        # them that ends after timestamp is where the running maximum of end
+        # times first exceeds it.
+        count = bisect_right(self._group_starts, timestamp)
+        index = bisect_right(self._group_end_max, timestamp)
+        return self._indexed_group(index, count, timestamp)
+
+    def get_groups(self, timestamps):
+        """ Returns the groups in force at each of the timestamps
+
+        Sorted timestamps are resolved in one merge pass over the groups,
+        unsorted ones are looked up one by one.
+
+        Args:
+            timestamps: sequence of datetime objects, preferably sorted
+
+        Returns:
+            List of the same length as timestamps, with None for the
+            timestamps no group is in force at
+        """
+        starts = self._group_starts
+        end_max = self._group_end_max
+        if starts is None:
+            return [self._scan_groups(timestamp) for timestamp in timestamps]
+        length = len(starts)
+
+        result = []
+        count = 0
+        index = 0
+        previous = None
+        for timestamp in timestamps:
+            if previous is not None and timestamp < previous:
+                result.extend(self.get_group(timestamp) for timestamp in timestamps[len(result):])
+                break
+            previous = timestamp
+
+            while count < length and starts[count] <= timestamp:
+                count += 1
+            while index < length and end_max[index] <= timestamp:
+                index += 1
+            result.append(self._indexed_group(index, count, timestamp))
+
+        return result
+
+    def resample(self, step=timedelta(hours=1), origin=None, schema=None, dtype=None):
+        """ Samples the forecast on a regular time grid
+
+        The grid covers the validity of the report, from the first grid point
+        at or after start_time to the last one at or before end_time. The
+        groups are walked once, the cost is linear in the number of groups
+        plus the number of steps. Requires numpy.
+
+        Args:
+            step: timedelta between samples
+            origin: datetime the grid is aligned to, midnight of the first
+                day of validity by default
+            schema: FeatureSchema, the default one if not given
+            dtype: matrix dtype, float64 by default
+
+        Returns:
+            (times, matrix) tuple: datetime64[m] array of the sample times and
+            the feature matrix with a row for every sample
+        """
+        from . import features
+
+        if step <= timedelta(0):
+            raise ValueError("step must be positive")
+        if schema is None:
+            schema = features.DEFAULT_SCHEMA
+        if not self.groups:
+            return timeutil.np.array([], dtype='datetime64[m]'), schema.empty(0, dtype)
+        if origin is None:
+            origin = self.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        first = origin + step * -((origin - self.start_time) // step)
+        times = []
+        time = first
+        while time <= self.end_time:
+            times.append(time)
+            time += step
+
+        matrix = schema.empty(len(times), dtype)
+        features.fill_rows(matrix, 0, self.get_groups(times), schema)
+        return timeutil.np.array(times, dtype='datetime64[m]'), matrix
+
+    def group_times(self, datetime64=False):
+        """ Returns the start and end times of the groups as arrays
+
+        Requires numpy. The arrays are built once and must not be modified.
+
+        Args:
+            datetime64: return datetime64[m] arrays instead of int64 epoch
+                minutes (see timeutil)
+
+        Returns:
+            (starts, ends) tuple of arrays, in the order of self.groups
+        """
+        starts, ends, _ = self._group_minutes()
+        if datetime64:
+            return timeutil.to_datetime64(starts), timeutil.to_datetime64(ends)
+        return starts, ends
+
+    def group_indices(self, timestamps):
+        """ Returns the indices of the groups in force at each of the timestamps
 
-        if self.groups[-1].end_time == timestamp:
-            return group
-        #print(self.groups)
-        print('[WARNING] No TAF group found for ', timestamp.isoformat(), self.groups)
+        The vectorized counterpart of get_group, requires numpy.
+
+        Args:
+            timestamps: sequence of datetime objects, datetime64 array or
+                epoch minutes, in any order; times are taken to the minute
+
+        Returns:
+            int64 array of indices into self.groups, -1 for the timestamps no
+            group is in force at
+        """
+        np = timeutil.np
+        starts, ends, end_max = self._group_minutes()
+        minutes = timeutil.epoch_minutes_array(timestamps)
+        if self._group_starts is None:
+            # Groups of malformed reports are not indexed, look them up as get_group does
+            return np.fromiter((self._group_index(timeutil.from_epoch_minutes(minute)) for minute in minutes),
+                               np.int64, len(minutes))
+
+        count = np.searchsorted(starts, minutes, 'right')
+        indices = np.searchsorted(end_max, minutes, 'right')
+        indices[indices >= count] = -1
+        if len(ends):
+            # The end of the last group is still covered by it
+            indices[(indices < 0) & (minutes == ends[-1])] = len(ends) - 1
+        return indices
+
+    def _group_minutes(self):
+        """ Returns (starts, ends, running maximum of ends) arrays of epoch minutes """
+        minutes = getattr(self, '_minutes', None)
+        if minutes is None:
+            starts = timeutil.epoch_minutes_array([group.start_time for group in self.groups])
+            ends = timeutil.epoch_minutes_array([group.end_time for group in self.groups])
+            minutes = self._minutes = (starts, ends, timeutil.np.maximum.accumulate(ends))
+        return minutes
+
+    def _indexed_group(self, index, count, timestamp):
+        if index < count:
+            return self.groups[index]
+        if self.groups and self.groups[-1].end_time == timestamp:
+            return self.groups[-1]
+        return None
+
+    def _scan_groups(self, timestamp):
+        """ Looks up the group get_group returns one group after the other,
+        for groups that are not sorted or lack times """
+        for group in self.groups:
+            if group.start_time is not None and group.end_time is not None:
+                if group.start_time <= timestamp < group.end_time:
+                    return group
+        if self.groups and self.groups[-1].end_time == timestamp:
+            return self.groups[-1]
         return None
 
+    def _group_index(self, timestamp):
+        """ Returns index of the group get_group returns, -1 for None """
+        if timestamp is None:
+            return -1
+        group = self.get_group(timestamp)
+        return -1 if group is None else self.groups.index(group)
+
+    def _index_groups(self):
+        """ Builds the interval index used by get_group and get_groups
+
+        Groups of malformed reports can be out of order or lack times, they
+        are not indexed (_group_starts is None) and looked up one by one.
+        """
+        self._group_starts = [group.start_time for group in self.groups]
+        self._group_end_max = []
+        if None in self._group_starts or any(group.end_time is None for group in self.groups) or \
+                any(later < earlier for earlier, later in zip(self._group_starts, self._group_starts[1:])):
+            self._group_starts = None
+            return
+        for group in self.groups:
+            if self._group_end_max and self._group_end_max[-1] > group.end_time:
+                self._group_end_max.append(self._group_end_max[-1])
+            else:
+                self._group_end_max.append(group.end_time)
+
     @property
     def end_time(self):
         return self.groups[-1].end_time
@@ -84,8 +387,8 @@ class Decoder(object):
             if day:
                 day = int(day)
                 if day == 0:
-                    logging.warning('Invalid day for taf ' + self._taf._raw_taf)
-                    raise ValueError('Invalid day for taf' + self._taf._raw_taf)
+                    logging.warning('Invalid day for taf ' + self._taf.get_taf())
+                    raise ValueError('Invalid day for taf' + self._taf.get_taf())
                 hour = int(header.get(prefix + 'hours'))
                 minute = header.get(prefix + 'minutes', 0)
                 if minute == '':
@@ -129,8 +432,7 @@ class Decoder(object):
     def _normalize_date(self, year, month, day):
         if day == 31:
             # Check if this month does not have 31 days, and change to valid date. This error occurs in the data.
-            days_in_month = monthrange(year, month)[1]
-            if days_in_month == 30:
+            if timeutil.days_in_month(year, month) == 30:
                 day = 1
                 month += 1
         return month, day
@@ -143,15 +445,52 @@ class Decoder(object):
             
         taf_header = self._taf.get_header()
         day, hours, minutes = self._extract_time(taf_header, 'origin_')
+        if self._anchorings is not None:
+            # Group times only depend on the lengths of the month of issue
+            # and of the next one, see _anchor_groups
+            lengths = (timeutil.days_in_month(year, month), timeutil.days_in_month(year, month % 12 + 1))
         month, day = self._normalize_date(year, month, day)
         self.issued_timestamp = datetime(year, month, day, hours, minutes)
 
+        if self._anchorings is not None:
+            self._anchor_groups(lengths)
+            return
+
         self.groups = [TafGroup(group, taf_header, self) for group in self._taf.get_groups()]
+        self._set_group_times()
+        #print('Final groups:', taf_timestamp.isoformat(), self.groups)
+
+    def _set_group_times(self):
+        """ Completes the groups, which are in the order of the report """
         self._set_missing_group_times()
         self._fill_gaps()
         self._complete_group_info()
         self._remove_extraneous_groups()
-        #print('Final groups:', taf_timestamp.isoformat(), self.groups)
+
+    def _anchor_groups(self, lengths):
+        """ Sets the groups to copies of those anchored for the month lengths
+
+        In months of the same lengths the groups are the same, shifted by
+        the difference in issue times. They are anchored for the first
+        month of the lengths and kept in the anchorings shared with the
+        other decoders of the report, their copies are this decoder's own.
+        """
+        anchorings = self._anchorings
+        anchored = anchorings.groups.get(lengths)
+        if anchored is None:
+            if anchorings.templates is None:
+                anchorings.templates = [TafGroup(group, self._taf.get_header(), self) for group in self._taf.get_groups()]
+                # The templates were anchored in the month of this decoder
+                self.groups = [template._copy(template.type, template.start_time, template.end_time)
+                               for template in anchorings.templates]
+            else:
+                self.groups = [template.anchored(self) for template in anchorings.templates]
+            self._set_group_times()
+            anchored = anchorings.groups[lengths] = (self.issued_timestamp, self.groups)
+
+        issued_timestamp, groups = anchored
+        shift = self.issued_timestamp - issued_timestamp
+        self.groups = [group.shifted(shift) for group in groups]
 
     def _remove_extraneous_groups(self):
         """
@@ -178,14 +517,9 @@ class Decoder(object):
         return latertime - earliertime > timedelta(minutes=5)
 
     def _create_basic_group(self, startime, endtime, base_group):
-        newgroup = copy.copy(base_group)
         if startime.minute == 59:
-            newgroup.start_time = startime + timedelta(minutes=1)
-        else:
-            newgroup.start_time = startime
-        newgroup.end_time = endtime
-        newgroup.type = base_group.type + '-EXT'
-        return newgroup
+            startime = startime + timedelta(minutes=1)
+        return base_group.extension(startime, endtime)
 
     def _fill_gaps(self):
         newgroups = []
@@ -227,14 +561,15 @@ class Decoder(object):
         result = ""
 
         # Ensure it's side effect free
-        _header = header
+        _header = dict(header)
 
-        # Type
-        if _header["type"] == "AMD":
+        # Modifier
+        modifier = _header.get("modifier")
+        if modifier == "AMD":
             result += "TAF amended for "
-        elif _header["type"] == "COR":
+        elif modifier == "COR":
             result += "TAF corrected for "
-        elif _header["type"] == "RTD":
+        elif modifier == "RTD":
            result += "TAF related for "
         else:
             result += "TAF for "
@@ -253,7 +588,7 @@ class Decoder(object):
 
     def _decode_group_header(self, header):
         result = ""
-        _header = header
+        _header = dict(header)
 
         from_str = "From %(from_hours)s:%(from_minutes)s on the %(from_date)s: "
         prob_str = "Probability %(probability)s%% of the following between %(from_hours)s:00 on the %(from_date)s and %(till_hours)s:00 on the %(till_date)s: "
@@ -395,118 +730,21 @@ class Decoder(object):
         return(result)
 
     def _decode_weather(self, weather):
-        result = ""
-        i_result = ""
-        ii_result = ""
-        list = []
-
+        phrases = []
         for group in weather:
-            # Special cases
-            if "+" in group and "FC" in group:
-                i_result += "tornado or watersprout"
-                list.append(i_result)
-                continue
-
-            if "MI" in group:
-                ii_result += "shallow "
-            elif "BC" in group:
-                ii_result += "patchy "
-            elif "DR" in group:
-                ii_result += "low drifting "
-            elif "BL" in group:
-                ii_result += "blowing "
-            elif "SH" in group:
-                ii_result += "showers "
-            elif "TS" in group:
-                ii_result += "thunderstorms "
-            elif "FZ" in group:
-                ii_result += "freezing "
-            elif "PR" in group:
-                ii_result = "partial "
-
-            if "DZ" in group:
-                ii_result += "drizzle"
-            if "RA" in group:
-                ii_result += "rain"
-            if "SN" in group:
-                ii_result += "snow"
-            if "SG" in group:
-                ii_result += "snow grains"
-            if "IC" in group:
-                ii_result += "ice"
-            if "PL" in group:
-                ii_result += "ice pellets"
-            if "GR" in group:
-                ii_result += "hail"
-            if "GS" in group:
-                ii_result += "small snow/hail pellets"
-            if "UP" in group:
-                ii_result += "unknown precipitation"
-            if "BR" in group:
-                ii_result += "mist"
-            if "FG" in group:
-                ii_result += "fog"
-            if "FU" in group:
-                ii_result += "smoke"
-            if "DU" in group:
-                ii_result += "dust"
-            if "SA" in group:
-                ii_result += "sand"
-            if "HZ" in group:
-                ii_result += "haze"
-            if "PY" in group:
-                ii_result += "spray"
-            if "VA" in group:
-                ii_result += "volcanic ash"
-            if "PO" in group:
-                ii_result += "dust/sand whirl"
-            if "SQ" in group:
-                ii_result += "squall"
-            if "FC" in group:
-                ii_result += "funnel cloud"
-            if "SS" in group:
-                ii_result += "sand storm"
-            if "DS" in group:
-                ii_result += "dust storm"
-
-            # Fix the most ugly grammar
-            if "SH" in group and "RA" in group:
-                ii_result = "showers"
-            if "SH" in group and "SN" in group:
-                ii_result = "snow showers"
-            if "SH" in group and "SG" in group:
-                ii_result = "snow grain showers"
-            if "SH" in group and "PL" in group:
-                ii_result = "ice pellet showers"
-            if "SH" in group and "IC" in group:
-                ii_result = "ice showers"
-            if "SH" in group and "GS" in group:
-                ii_result = "snow pellet showers"
-            if "SH" in group and "GR" in group:
-                ii_result = "hail showers"
-
-            if "TS" in group and "RA" in group:
-                ii_result = "thunderstorms and rain"
-            if "TS" in group and "UP" in group:
-                ii_result = "thunderstorms with unknown precipitation"
-
-            if "+" in group:
-                i_result = "heavy %s" % ii_result
-            elif "-" in group:
-                i_result = "light %s" % ii_result
-            elif "VC" in group:
-                i_result = "%s in the vicinity" % ii_result
-            else:
-                i_result = ii_result
-
-            list.append(i_result)
-            i_result = ""
-            ii_result = ""
-
-        result = ", ".join(list)
-
-        # Remove extra whitespace, if any
-        result = re.sub(r'\s+', ' ', result)
+            token = _weather_token(group)
+            phrase = _WEATHER_PHRASES.get(token)
+            if phrase is None:
+                phrase = _weather_phrase(group)
+                if token is not None and len(_WEATHER_PHRASES) < _WEATHER_PHRASES_MAX:
+                    _WEATHER_PHRASES[token] = phrase
+            phrases.append(phrase)
+
+        result = ", ".join(phrases)
+
+        # Phrases have single spaces only, but one may start with a space
+        if "  " in result:
+            result = re.sub(r'\s+', ' ', result)
         return(result)
 
     def _decode_windshear(self, windshear):
@@ -533,6 +771,17 @@ class Decoder(object):
 
         return(suffix)
 
+# (prefix, key, value) -> feature name, made once and shared by all groups
+_FEATURE_NAMES = {}
+
+
+def _feature_name(prefix, key, value):
+    """ Returns the name of a cloud or weather feature, e.g. clouds_layer_BKN """
+    name = _FEATURE_NAMES.get((prefix, key, value))
+    if name is None:
+        name = _FEATURE_NAMES[prefix, key, value] = sys.intern('%s_%s_%s' % (prefix, key, value))
+    return name
+
 ## translation of the present-weather codes into english
 WEATHER_INT = {
     "-": "light",
@@ -541,6 +790,83 @@ WEATHER_INT = {
     "+VC": "nearby heavy",
     "VC": "nearby"
 }
+
+# English phrases of present weather tokens, the first matching modifier
+# is used, every matching phenomenon is appended and the last matching
+# grammar fix replaces the whole phrase
+_WEATHER_MODIFIER_PHRASES = (
+    ("MI", "shallow "), ("BC", "patchy "), ("DR", "low drifting "), ("BL", "blowing "),
+    ("SH", "showers "), ("TS", "thunderstorms "), ("FZ", "freezing "), ("PR", "partial "))
+
+_WEATHER_PHENOMENON_PHRASES = (
+    ("DZ", "drizzle"), ("RA", "rain"), ("SN", "snow"), ("SG", "snow grains"),
+    ("IC", "ice"), ("PL", "ice pellets"), ("GR", "hail"), ("GS", "small snow/hail pellets"),
+    ("UP", "unknown precipitation"), ("BR", "mist"), ("FG", "fog"), ("FU", "smoke"),
+    ("DU", "dust"), ("SA", "sand"), ("HZ", "haze"), ("PY", "spray"), ("VA", "volcanic ash"),
+    ("PO", "dust/sand whirl"), ("SQ", "squall"), ("FC", "funnel cloud"), ("SS", "sand storm"),
+    ("DS", "dust storm"))
+
+_WEATHER_GRAMMAR_FIXES = (
+    ("SH", "RA", "showers"), ("SH", "SN", "snow showers"), ("SH", "SG", "snow grain showers"),
+    ("SH", "PL", "ice pellet showers"), ("SH", "IC", "ice showers"),
+    ("SH", "GS", "snow pellet showers"), ("SH", "GR", "hail showers"),
+    ("TS", "RA", "thunderstorms and rain"), ("TS", "UP", "thunderstorms with unknown precipitation"))
+
+_WEATHER_INTENSITY_PHRASES = (("+", "heavy %s"), ("-", "light %s"), ("VC", "%s in the vicinity"))
+
+# Upper bound on the number of memoized phrases
+_WEATHER_PHRASES_MAX = 4096
+
+
+def _weather_token(group):
+    """ Returns the whole token of a parsed weather dict, or None """
+    for key, kind in group.items():
+        if kind == 'weather':
+            return key
+    return None
+
+
+def _weather_phrase(group):
+    """ Returns the English phrase of a parsed weather dict
+
+    Args:
+        group: dict from TAF._parse_weather_phenomena_str, only its keys are used
+    """
+    # Special cases
+    if "+" in group and "FC" in group:
+        return "tornado or watersprout"
+
+    phrase = ""
+    for code, text in _WEATHER_MODIFIER_PHRASES:
+        if code in group:
+            phrase = text
+            break
+    for code, text in _WEATHER_PHENOMENON_PHRASES:
+        if code in group:
+            phrase += text
+    for first, second, text in _WEATHER_GRAMMAR_FIXES:
+        if first in group and second in group:
+            phrase = text
+
+    for code, template in _WEATHER_INTENSITY_PHRASES:
+        if code in group:
+            return template % phrase
+    return phrase
+
+
+def _build_weather_phrases():
+    phrases = {}
+    for intensity in [""] + sorted(WEATHER_INT):
+        for modifier in [""] + _modifiers:
+            for phenomenon in [""] + _phenomena:
+                token = intensity + modifier + phenomenon
+                if _WEATHER_INTENSITY_RE.match(token):
+                    phrases[token] = _weather_phrase(_parse_weather_token(token))
+    return phrases
+
+
+# Whole weather token -> phrase, unseen tokens are added as they are decoded
+_WEATHER_PHRASES = _build_weather_phrases()
         
 
 class TafGroup:
@@ -548,10 +874,17 @@ class TafGroup:
     ATTRIBUTES = ['wind', 'visibility', 'clouds', 'weather', 'windshear']
     
     def __init__(self, group, default_header, decoder):
-        if not isinstance(group, dict):
+        if not isinstance(group, Mapping):
             raise DecodeError("Argument is not a TAF parser object")
 
         self._group = group
+        # Feature families decoded, and the features kept of them, see Decoder
+        self._projection = getattr(decoder, '_projection', None)
+        if self._projection is None:
+            self._attributes = self.ATTRIBUTES
+        else:
+            self._attributes = [attr for attr in self.ATTRIBUTES if attr in self._projection]
+        self._opt_in = getattr(decoder, '_opt_in', frozenset())
 
         self.header = group['header']
         if not self.header:
@@ -561,7 +894,7 @@ class TafGroup:
         self.start_time = decoder._decode_timestamp(self.header, 'from_', 'valid_from_', 'origin_')
         self.end_time = decoder._decode_timestamp(self.header, 'till_')
 
-        for attr in self.ATTRIBUTES:
+        for attr in self._attributes:
             self._decode_attribute(attr)
         self._set_forecast()
 
@@ -575,26 +908,109 @@ class TafGroup:
                 return True
         return False
 
+    def extension(self, start_time, end_time):
+        """ Returns group of type <type>-EXT carrying this one on from start_time to end_time
+
+        Only the times and type are its own, the decoded values are those of
+        this group.
+        """
+        return self._copy(self.type + '-EXT', start_time, end_time)
+
+    def anchored(self, decoder):
+        """ Returns copy of the group with the times in the month the decoder
+        anchors the report in, sharing the decoded values """
+        return self._copy(self.type, decoder._decode_timestamp(self.header, 'from_', 'valid_from_', 'origin_'),
+                          decoder._decode_timestamp(self.header, 'till_'))
+
+    def shifted(self, shift):
+        """ Returns copy of the group moved in time by a timedelta, sharing the decoded values """
+        return self._copy(self.type, self.start_time + shift, self.end_time + shift)
+
+    def _copy(self, type, start_time, end_time):
+        group = TafGroup.__new__(TafGroup)
+        # Decoded values are shared, they are never changed in place
+        group.__dict__.update(self.__dict__)
+        group.type = type
+        group.start_time = start_time
+        group.end_time = end_time
+        return group
+
+    def _unshared(self):
+        """ Returns copy of the group with its own header and decoded values """
+        group = self._copy(self.type, self.start_time, self.end_time)
+        group.header = dict(self.header)
+        for attr in self._attributes:
+            value = getattr(self, attr, None)
+            if value is not None:
+                setattr(group, attr, dict(value))
+        group.forecast = dict(self.forecast)
+        return group
+
     def fill_in_information(self, other_group):
-        for attr in self.ATTRIBUTES:
+        """ Completes the group with the values of other_group, the group it
+        temporarily changes
+
+        The attribute dicts are never modified, as groups share them: values
+        missing from this group are taken over by reference, and an
+        attribute is copied only when a value of it changes.
+        """
+        changed = False
+        for attr in self._attributes:
             value = getattr(self, attr, None)
+            other_value = getattr(other_group, attr)
             if not value or value.get(attr) == 0:
-                setattr(self, attr, getattr(other_group, attr)) # override attr
+                if other_value != value:
+                    setattr(self, attr, other_value) # override attr
+                    changed = True
             elif self.header['type'].startswith('PROB'):
-                current_values = getattr(self, attr)
-                for key,value in getattr(other_group, attr).items(): # override higher-probability values
-                    if key not in current_values or self.forecast.get('prob', 100) < 50:
-                        current_values[key] = value
-
-        self._set_forecast()
+                override = self.forecast.get('prob', 100) < 50
+                current_values = value
+                for key, other in other_value.items(): # override higher-probability values
+                    if key not in value or (override and value[key] != other):
+                        if current_values is value:
+                            current_values = dict(value)
+                        current_values[key] = other
+                if current_values is not value:
+                    setattr(self, attr, current_values)
+                    changed = True
+
+        if changed:
+            self._set_forecast()
+
+    def feature_ids(self, schema=None):
+        """ Returns the features of the forecast as (ids, values) tuples, in
+        ascending order of their columns in a FeatureSchema
+
+        Features not in the schema are skipped. The pairs are worked out
+        once, the forecast does not change once decoded.
+
+        Args:
+            schema: FeatureSchema, the default one if None
+        """
+        if schema is None:
+            from .features import DEFAULT_SCHEMA as schema
+        cached = self._feature_ids
+        if cached is None or cached[0] is not schema:
+            columns, values = schema.columns(self.forecast)
+            pairs = sorted(zip(columns, values))
+            cached = self._feature_ids = (schema, tuple(column for column, _ in pairs),
+                                          tuple(value for _, value in pairs))
+        return cached[1], cached[2]
 
     def _set_forecast(self):
+        self._feature_ids = None
         self.forecast = {}
         prob = self._get_prob()
         if prob:
             self.forecast['prob'] = int(prob)
-        for attr in self.ATTRIBUTES:
-            self.forecast.update(getattr(self, attr, {}))
+        projection = self._projection
+        for attr in self._attributes:
+            values = getattr(self, attr, {})
+            features = projection[attr] if projection is not None else None
+            if features is None:
+                self.forecast.update(values)
+            else:
+                self.forecast.update((key, value) for key, value in values.items() if key in features)
 
     def _get_prob(self):
         return self.header.get('probability', None)
@@ -625,7 +1041,11 @@ class TafGroup:
         if not vis:
             self.visibility = {}
         else:
-            range = self._decode_range(vis['range'])
+            if vis['unit'] == 'M':
+                # Meters are whole, "10 000" is 9999 spelled out
+                range = int(vis['range'].replace(' ', ''))
+            else:
+                range = self._decode_range(vis['range'])
             self.visibility = {'visibility_' + vis['unit']: range}
 
         vv = self._group.get('vertical_visibility', None)
@@ -676,12 +1096,15 @@ class TafGroup:
                 if not value:
                     continue
                 if key in ['layer', 'type']:
-                    data['clouds_%s_%s' % (key, value)] = 1
+                    data[_feature_name('clouds', key, value)] = 1
                 elif key == 'ceiling':
                     if 'clouds_ceiling_ft' not in data:
                         data['clouds_ceiling_ft'] = int(value)
                     current_max_ft = data.get('clouds_ceiling_max_ft', int(value))
                     data['clouds_ceiling_max_ft'] = max(int(value), current_max_ft)
+                    # The ceiling proper is the lowest broken or overcast layer
+                    if layer['layer'] in ['BKN', 'OVC'] and 'clouds_ceiling_broken_ft' in self._opt_in:
+                        data['clouds_ceiling_broken_ft'] = min(int(value), data.get('clouds_ceiling_broken_ft', int(value)))
             
         self.clouds = data
 
@@ -699,7 +1122,7 @@ class TafGroup:
                 elif value == 'intensity':
                     key = WEATHER_INT.get(key, None)
                 if key:
-                    data['wx_%s_%s' % (value, key)] = 1
+                    data[_feature_name('wx', value, key)] = 1
 
         self.weather = data
 
@@ -0,0 +1,169 @@
+""" Forecasts in force across successive TAF issues of a station """
+
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from itertools import count
+
+from .tafdecoder import DecodeError
+
+# Issued at the same time, a correction supersedes an amendment, which
+# supersedes a delayed report, which supersedes the original report
+MODIFIER_RANKS = {None: 0, 'RTD': 1, 'AMD': 2, 'COR': 3}
+
+
+def _check_decoded(decoder):
+    # Decoder logs and swallows ValueError, possibly leaving some groups behind
+    if not decoder._decoded or not decoder.groups:
+        raise DecodeError("Error decoding TAF")
+
+
+class StationTimeline(object):
+    """ Successive TAF issues of one station, ordered by issue time
+
+    Issues are kept until their validity ended more than `retention`
+    before the latest issue time, so memory stays bounded when the
+    timeline is fed continuously.
+    """
+
+    def __init__(self, icao_code=None, retention=timedelta(hours=48)):
+        """
+        Args:
+            icao_code: station ICAO code, taken from the first issue if not given
+            retention: how long expired issues are kept, must cover the
+                longest lead time queries are made with
+        """
+        self.icao_code = icao_code
+        self.retention = retention
+        self._keys = []
+        self._decoders = []
+        # Running maximum of the valid-till times of the issues in key order
+        self._end_max = []
+        self._sequence = count()
+
+    def add(self, decoder):
+        """ Adds decoded TAF issue to the timeline
+
+        An issue with the same issue time and modifier as one already in
+        the timeline replaces it.
+
+        Raises:
+            DecodeError: decoding did not complete or left no groups, or
+                Decoder is for another station
+        """
+        _check_decoded(decoder)
+
+        header = decoder._taf.get_header()
+        if self.icao_code is None:
+            self.icao_code = header['icao_code']
+        elif header['icao_code'] != self.icao_code:
+            raise DecodeError("TAF for %s added to timeline of %s" % (header['icao_code'], self.icao_code))
+
+        rank = MODIFIER_RANKS.get(header.get('modifier'), 0)
+        key = (decoder.issued_timestamp, rank)
+        index = bisect_right(self._keys, key + (float('inf'),))
+        if index and self._keys[index - 1][:2] == key:
+            index -= 1
+            self._decoders[index] = decoder
+        else:
+            entry = key + (next(self._sequence),)
+            index = bisect_right(self._keys, entry)
+            self._keys.insert(index, entry)
+            self._decoders.insert(index, decoder)
+
+        self._update_end_max(index)
+        self._expire()
+
+    def issue_at(self, timestamp, lead=None):
+        """ Returns the latest issue with a forecast for timestamp
+
+        Args:
+            timestamp: time the forecast is for
+            lead: timedelta, only consider issues issued at least this long
+                before timestamp; issues issued up to timestamp are considered
+                if not given
+
+        Returns:
+            Decoder object, or None if no issue covers timestamp
+        """
+        cutoff = timestamp - lead if lead else timestamp
+        index = bisect_right(self._keys, (cutoff, float('inf')))
+        # Issues before first are all over by timestamp
+        first = bisect_left(self._end_max, timestamp, 0, index)
+
+        # The latest issue usually covers timestamp, older ones are only
+        # looked at when it does not (e.g. it is not valid yet)
+        for index in range(index - 1, first - 1, -1):
+            decoder = self._decoders[index]
+            if decoder.start_time <= timestamp <= decoder.end_time and decoder.get_group(timestamp):
+                return decoder
+        return None
+
+    def forecast_at(self, timestamp, lead=None):
+        """ Returns the group in force at timestamp from the latest issue, see issue_at
+
+        Returns:
+            TafGroup object, or None if no issue covers timestamp
+        """
+        decoder = self.issue_at(timestamp, lead)
+        if decoder is None:
+            return None
+        return decoder.get_group(timestamp)
+
+    def __len__(self):
+        return len(self._decoders)
+
+    def __iter__(self):
+        return iter(self._decoders)
+
+    def _expire(self):
+        cutoff = self._keys[-1][0] - self.retention
+        expired = 0
+        while expired < len(self._decoders) - 1 and self._decoders[expired].end_time < cutoff:
+            expired += 1
+        if expired:
+            del self._keys[:expired]
+            del self._decoders[:expired]
+            self._update_end_max(0)
+
+    def _update_end_max(self, index):
+        """ Recomputes the running maximum of valid-till times from index on """
+        del self._end_max[index:]
+        for decoder in self._decoders[index:]:
+            end_time = decoder.end_time
+            if self._end_max and self._end_max[-1] > end_time:
+                end_time = self._end_max[-1]
+            self._end_max.append(end_time)
+
+
+class TimelineIndex(object):
+    """ StationTimeline objects of many stations, keyed on ICAO code """
+
+    def __init__(self, retention=timedelta(hours=48)):
+        self.retention = retention
+        self._timelines = {}
+
+    def add(self, decoder):
+        """ Adds decoded TAF issue to the timeline of its station, see StationTimeline.add """
+        _check_decoded(decoder)
+
+        icao_code = decoder._taf.get_header()['icao_code']
+        timeline = self._timelines.get(icao_code)
+        if timeline is None:
+            timeline = self._timelines[icao_code] = StationTimeline(icao_code, self.retention)
+        timeline.add(decoder)
+
+    def forecast_at(self, icao_code, timestamp, lead=None):
+        """ Returns the group in force at timestamp for the station, see StationTimeline.issue_at """
+        timeline = self._timelines.get(icao_code)
+        if timeline is None:
+            return None
+        return timeline.forecast_at(timestamp, lead)
+
+    def __getitem__(self, icao_code):
+        return self._timelines[icao_code]
+
+    def __contains__(self, icao_code):
+        return icao_code in self._timelines
+
+    def __len__(self):
+        return len(self._timelines)
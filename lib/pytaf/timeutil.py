@@ -0,0 +1,77 @@
+""" Conversion of timestamps to and from integer epoch minutes
+
+TAF times have a resolution of minutes, so they fit an int64 count of
+minutes since 1970-01-01 00:00 UTC. Naive datetimes are taken as UTC.
+Arrays of them are int64, or datetime64[m] viewing the same data; the
+array functions require numpy.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+
+# Stands in for a missing timestamp, the int64 value of NaT
+MISSING_MINUTES = -2 ** 63
+
+_MINUTE = timedelta(minutes=1)
+
+# Days of the months of common and of leap years
+_MONTH_DAYS = ((0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+               (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31))
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for this part of pytaf")
+
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def days_in_month(year, month):
+    """ Returns the number of days of a month, from a table rather than calendar.monthrange """
+    return _MONTH_DAYS[is_leap(year)][month]
+
+
+def to_epoch_minutes(timestamp):
+    """ Returns minutes since the epoch of a datetime, MISSING_MINUTES for None """
+    if timestamp is None:
+        return MISSING_MINUTES
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // _MINUTE
+
+
+def from_epoch_minutes(minutes):
+    """ Returns naive UTC datetime of minutes since the epoch, None for MISSING_MINUTES """
+    if minutes == MISSING_MINUTES:
+        return None
+    return EPOCH + timedelta(minutes=int(minutes))
+
+
+def epoch_minutes_array(timestamps):
+    """ Returns int64 array of minutes since the epoch
+
+    Args:
+        timestamps: sequence of datetime objects (None for missing ones),
+            datetime64 array, or epoch minutes; times are taken to the minute
+    """
+    _require_numpy()
+    array = np.asarray(timestamps)
+    if array.dtype.kind in 'iu':
+        return array.astype(np.int64)
+    if array.dtype.kind == 'M':
+        return array.astype('datetime64[m]').view(np.int64)
+    return np.fromiter((to_epoch_minutes(timestamp) for timestamp in timestamps), np.int64, len(array))
+
+
+def to_datetime64(minutes):
+    """ Returns datetime64[m] array of epoch minutes, NaT for MISSING_MINUTES """
+    _require_numpy()
+    return np.asarray(minutes, dtype=np.int64).view('datetime64[m]')
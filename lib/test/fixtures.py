@@ -0,0 +1,26 @@
+""" Reports and helpers shared by the tests """
+
+from datetime import datetime
+
+import pytaf
+
+
+KEWR = """
+TAF KEWR 230232Z 2303/2406 30012G18KT P6SM BKN040 FM230400 30011G17KT
+  P6SM SCT040 FM230600 29009KT P6SM SCT040 FM231400 31011G17KT
+  P6SM SKC FM240200 34005KT P6SM BKN250=
+"""
+KEWR_ISSUED = datetime(2016, 11, 23, 2, 32)
+
+KIAH = """
+TAF KIAH 230259Z 2303/2406 16010KT P6SM VCSH FEW028 SCT050 BKN250 FM230900
+  18007KT P6SM -RA VCTS SCT015 BKN035CB
+ TEMPO 2311/2314 TSRA FM231600 32010KT P6SM SCT250 FM240000
+  34004KT P6SM SKC=
+"""
+KIAH_ISSUED = datetime(2016, 11, 23, 2, 59)
+
+
+def decode(raw, timestamp):
+    """ Returns Decoder of a report, parsed eagerly """
+    return pytaf.Decoder(pytaf.TAF(raw), timestamp)
@@ -129,6 +129,32 @@ class TafTests(unittest.TestCase):
             'weather': 1, 'wx_phenomenon_RA': 1, 'wx_modifier_TS': 1
         })
 
+    def test_fields(self):
+        raw_taf = """
+        TAF KIAH 230259Z 2303/2406 16010KT P6SM VCSH FEW028 SCT050 BKN250 FM230900
+          18007KT P6SM -RA VCTS SCT015 BKN035CB
+         TEMPO 2311/2314 TSRA FM231600 32010KT P6SM SCT250 FM240000
+          34004KT P6SM SKC=
+        """
+        timestamp = datetime(2016, 11, 23, 2, 59)
+        full = pytaf.Decoder(pytaf.TAF(raw_taf), timestamp)
+
+        for report in (raw_taf, raw_taf.encode('ascii')):
+            taf = pytaf.TAF(report, lazy=True)
+            decoder = pytaf.Decoder(taf, timestamp, fields=['wind', 'visibility_SM'])
+            self.assertEqual(len(decoder.groups), len(full.groups))
+            for group, full_group in zip(decoder.groups, full.groups):
+                self.assertEqual(group.forecast, {
+                    key: value for key, value in full_group.forecast.items()
+                    if key.startswith('wind') and not key.startswith('windshear') or key == 'visibility_SM'})
+            # TEMPO group got the visibility of the group it is in
+            self.assertEqual(decoder.get_group(datetime(2016, 11, 23, 12)).forecast['visibility_SM'], 6)
+            # Weather was never parsed
+            self.assertTrue(all('weather' not in group._fields for group in taf.get_groups()))
+
+        with self.assertRaises(ValueError):
+            pytaf.Decoder(pytaf.TAF(raw_taf), timestamp, fields=['ceiling'])
+
     def test_prob_forecast(self):
         self.raw_taf = """
         TAF KMSP 212111Z 2121/2224 11011KT P6SM BKN250 FM220400 11011KT P6SM
@@ -151,6 +177,100 @@ class TafTests(unittest.TestCase):
             'visibility_SM': 3,
         })
 
+    def test_shared_values(self):
+        self.raw_taf = """
+        TAF KMSP 212111Z 2121/2224 11011KT P6SM BKN250 FM220400 11011KT P6SM
+          SCT080 BKN110 FM221000 11012KT P6SM -SN SCT035 BKN050
+          FM221200 11014KT 3SM -SN SCT020 OVC035
+         PROB30 2212/2215 4SM -SNPL OVC020 FM221500 11014G20KT
+          2SM -SNPL SCT009 OVC020 FM221800 11014G20KT 2SM -SNRA
+          OVC009="""
+        self.timestamp = datetime(2016, 11, 21, 11, 11)
+        self.parse_taf()
+
+        base = self.taf.get_group(datetime(2016, 11, 22, 12))
+        prob = self.taf.get_group(datetime(2016, 11, 22, 13))
+        self.assertEqual(prob.type, 'PROB30')
+        # Values missing from the PROB group are the ones of the group it is in
+        self.assertIs(prob.wind, base.wind)
+        # Values it overrides are copied, the ones of the group it is in are kept
+        self.assertEqual(prob.clouds['clouds_ceiling_ft'], 20)
+        self.assertEqual(prob.clouds['clouds_ceiling_max_ft'], 35)
+        self.assertEqual(base.clouds, {'clouds_num_layers': 2, 'clouds_layer_SCT': 1, 'clouds_layer_OVC': 1,
+                                       'clouds_ceiling_ft': 20, 'clouds_ceiling_max_ft': 35})
+        self.assertEqual(base.visibility, {'visibility_SM': 3})
+
+    def test_extended_group(self):
+        self.raw_taf = """
+        TAF KIAH 230259Z 2303/2406 16010KT P6SM VCSH FEW028 SCT050 BKN250 FM230900
+          18007KT P6SM -RA VCTS SCT015 BKN035CB
+         TEMPO 2311/2314 TSRA FM231600 32010KT P6SM SCT250 FM240000
+          34004KT P6SM SKC=
+        """
+        self.timestamp = datetime(2016, 11, 23, 2, 59)
+        self.parse_taf()
+
+        base = self.taf.get_group(datetime(2016, 11, 23, 10))
+        extension = self.taf.get_group(datetime(2016, 11, 23, 15))
+        self.assertEqual(extension.type, 'FM-EXT')
+        self.assertEqual((extension.start_time, extension.end_time),
+                         (datetime(2016, 11, 23, 14), datetime(2016, 11, 23, 16)))
+        self.assertEqual(base.end_time, datetime(2016, 11, 23, 11))
+        self.assertIs(extension.forecast, base.forecast)
+
+    def test_anchor(self):
+        taf = pytaf.TAF("""
+        TAF KSEA 302330Z 3100/0106 20012KT P6SM BKN030
+          FM310600 18015G25KT 4SM -RA OVC015
+          TEMPO 3110/3114 2SM RA BR OVC008 FM010000 22010KT P6SM SCT040=
+        """)
+        decoder = pytaf.Decoder(taf, datetime(2016, 12, 15))
+        # Nothing is kept for anchoring until it is asked for
+        self.assertIsNone(decoder._anchorings)
+
+        def groups(decoder):
+            return [(group.start_time, group.end_time, group.type, group.forecast) for group in decoder.groups]
+
+        # The 31st is the 1st of the next month in 30-day months
+        for timestamp in (datetime(2016, 10, 2), datetime(2016, 11, 2), datetime(2017, 1, 31),
+                          datetime(2017, 12, 1), datetime(2018, 11, 30)):
+            anchored = decoder.anchor(timestamp)
+            expected = pytaf.Decoder(taf, timestamp)
+            self.assertEqual(anchored.issued_timestamp, expected.issued_timestamp)
+            self.assertEqual(groups(anchored), groups(expected))
+            self.assertEqual(anchored.get_group(expected.start_time), anchored.groups[0])
+        self.assertEqual(decoder.anchor(datetime(2016, 11, 2)).start_time, datetime(2016, 12, 1))
+
+        # Anchored decoders have groups of their own
+        first, second = decoder.anchor(datetime(2017, 12, 1)), decoder.anchor(datetime(2017, 12, 1))
+        first.groups[0].start_time = None
+        self.assertEqual(groups(second), groups(pytaf.Decoder(taf, datetime(2017, 12, 1))))
+        self.assertEqual(groups(decoder.anchor(datetime(2017, 12, 1))), groups(second))
+        self.assertEqual(groups(decoder), groups(pytaf.Decoder(taf, datetime(2016, 12, 15))))
+
+    def test_failed_decoding(self):
+        # There is no 29th in February 2015
+        taf = pytaf.TAF("TAF KXXX 280900Z 2809/2924 20012KT P6SM BKN030 FM290300 22010KT P6SM SCT040=")
+        decoder = pytaf.Decoder(taf, datetime(2015, 2, 10))
+        self.assertFalse(decoder._decoded)
+        self.assertEqual(decoder.groups, [])
+        self.assertIsNone(decoder.get_group(datetime(2015, 2, 28, 10)))
+        self.assertEqual(decoder.get_groups([datetime(2015, 2, 28, 10)]), [None])
+        self.assertTrue(pytaf.Decoder(taf, datetime(2016, 2, 10))._decoded)
+
+    def test_unsorted_groups(self):
+        # Issued on the 31st of a 30-day month, the days roll over into the
+        # next month and the group filling the end starts before the others
+        taf = pytaf.TAF("TAF KXXX 311130Z 2912/3012 10010KT P6SM SKC FM291800 09010KT P6SM SCT010 "
+                        "FM281800 27010KT P6SM SCT020 TEMPO 0109/2815 2SM BR=")
+        decoder = pytaf.Decoder(taf, datetime(2016, 4, 15))
+        starts = [group.start_time for group in decoder.groups]
+        self.assertNotEqual(starts, sorted(starts))
+        timestamp = datetime(2016, 5, 28, 18, 30)
+        self.assertEqual(decoder.groups[-1].type, 'TEMPO-EXT')
+        self.assertIs(decoder.get_group(timestamp), decoder.groups[-1])
+        self.assertEqual(decoder.get_groups([timestamp]), [decoder.groups[-1]])
+
     def test_vertical_visibility(self):
         self.raw_taf = """
         TAF KMSP 272329Z 2800/2906 12008KT 2SM -SNPL BR OVC007 FM280500
@@ -170,4 +290,139 @@ class TafTests(unittest.TestCase):
             'weather': 1, 'wx_modifier_FZ': 1, 'wx_phenomenon_FG': 1,
             'visibility_vertical_ft': 2, 'visibility_SM': 0.5,
             'clouds_layer_OVC': 1, 'clouds_ceiling_ft': 4, 'clouds_num_layers': 1,
-        })
\ No newline at end of file
+        })
+
+    def test_get_groups(self):
+        self.raw_taf = """
+        TAF KIAH 230259Z 2303/2406 16010KT P6SM VCSH FEW028 SCT050 BKN250 FM230900
+          18007KT P6SM -RA VCTS SCT015 BKN035CB
+         TEMPO 2311/2314 TSRA FM231600 32010KT P6SM SCT250 FM240000
+          34004KT P6SM SKC=
+        """
+        self.timestamp = datetime(2016, 11, 23, 2, 59)
+        self.parse_taf()
+
+        timestamps = [datetime(2016, 11, 23, 2, 0), datetime(2016, 11, 23, 11, 0),
+                      datetime(2016, 11, 23, 14, 30), datetime(2016, 11, 24, 6, 0),
+                      datetime(2016, 11, 24, 7, 0)]
+        groups = self.taf.get_groups(timestamps)
+        self.assertEqual(groups, [self.taf.get_group(t) for t in timestamps])
+        self.assertEqual([g and g.type for g in groups], [None, 'TEMPO', 'FM-EXT', 'FM', None])
+        self.assertEqual(self.taf.get_groups(timestamps[::-1]), groups[::-1])
+
+    def test_decode_weather(self):
+        self.raw_taf = """
+        TAF KIAH 230259Z 2303/2406 16010KT P6SM VCSH FEW028 FM230900
+          18007KT 3SM -SHRA +TSRA BR SCT015 BKN035CB
+         TEMPO 2311/2314 +FC +FC FZFG=
+        """
+        self.timestamp = datetime(2016, 11, 23, 2, 59)
+        self.parse_taf()
+
+        decoded = self.taf.decode_taf()
+        self.assertIn("Weather: showers in the vicinity \n", decoded)
+        self.assertIn("Weather: light showers, heavy thunderstorms and rain, mist \n", decoded)
+        self.assertIn("Weather: tornado or watersprout, tornado or watersprout, freezing fog \n", decoded)
+
+    def test_decode_modifier(self):
+        self.raw_taf = "TAF AMD EGLL 121100Z 1212/1318 24015G25KT 9999 SCT030="
+        self.timestamp = datetime(2016, 11, 12, 11, 0)
+        self.parse_taf()
+        self.assertTrue(self.taf.decode_taf().startswith("TAF amended for EGLL"))
+
+        self.raw_taf = "TAF EGLL 121100Z 1212/1318 24015G25KT 9999 SCT030="
+        self.parse_taf()
+        self.assertTrue(self.taf.decode_taf().startswith("TAF for EGLL"))
+
+    def test_metric_visibility(self):
+        self.raw_taf = "TAF EGLL 212300Z 2200/2306 22010KT 9999 SCT030 BECMG 2203/2205 4000 BR BKN008 TEMPO 2206/2209 0800 FG="
+        self.timestamp = datetime(2016, 11, 21, 23)
+        self.parse_taf()
+
+        # Whole meters, 9999 stands for 10 km or more
+        times = [datetime(2016, 11, 22, 1), datetime(2016, 11, 22, 4), datetime(2016, 11, 22, 7)]
+        self.assertEqual([group.visibility for group in self.taf.get_groups(times)],
+                         [{'visibility_M': 10000}, {'visibility_M': 4000}, {'visibility_M': 800}])
+
+
+class TafParserTests(unittest.TestCase):
+
+    RAW = """
+        TAF KMSP 272329Z 2800/2906 12008KT 2SM -SNPL BR OVC007 FM280500
+          VRB03KT 1 1/2SM -FZDZ BR OVC006 WS020/25045KT
+         TEMPO 2810/2814 1/2SM FZFG VV002 PROB30 2812/2814 9999 NSC $
+        """
+
+    def setUp(self):
+        self.taf = pytaf.TAF(self.RAW)
+        self.groups = self.taf.get_groups()
+
+    def test_group_tokens(self):
+        self.assertEqual(self.groups[1], {
+            'header': {'type': 'FM', 'from_date': '28', 'from_hours': '05', 'from_minutes': '00'},
+            'wind': {'direction': 'VRB', 'speed': '03', 'gust': None, 'unit': 'KT'},
+            'visibility': {'more': None, 'range': '1 1/2', 'unit': 'SM'},
+            'clouds': [{'layer': 'OVC', 'ceiling': '006', 'type': None}],
+            'vertical_visibility': None,
+            'weather': [{'FZ': 'modifier', 'DZ': 'phenomenon', '-': 'intensity', '-FZDZ': 'weather'},
+                        {'BR': 'weather', '': 'intensity'}],
+            'windshear': {'altitude': '020', 'direction': '250', 'speed': '45', 'unit': 'KT'},
+        })
+
+    def test_special_tokens(self):
+        self.assertEqual(self.groups[2]['vertical_visibility'], '002')
+        self.assertEqual(self.groups[3]['visibility'], {'range': '10 000', 'more': True, 'unit': 'M'})
+        self.assertEqual(self.groups[3]['clouds'], [{'layer': 'NSC'}])
+        self.assertEqual(self.taf.get_maintenance(), '$')
+
+        # Windshear matches the start of the token, the rest is still searched
+        taf = pytaf.TAF("TAF KMSP 272329Z 2800/2906 12008KT P6SM WS020/25045KTNSC")
+        group = taf.get_groups()[0]
+        self.assertEqual(group['windshear'], {'altitude': '020', 'direction': '250', 'speed': '45', 'unit': 'KT'})
+        self.assertEqual(group['clouds'], [{'layer': 'NSC'}])
+        lazy = pytaf.TAF(taf.get_taf(), lazy=True).get_groups()[0]
+        self.assertEqual((lazy['clouds'], lazy['windshear']), (group['clouds'], group['windshear']))
+
+    def test_group_spans(self):
+        raw = self.taf.get_taf()
+        groups = [raw[start:end] for start, end in self.taf._group_spans]
+        self.assertEqual([group.split()[0] for group in groups], ['TAF', 'FM280500', 'TEMPO', 'PROB30'])
+        self.assertEqual(groups[2].split(), ['TEMPO', '2810/2814', '1/2SM', 'FZFG', 'VV002'])
+
+    def test_group_splitter_drops_trailing_garbage(self):
+        taf = pytaf.TAF("TAF KEWR 230232Z 2303/2406 30012G18KT P6SM BKN040 FM230400 30011G17KT"
+                        " P6SM SCT040" + " 9999" * 2000 + "= :return:")
+        self.assertEqual(len(taf.get_groups()), 1)
+
+    def test_bytes_input(self):
+        raw = self.RAW.encode('ascii')
+        # A report in the middle of a larger buffer, with its terminator
+        buffer = bytearray(b"TAF KXXX=\n" + raw + b"=\nTAF KYYY")
+        view = memoryview(buffer)[10:10 + len(raw) + 1]
+        for report in (raw, view):
+            taf = pytaf.TAF(report)
+            self.assertEqual(taf.get_header(), self.taf.get_header())
+            self.assertEqual(taf.get_groups(), self.groups)
+            self.assertEqual(taf.get_maintenance(), '$')
+            self.assertEqual(taf.get_taf(), self.taf.get_taf())
+
+        with self.assertRaises(pytaf.MalformedTAF):
+            pytaf.TAF(b"")
+
+    def test_lazy(self):
+        taf = pytaf.TAF(self.RAW, lazy=True)
+        self.assertEqual(taf.get_header(), self.taf.get_header())
+        self.assertIsNone(taf._weather_groups)
+
+        groups = taf.get_groups()
+        self.assertEqual(groups[1]['wind'], self.groups[1]['wind'])
+        # Wind does not depend on any other field, so it is parsed alone
+        self.assertEqual(list(groups[1]._fields), ['wind'])
+        self.assertEqual(groups[1]['weather'], self.groups[1]['weather'])
+        self.assertEqual([dict(group) for group in groups], self.groups)
+
+        decoder = pytaf.Decoder(pytaf.TAF(self.RAW, lazy=True), datetime(2016, 11, 27))
+        self.assertEqual(decoder.decode_taf(), pytaf.Decoder(self.taf, datetime(2016, 11, 27)).decode_taf())
+
+        with self.assertRaises(pytaf.MalformedTAF):
+            pytaf.TAF("TAF KMSP 272329Z :", lazy=True).get_groups()
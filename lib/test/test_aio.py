@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+import pytaf
+from pytaf.aio import TafStream, read_bulletins
+
+
+BULLETIN = (b"\x01\r\r\n123\r\r\nFTUS43 KMSP 212348\r\r\nTAFMSP\r\r\n"
+            b"TAF\r\r\nKMSP 212348Z 2200/2306 11010KT P6SM BKN250\r\r\n"
+            b"     FM220600 11011KT P6SM SCT080 BKN110=\r\r\n"
+            b"KMKE 212348Z 2200/2306 13008KT P6SM SCT250=\r\r\n\x03")
+
+AMENDED = (b"\x01\r\r\n124\r\r\nFTUS43 KDEN 220120 AAA\r\r\n"
+           b"TAF AMD\r\r\nKDEN 220120Z 2201/2306 VRB05KT P6SM SKC=\r\r\n"
+           b"KXXX garbage=\r\r\n\x03")
+
+
+class BulletinTests(unittest.TestCase):
+
+    def test_split_bulletin(self):
+        tafs = [pytaf.TAF(report) for report in pytaf.iter_reports(BULLETIN[1:-1])]
+        self.assertEqual([taf.get_taf() for taf in tafs], [
+            "TAF\nKMSP 212348Z 2200/2306 11010KT P6SM BKN250\r\r\n     FM220600 11011KT P6SM SCT080 BKN110",
+            "TAF\nKMKE 212348Z 2200/2306 13008KT P6SM SCT250",
+        ])
+        self.assertEqual(len(tafs[0].get_groups()), 2)
+        reports = list(pytaf.iter_reports(AMENDED[1:-1]))
+        self.assertEqual(reports, [b"TAF AMD\nKDEN 220120Z 2201/2306 VRB05KT P6SM SKC", b"TAF AMD\nKXXX garbage"])
+
+
+class StreamTests(unittest.IsolatedAsyncioTestCase):
+
+    async def serve(self, chunks, **kwargs):
+        async def handle(reader, writer):
+            for chunk in chunks:
+                writer.write(chunk)
+                await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        self.addAsyncCleanup(self.close_server, server)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, **kwargs)
+        self.addCleanup(writer.close)
+        return reader
+
+    async def close_server(self, server):
+        server.close()
+        await server.wait_closed()
+
+    async def test_decode(self):
+        # Bulletins split across writes, with noise between and a cut-off one at the end
+        data = b"noise" + BULLETIN + AMENDED + BULLETIN[:40]
+        reader = await self.serve([data[i:i + 50] for i in range(0, len(data), 50)])
+
+        stream = TafStream(timestamp=datetime(2016, 11, 21, 23, 48), max_pending=2)
+        results = [result async for result in stream.decode(reader)]
+
+        self.assertEqual([bool(result) for result in results], [True, True, True, False])
+        self.assertEqual([result._taf.get_header()['icao_code'] for result in results[:3]],
+                         ['KMSP', 'KMKE', 'KDEN'])
+        self.assertEqual(results[2]._taf.get_header()['modifier'], 'AMD')
+        self.assertEqual(results[3].index, 3)
+
+        stats = stream.stats
+        self.assertEqual((stats.bulletins, stats.reports, stats.decoded, stats.failed), (2, 4, 3, 1))
+        self.assertEqual(stats.queue_depth, 0)
+        self.assertLessEqual(stats.max_queue_depth, 2)
+        self.assertGreater(stats.latency_max, 0)
+
+    async def test_backpressure(self):
+        reader = await self.serve([BULLETIN * 20])
+        stream = TafStream(timestamp=datetime(2016, 11, 21, 23, 48), max_pending=3)
+
+        results = stream.decode(reader)
+        await results.__anext__()
+        await asyncio.sleep(0.05)
+        # Reading stopped with the pending limit reached
+        self.assertEqual(stream.stats.reports, 4)
+        self.assertEqual(stream.stats.queue_depth, 3)
+        await results.aclose()
+
+    async def test_read_bulletins(self):
+        reader = await self.serve([BULLETIN, b"\x01unterminated"])
+        bulletins = [bulletin async for bulletin in read_bulletins(reader)]
+        self.assertEqual(bulletins, [BULLETIN[1:-1]])
+
+    async def test_over_limit(self):
+        # Noise and a bulletin longer than the reader's limit
+        reader = await self.serve([b"noise" * 100, b"\x01" + b"x" * 1000 + b"\x03", BULLETIN], limit=256)
+        bulletins = [bulletin async for bulletin in read_bulletins(reader)]
+        self.assertEqual(len(bulletins), 2)
+        self.assertIsInstance(bulletins[0], pytaf.RecordError)
+        self.assertIsInstance(bulletins[0].error, asyncio.LimitOverrunError)
+        self.assertTrue(bulletins[0].raw.startswith(b"xxx"))
+        self.assertEqual(bulletins[1], BULLETIN[1:-1])
+
+        reader = await self.serve([b"\x01" + b"x" * 1000 + b"\x03", BULLETIN], limit=256)
+        stream = TafStream(timestamp=datetime(2016, 11, 21, 23, 48))
+        results = [result async for result in stream.decode(reader)]
+        self.assertEqual([bool(result) for result in results], [False, True, True])
+        self.assertEqual(results[0].index, 0)
+        self.assertEqual((stream.stats.bulletins, stream.stats.reports, stream.stats.failed), (2, 3, 1))
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pytaf
+from datetime import datetime, timezone, timedelta
+from pytaf.timeutil import to_epoch_minutes, from_epoch_minutes, MISSING_MINUTES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from fixtures import KIAH, KIAH_ISSUED, decode
+
+
+EGLL = """
+TAF AMD EGLL 121100Z 1212/1318 24015G25KT 9999 SCT030
+  PROB30 TEMPO 1212/1216 6000 SHRA
+  BECMG 1220/1223 20008KT CAVOK=
+"""
+
+
+class TimeTests(unittest.TestCase):
+
+    def test_epoch_minutes(self):
+        self.assertEqual(to_epoch_minutes(datetime(1970, 1, 1, 1, 30)), 90)
+        self.assertEqual(to_epoch_minutes(datetime(1970, 1, 1, 3, 30, tzinfo=timezone(timedelta(hours=2)))), 90)
+        self.assertEqual(from_epoch_minutes(to_epoch_minutes(datetime(2016, 11, 23, 2, 59))),
+                         datetime(2016, 11, 23, 2, 59))
+        self.assertEqual(to_epoch_minutes(None), MISSING_MINUTES)
+        self.assertIsNone(from_epoch_minutes(MISSING_MINUTES))
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ArchiveTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tafs.arc')
+        self.decoders = [decode(KIAH, KIAH_ISSUED), decode(EGLL, datetime(2016, 11, 12, 11, 0))]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip(self):
+        self.assertEqual(pytaf.write_archive(self.path, self.decoders), 2)
+        self.assertEqual(os.listdir(self.directory), ['tafs.arc'])
+
+        with pytaf.Archive(self.path) as archive:
+            self.assertEqual(len(archive), 2)
+            self.assertEqual(archive.reports['icao'].tolist(), [b'KIAH', b'EGLL'])
+            self.assertEqual(archive.reports['modifier'].tolist(), [b'', b'AMD'])
+            self.assertEqual(archive.reports['group_count'].tolist(), [len(d.groups) for d in self.decoders])
+            self.assertEqual(archive.features.shape, (len(pytaf.FeatureSchema()), len(archive.groups)))
+
+            decoder = self.decoders[1]
+            record = archive.reports[1]
+            self.assertEqual(from_epoch_minutes(record['issued']), decoder.issued_timestamp)
+            self.assertEqual(from_epoch_minutes(record['valid_from']), decoder.start_time)
+            self.assertEqual(from_epoch_minutes(record['valid_till']), decoder.end_time)
+
+            groups = archive.groups[archive.report_groups(1)]
+            self.assertEqual([archive.types[code] for code in groups['type']], [g.type for g in decoder.groups])
+            self.assertEqual(groups['prob'].tolist(), [30, 0, 0, 0])
+            self.assertEqual(groups['report'].tolist(), [1, 1, 1, 1])
+            self.assertEqual(from_epoch_minutes(groups['start'][2]), decoder.groups[2].start_time)
+
+            self.assertEqual(archive.column('visibility_M')[-4:].tolist(), [10000] * 4)
+            self.assertTrue(np.isnan(archive.column('visibility_M')[0]))
+
+            decoded = archive.decoded_taf(0)
+            self.assertEqual(decoded.icao_code, 'KIAH')
+            for (start, end, group_type, forecast), group in zip(decoded.groups, self.decoders[0].groups):
+                self.assertEqual((start, end, group_type), (group.start_time, group.end_time, group.type))
+                fill_values = dict(zip(archive.schema.names, archive.schema.fill_values))
+                expected = dict((k, v) for k, v in group.forecast.items() if v != fill_values[k])
+                self.assertEqual(sorted(forecast), sorted(expected))
+                for name, value in expected.items():
+                    self.assertAlmostEqual(forecast[name], value, places=4)
+
+    def test_schema(self):
+        schema = pytaf.FeatureSchema([('wind_speed_KT', -1), ('wind_gust_KT', -1), ('weather', 0)], 7)
+        pytaf.write_archive(self.path, self.decoders, schema)
+        with pytaf.Archive(self.path) as archive:
+            self.assertEqual(archive.schema.names, schema.names)
+            self.assertEqual(archive.schema.fill_values, (-1, -1, 0))
+            self.assertEqual(archive.schema.version, 7)
+            # The gust, absent, is left out
+            self.assertEqual(archive.forecast(0), {'wind_speed_KT': 10, 'weather': 1})
+
+    def test_decoded_taf_input(self):
+        decoded = [pytaf.DecodedTaf.from_decoder(i, decoder) for i, decoder in enumerate(self.decoders)]
+        pytaf.write_archive(self.path, decoded + [pytaf.RecordError(2, 'TAF', ValueError())])
+        with pytaf.Archive(self.path) as archive:
+            self.assertEqual(len(archive), 2)
+            self.assertEqual(archive.reports['modifier'].tolist(), [b'', b''])
+
+    def test_empty(self):
+        pytaf.write_archive(self.path, [])
+        with pytaf.Archive(self.path) as archive:
+            self.assertEqual(len(archive), 0)
+            self.assertEqual(archive.features.shape, (len(pytaf.FeatureSchema()), 0))
+
+    def test_not_an_archive(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'TAF KIAH 230259Z')
+        with self.assertRaises(pytaf.ArchiveError):
+            pytaf.Archive(self.path)
+
+        open(self.path, 'wb').close()
+        with self.assertRaises(pytaf.ArchiveError):
+            pytaf.Archive(self.path)
+
+    def test_truncated(self):
+        pytaf.write_archive(self.path, self.decoders)
+        size = os.path.getsize(self.path)
+        for length in (size - 1, size // 2, 8):
+            with open(self.path, 'r+b') as f:
+                f.truncate(length)
+            with self.assertRaises(pytaf.ArchiveError):
+                pytaf.Archive(self.path)
@@ -0,0 +1,56 @@
+import unittest
+import pytaf
+from datetime import datetime
+
+from fixtures import KEWR, KEWR_ISSUED
+
+
+class BulkTests(unittest.TestCase):
+
+    def test_parse_many(self):
+        results = list(pytaf.parse_many([KEWR, "", "not a taf"]))
+        self.assertIsInstance(results[0], pytaf.TAF)
+        self.assertEqual(results[0].get_header()['icao_code'], 'KEWR')
+        self.assertIsInstance(results[1], pytaf.RecordError)
+        self.assertEqual(results[1].index, 1)
+        self.assertIsInstance(results[1].error, pytaf.MalformedTAF)
+        self.assertFalse(results[2])
+
+    def test_decode_many(self):
+        timestamp = KEWR_ISSUED
+        records = iter([(KEWR, timestamp), (None, timestamp), (KEWR, timestamp)])
+        results = list(pytaf.decode_many(records))
+        self.assertEqual([type(r) for r in results], [pytaf.Decoder, pytaf.RecordError, pytaf.Decoder])
+        self.assertEqual(results[1].raw, None)
+        self.assertEqual(results[0].get_group(datetime(2016, 11, 23, 14, 35)).forecast['wind_speed_KT'], 11)
+
+        # There is no 29th in February 2015, decoding fails
+        february = "TAF KXXX 280900Z 2809/2924 20012KT P6SM BKN030 FM290300 22010KT P6SM SCT040="
+        results = list(pytaf.decode_many([(february, datetime(2015, 2, 10)), (february, datetime(2016, 2, 10))]))
+        self.assertEqual([type(r) for r in results], [pytaf.RecordError, pytaf.Decoder])
+        self.assertIsInstance(results[0].error, pytaf.DecodeError)
+
+        results = list(pytaf.decode_many([(KEWR, timestamp), ("not a taf", timestamp)], fields=['windshear']))
+        self.assertEqual(results[0].groups[0].forecast, {'windshear': 0})
+        self.assertFalse(results[1])
+        with self.assertRaises(ValueError):
+            list(pytaf.decode_many([(KEWR, timestamp)], cache=pytaf.TafCache(), fields=['wind']))
+
+
+class ParallelTests(unittest.TestCase):
+
+    def test_decode_parallel(self):
+        timestamp = KEWR_ISSUED
+        records = [(KEWR, timestamp), ("garbage", timestamp)] * 5
+        results = list(pytaf.decode_parallel(records, workers=2, chunk_size=3))
+        self.assertEqual([r.index for r in results], list(range(10)))
+        self.assertIsInstance(results[0], pytaf.DecodedTaf)
+        self.assertIsInstance(results[1], pytaf.RecordError)
+        self.assertEqual(results[2].icao_code, 'KEWR')
+        self.assertEqual(results[2].start_time, datetime(2016, 11, 23, 3, 0))
+        self.assertEqual(results[2].groups[0][3]['wind_gust_KT'], 18)
+
+    def test_decode_parallel_unordered(self):
+        timestamp = KEWR_ISSUED
+        results = pytaf.decode_parallel([(KEWR, timestamp)] * 7, workers=2, chunk_size=2, ordered=False)
+        self.assertEqual(sorted(r.index for r in results), list(range(7)))
@@ -0,0 +1,70 @@
+import unittest
+import pytaf
+from datetime import datetime
+
+from fixtures import KEWR, KEWR_ISSUED
+
+
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = pytaf.TafCache(maxsize=2)
+
+    def test_taf_hits(self):
+        taf = self.cache.get_taf(KEWR)
+        again = self.cache.get_taf(KEWR.strip() + "=")
+        self.assertIsNot(again, taf)
+        self.assertEqual((again.get_header(), again.get_groups()), (taf.get_header(), taf.get_groups()))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_decoder_keyed_on_month(self):
+        decoder = self.cache.get_decoder(KEWR, KEWR_ISSUED)
+        same = self.cache.get_decoder(KEWR, datetime(2016, 11, 1))
+        self.assertEqual([(g.start_time, g.forecast) for g in same.groups],
+                         [(g.start_time, g.forecast) for g in decoder.groups])
+        # Only the decoder lookups count, not the TAF looked up to decode
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        other = self.cache.get_decoder(KEWR, datetime(2016, 12, 23))
+        self.assertEqual(other.start_time, datetime(2016, 12, 23, 3, 0))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        # The report is parsed once
+        self.assertIn(('taf', KEWR.strip().strip('=').strip()), self.cache._entries)
+
+    def test_eviction(self):
+        self.cache.get_taf(KEWR)
+        self.cache.get_taf(KEWR.replace("KEWR", "KJFK"))
+        self.cache.get_taf(KEWR)
+        self.cache.get_taf(KEWR.replace("KEWR", "KLGA"))
+        self.assertEqual(self.cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 3, 'evictions': 1})
+        self.assertEqual(self.cache.get_taf(KEWR).get_header()['icao_code'], 'KEWR')
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_copies(self):
+        taf = self.cache.get_taf(KEWR)
+        taf.get_header()['icao_code'] = 'KJFK'
+        del taf.get_groups()[1:]
+        taf = self.cache.get_taf(KEWR)
+        self.assertEqual((taf.get_header()['icao_code'], len(taf.get_groups())), ('KEWR', 5))
+
+        decoder = self.cache.get_decoder(KEWR, KEWR_ISSUED)
+        decoder.groups[0].forecast['wind_speed_KT'] = 99
+        decoder.groups[0].wind['wind_speed_KT'] = 99
+        decoder.groups[1].header['type'] = 'TEMPO'
+        decoder.groups.pop()
+        decoder = self.cache.get_decoder(KEWR, KEWR_ISSUED)
+        self.assertEqual(len(decoder.groups), 5)
+        self.assertEqual((decoder.groups[0].forecast['wind_speed_KT'], decoder.groups[0].wind['wind_speed_KT']), (12, 12))
+        self.assertEqual(decoder.groups[1].header['type'], 'FM')
+
+    def test_shared_taf_survives_decode_taf(self):
+        decoder = self.cache.get_decoder(KEWR, KEWR_ISSUED)
+        decoder.decode_taf()
+        other = self.cache.get_decoder(KEWR, datetime(2016, 12, 23))
+        self.assertEqual(other.issued_timestamp, datetime(2016, 12, 23, 2, 32))
+
+    def test_decode_many_with_cache(self):
+        timestamp = KEWR_ISSUED
+        results = list(pytaf.decode_many([(KEWR, timestamp)] * 3, cache=self.cache))
+        self.assertIsNot(results[0], results[2])
+        self.assertEqual([g.forecast for g in results[0].groups], [g.forecast for g in results[2].groups])
+        self.assertEqual(self.cache.hits, 2)
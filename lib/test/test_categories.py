@@ -0,0 +1,83 @@
+import unittest
+import pytaf
+from datetime import datetime, timedelta
+from pytaf.categories import CATEGORY_FIELDS, CATEGORY_SCHEMA, UNKNOWN, VFR, MVFR, IFR, LIFR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+KMSP = """
+TAF KMSP 272329Z 2800/2906 12008KT P6SM FEW005 BKN040 FM280500
+  VRB03KT 1 1/2SM -FZDZ BR OVC006
+ TEMPO 2810/2814 1/2SM FZFG VV002 FM281600 12008KT 4SM BR SCT030 FM282200
+  12008KT P6SM BKN250=
+"""
+
+EGLL = "TAF EGLL 212300Z 2200/2306 22010KT 9999 SCT030 BECMG 2203/2205 4000 BR BKN008="
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class CategoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pytaf.CategoryTable()
+        self.decoder = pytaf.Decoder(pytaf.TAF(KMSP), datetime(2016, 11, 27, 23, 29))
+
+    def test_classify(self):
+        categories = self.table.classify([np.nan, 3000, 3100, 900, 300, np.nan], [10, 6, 5, 6, 6, 0.5])
+        self.assertEqual(categories.dtype, np.int8)
+        self.assertEqual(list(categories), [VFR, MVFR, MVFR, IFR, LIFR, LIFR])
+
+        table = pytaf.CategoryTable([(IFR, 1000, 3, False)])
+        self.assertEqual(list(table.classify([900, 3000], [6, 6])), [IFR, VFR])
+
+    def test_groups(self):
+        self.assertEqual([g.type for g in self.decoder.groups], ['MAIN', 'FM', 'TEMPO', 'FM-EXT', 'FM', 'FM'])
+        categories = self.table.groups(self.decoder)
+        # FEW005 stands in for the ceiling
+        self.assertEqual(list(categories), [IFR, IFR, LIFR, IFR, MVFR, VFR])
+
+        decoded = pytaf.DecodedTaf.from_decoder(0, self.decoder)
+        self.assertEqual(list(self.table.groups(decoded)), list(categories))
+
+    def test_broken_ceiling(self):
+        self.assertNotIn('clouds_ceiling_broken_ft', self.decoder.groups[0].forecast)
+        decoder = pytaf.Decoder(pytaf.TAF(KMSP), datetime(2016, 11, 27, 23, 29), fields=CATEGORY_FIELDS)
+        self.assertEqual(decoder.groups[0].forecast['clouds_ceiling_broken_ft'], 40)
+        # FEW005 is not a ceiling, BKN040 is
+        self.assertEqual(list(self.table.groups(decoder)), [VFR, IFR, LIFR, IFR, MVFR, VFR])
+        self.assertEqual(list(self.table.timeline(decoder, timedelta(hours=6))[1][:5]), [VFR, IFR, LIFR, MVFR, VFR])
+
+    def test_meters(self):
+        decoder = pytaf.Decoder(pytaf.TAF(EGLL), datetime(2016, 11, 21, 23))
+        self.assertEqual(decoder.groups[0].forecast['visibility_M'], 10000)
+        self.assertEqual(list(self.table.groups(decoder))[:2], [VFR, IFR])
+
+    def test_timeline(self):
+        times, categories = self.table.timeline(self.decoder, timedelta(hours=6))
+        self.assertEqual(len(times), len(categories))
+        self.assertEqual(list(categories[:5]), [IFR, IFR, LIFR, MVFR, VFR])
+        for time, category in zip(times, categories):
+            group = self.decoder.get_group(time.astype(datetime))
+            self.assertEqual(category, self.table.groups(self.decoder)[self.decoder.groups.index(group)])
+
+    def test_in_force(self):
+        # Absent features are unlimited, rows not in force are marked as such
+        matrix = CATEGORY_SCHEMA.empty(3)
+        self.assertEqual(list(self.table.from_matrix(matrix)), [VFR] * 3)
+        self.assertEqual(list(self.table.from_matrix(matrix, in_force=[True, False, True])), [VFR, UNKNOWN, VFR])
+
+    def test_worst_over_window(self):
+        categories = np.array([VFR, MVFR, VFR, LIFR, VFR, UNKNOWN], dtype=np.int8)
+        self.assertEqual(list(pytaf.worst_over_window(categories, 1)), list(categories))
+        self.assertEqual(list(pytaf.worst_over_window(categories, 2)), [MVFR, MVFR, LIFR, LIFR, VFR, UNKNOWN])
+
+        rows = pytaf.worst_over_window(np.vstack([categories, categories[::-1]]), 3)
+        self.assertEqual(rows.shape, (2, 6))
+        self.assertEqual(list(rows[1]), [LIFR, LIFR, LIFR, MVFR, MVFR, VFR])
+
+        with self.assertRaises(ValueError):
+            pytaf.worst_over_window(categories, 0)
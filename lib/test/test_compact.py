@@ -0,0 +1,65 @@
+import pickle
+import unittest
+import pytaf
+
+from pytaf.timeutil import to_epoch_minutes
+
+from fixtures import KIAH, KIAH_ISSUED, decode
+
+
+class CompactGroupTests(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = decode(KIAH, KIAH_ISSUED)
+        self.groups = pytaf.compact_groups(self.decoder)
+
+    def test_matches_decoded_groups(self):
+        schema = pytaf.FeatureSchema()
+        self.assertEqual(len(self.groups), len(self.decoder.groups))
+        for group, compact in zip(self.decoder.groups, self.groups):
+            self.assertEqual((compact.start_time, compact.end_time, compact.type),
+                             (group.start_time, group.end_time, group.type))
+            self.assertEqual(compact.start, to_epoch_minutes(group.start_time))
+            forecast = dict((name, value) for name, value in group.forecast.items() if name in schema.index)
+            self.assertEqual(dict(compact.forecast), forecast)
+
+        forecast = self.groups[0].forecast
+        self.assertEqual(forecast['wind_speed_KT'], 10)
+        self.assertNotIn('wx_phenomenon_TS', forecast)
+        with self.assertRaises(KeyError):
+            forecast['wx_phenomenon_TS']
+        with self.assertRaises(TypeError):
+            forecast['wind_speed_KT'] = 5
+
+    def test_shared_and_pickled(self):
+        # The FM group carries on after the TEMPO group with the same features
+        self.assertIs(self.groups[1]._columns, self.groups[3]._columns)
+        with self.assertRaises(AttributeError):
+            self.groups[0].visibility = 6
+
+        groups = pickle.loads(pickle.dumps(self.groups))
+        self.assertEqual([(group.start, group.end, group.type, dict(group.forecast)) for group in groups],
+                         [(group.start, group.end, group.type, dict(group.forecast)) for group in self.groups])
+        self.assertIs(groups[1]._columns, self.groups[1]._columns)
+        # The default schema is pickled by reference
+        self.assertIs(groups[0].schema, pytaf.features.DEFAULT_SCHEMA)
+        self.assertNotIn(b'wind_speed_KT', pickle.dumps(self.groups))
+
+    def test_schema_column_sets(self):
+        schema = pytaf.FeatureSchema([('wind_speed_KT', pytaf.features.NAN), ('wind_dir', pytaf.features.NAN)])
+        groups = pytaf.compact_groups(self.decoder, schema)
+        self.assertEqual(dict(groups[0].forecast), {'wind_speed_KT': 10, 'wind_dir': 160})
+        self.assertIs(groups[0]._columns, groups[1]._columns)
+        self.assertEqual(len(schema._column_sets), 1)
+
+        loaded = pickle.loads(pickle.dumps(groups))
+        self.assertEqual(loaded[0].schema.names, schema.names)
+        self.assertEqual(dict(loaded[0].forecast), dict(groups[0].forecast))
+        self.assertIs(loaded[0]._columns, loaded[-1]._columns)
+
+        with self.assertRaises(ValueError):
+            pytaf.features._default_schema(pytaf.features.SCHEMA_VERSION + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import math
+import unittest
+import pytaf
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from fixtures import KIAH, KIAH_ISSUED, decode
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class FeatureMatrixTests(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = decode(KIAH, KIAH_ISSUED)
+        self.schema = pytaf.FeatureSchema()
+
+    def column(self, name):
+        return self.schema.index[name]
+
+    def test_feature_matrix(self):
+        times = [datetime(2016, 11, 23, 10), datetime(2016, 11, 23, 12), datetime(2016, 11, 23, 13),
+                 datetime(2016, 11, 25)]
+        matrix = pytaf.feature_matrix([self.decoder], [times], self.schema)
+        self.assertEqual(matrix.shape, (4, len(self.schema)))
+
+        for row, time in enumerate(times[:3]):
+            forecast = self.decoder.get_group(time).forecast
+            for name, column in self.schema.index.items():
+                if name in forecast:
+                    self.assertEqual(matrix[row, column], forecast[name])
+
+        self.assertEqual(matrix[0, self.column('wx_intensity_light')], 1)
+        self.assertEqual(matrix[1, self.column('wx_intensity_light')], 0)
+        self.assertTrue(math.isnan(matrix[1, self.column('visibility_vertical_ft')]))
+        self.assertTrue(np.isnan(matrix[3]).all())
+
+    def test_several_decoders(self):
+        other = decode(KIAH.replace("KIAH", "KHOU"), datetime(2016, 12, 23, 2, 59))
+        matrix = pytaf.feature_matrix([self.decoder, other],
+                                      [[datetime(2016, 11, 23, 3)], [datetime(2016, 12, 24, 3), datetime(2016, 12, 24, 4)]],
+                                      dtype=np.float32)
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(list(matrix[:, self.column('wind_dir')]), [160, 340, 340])
+
+    def test_resample(self):
+        times, matrix = self.decoder.resample()
+        self.assertEqual(len(times), 28)
+        self.assertEqual(times[0], np.datetime64('2016-11-23T03:00'))
+        self.assertEqual(times[-1], np.datetime64('2016-11-24T06:00'))
+        expected = pytaf.feature_matrix([self.decoder], [times.astype(datetime).tolist()])
+        np.testing.assert_array_equal(matrix, expected)
+        np.testing.assert_array_equal(matrix, pytaf.feature_matrix([self.decoder], [times]))
+
+    def test_sparse_features(self):
+        groups = self.decoder.groups + [None]
+        indptr, indices, data = pytaf.sparse_features(groups, self.schema)
+        self.assertEqual(len(indptr), len(groups) + 1)
+        self.assertEqual((indptr.dtype, indices.dtype, data.dtype), (np.int64, np.int32, np.float64))
+        for row, group in enumerate(self.decoder.groups):
+            columns = indices[indptr[row]:indptr[row + 1]]
+            self.assertEqual(columns.tolist(), sorted(columns.tolist()))
+            self.assertEqual(dict(zip((self.schema.names[column] for column in columns), data[indptr[row]:indptr[row + 1]])),
+                             dict((name, value) for name, value in group.forecast.items() if name in self.schema.index))
+        self.assertEqual(indptr[-1], indptr[-2])
+
+        compact = pytaf.sparse_features(pytaf.compact_groups(self.decoder, self.schema) + [None], self.schema,
+                                        dtype=np.float32)
+        self.assertEqual(compact[2].dtype, np.float32)
+        for expected, array in zip((indptr, indices, data), compact):
+            np.testing.assert_array_equal(array, expected.astype(array.dtype))
+
+    def test_group_indices(self):
+        starts, ends = self.decoder.group_times(datetime64=True)
+        self.assertEqual(starts[0], np.datetime64('2016-11-23T03:00'))
+        self.assertEqual(ends[-1], np.datetime64('2016-11-24T06:00'))
+        np.testing.assert_array_equal(self.decoder.group_times()[0], starts.astype(np.int64))
+
+        times = [datetime(2016, 11, 24, 6), datetime(2016, 11, 23, 12), datetime(2016, 11, 23, 2),
+                 datetime(2016, 11, 23, 14), datetime(2016, 11, 24, 6, 1)]
+        expected = [self.decoder.groups.index(group) if group else -1 for group in map(self.decoder.get_group, times)]
+        self.assertEqual(expected[2], -1)
+        for argument in (times, np.array(times, dtype='datetime64[m]'), pytaf.timeutil.epoch_minutes_array(times)):
+            self.assertEqual(self.decoder.group_indices(argument).tolist(), expected)
+
+        # Groups out of order are looked up one by one
+        taf = pytaf.TAF("TAF KXXX 311130Z 2912/3012 10010KT P6SM SKC FM291800 09010KT P6SM SCT010 "
+                        "FM281800 27010KT P6SM SCT020 TEMPO 0109/2815 2SM BR=")
+        decoder = pytaf.Decoder(taf, datetime(2016, 4, 15))
+        self.assertEqual(decoder.group_indices([datetime(2016, 5, 28, 18, 30)]).tolist(), [len(decoder.groups) - 1])
+
+        self.assertEqual(pytaf.timeutil.days_in_month(2016, 2), 29)
+        self.assertEqual(pytaf.timeutil.days_in_month(1900, 2), 28)
+
+    def test_resample_alignment(self):
+        times, matrix = self.decoder.resample(timedelta(minutes=10), origin=datetime(2016, 11, 23, 2, 55))
+        self.assertEqual(times[0], np.datetime64('2016-11-23T03:05'))
+        self.assertEqual(matrix.shape, (len(times), len(self.schema)))
+        self.assertEqual(matrix[-1, self.column('wind_dir')], 340)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pytaf
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+REPORTS = [
+    "TAF KDEN 010520Z 0106/0212 16010KT P6SM SCT080 FM011800 24015G25KT P6SM BKN100=",
+    "TAF KMSP 010530Z 0106/0212 12008KT P6SM FEW050 FM011200 VRB03KT 3SM -SN OVC015=",
+    "TAF AMD KDEN 011140Z 0112/0212 24012KT P6SM SCT100=",
+    "TAF KDEN 021120Z 0212/0318 VRB05KT P6SM SKC=",
+]
+
+
+class IndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.raw_path = os.path.join(self.directory, '2016-03.txt')
+        self.index_path = os.path.join(self.directory, 'tafs.idx')
+        self.timestamp = datetime(2016, 3, 1)
+        self.write_raw(REPORTS[:3] + ["TAF KXXX garbage="])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_raw(self, reports, mode='w'):
+        with open(self.raw_path, mode) as f:
+            for report in reports:
+                f.write("\n" + report[:40] + "\n  " + report[40:] + "\n")
+
+    def test_find(self):
+        index = pytaf.TafIndex(self.index_path)
+        self.assertEqual(index.add_raw(self.raw_path, self.timestamp), 3)
+        self.assertEqual(index.stations(), ['KDEN', 'KMSP'])
+
+        entries = index.find('KDEN')
+        self.assertEqual([e.issued_timestamp for e in entries],
+                         [datetime(2016, 3, 1, 5, 20), datetime(2016, 3, 1, 11, 40)])
+        self.assertEqual(entries[0].valid_from_timestamp, datetime(2016, 3, 1, 6))
+        self.assertEqual(entries[0].valid_till_timestamp, datetime(2016, 3, 2, 12))
+
+        self.assertEqual(len(index.find(issued_from=datetime(2016, 3, 1, 5, 30))), 2)
+        self.assertEqual(len(index.find(['KDEN', 'KMSP'], issued_till=datetime(2016, 3, 1, 5, 30))), 1)
+        self.assertEqual(len(index.find('KDEN', valid_at=datetime(2016, 3, 1, 8))), 1)
+        self.assertEqual(index.find('EGLL'), [])
+
+        tafs = list(index.tafs(entries))
+        self.assertEqual([taf.get_header()['icao_code'] for taf in tafs], ['KDEN', 'KDEN'])
+        self.assertEqual(tafs[1].get_header()['modifier'], 'AMD')
+
+    def test_incremental(self):
+        index = pytaf.TafIndex(self.index_path)
+        index.add_raw(self.raw_path, self.timestamp)
+        self.assertEqual(index.add_raw(self.raw_path, self.timestamp), 0)
+
+        # An unterminated report is picked up once it is complete
+        with open(self.raw_path, 'a') as f:
+            f.write(REPORTS[3][:-1])
+        self.assertEqual(index.add_raw(self.raw_path, self.timestamp), 0)
+        with open(self.raw_path, 'a') as f:
+            f.write("=\n")
+        self.assertEqual(index.add_raw(self.raw_path, self.timestamp), 1)
+
+        reloaded = pytaf.TafIndex(self.index_path)
+        self.assertEqual(len(reloaded), 4)
+        self.assertEqual([e.offset for e in reloaded.find('KDEN')], [e.offset for e in index.find('KDEN')])
+        self.assertEqual(reloaded.add_raw(self.raw_path, self.timestamp), 0)
+        taf, = reloaded.tafs(reloaded.find('KDEN', issued_from=datetime(2016, 3, 2)))
+        self.assertEqual(taf.get_taf(), REPORTS[3][:-1])
+
+    def test_bulletins(self):
+        with open(self.raw_path, 'wb') as f:
+            f.write(b"\x01\r\r\n124\r\r\nFTUS43 KDEN 011140 AAA\r\r\nTAF AMD\r\r\n"
+                    + REPORTS[2][8:].encode('ascii') + b"\r\r\n" + REPORTS[1][4:].encode('ascii') + b"\r\r\n\x03")
+        index = pytaf.TafIndex(self.index_path)
+        self.assertEqual(index.add_raw(self.raw_path, self.timestamp), 2)
+
+        reloaded = pytaf.TafIndex(self.index_path)
+        self.assertEqual([e.prefix for e in reloaded.find()], ['TAF AMD', 'TAF AMD'])
+        self.assertEqual([taf.get_header()['modifier'] for taf in reloaded.tafs(reloaded.find())], ['AMD', 'AMD'])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_archive(self):
+        archive_path = os.path.join(self.directory, 'tafs.arc')
+        pytaf.write_archive(archive_path, pytaf.decode_many((report, self.timestamp) for report in REPORTS))
+
+        index = pytaf.TafIndex(self.index_path)
+        self.assertEqual(index.add_archive(archive_path), 4)
+        self.assertEqual(index.add_archive(archive_path), 0)
+
+        entries = index.find('KDEN', issued_from=datetime(2016, 3, 1, 6))
+        self.assertEqual([e.offset for e in entries], [2, 3])
+        decoded = list(index.decoded(entries))
+        self.assertEqual([d.issued_timestamp for d in decoded], [e.issued_timestamp for e in entries])
+        self.assertEqual(len(pytaf.TafIndex(self.index_path).find('KDEN')), 3)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pytaf
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+REPORTS = [
+    ("TAF KDEN 010520Z 0106/0212 16010KT P6SM SCT080 FM011800 24015G25KT 2SM FZDZ OVC008=",
+     datetime(2016, 1, 1)),
+    ("TAF KMSP 010530Z 0106/0212 12008KT P6SM FEW050 FM011200 VRB03KT 3SM -FZRA OVC005=",
+     datetime(2016, 1, 1)),
+    ("TAF KDEN 020520Z 0206/0312 VRB05KT 1SM -FZDZ BKN004=",
+     datetime(2016, 1, 1)),
+    ("TAF KIAH 010520Z 0106/0212 16010KT 1SM BR OVC003=",
+     datetime(2016, 1, 1)),
+]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class QueryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'tafs.arc')
+        pytaf.write_archive(path, pytaf.decode_many(REPORTS))
+        self.archive = pytaf.Archive(path)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.directory)
+
+    def freezing_low_ceiling(self):
+        return pytaf.Query(self.archive).where('clouds_ceiling_ft', '<', 10).where('wx_modifier_FZ', '==', 1)
+
+    def test_predicates(self):
+        result = self.freezing_low_ceiling().run()
+        self.assertEqual([row[:3] for row in result.rows()], [
+            ('KDEN', datetime(2016, 1, 1, 5, 20), datetime(2016, 1, 1, 18)),
+            ('KMSP', datetime(2016, 1, 1, 5, 30), datetime(2016, 1, 1, 12)),
+            ('KDEN', datetime(2016, 1, 2, 5, 20), datetime(2016, 1, 2, 6)),
+        ])
+        self.assertEqual(result.reports.tolist(), [0, 1, 2])
+        self.assertEqual(result.column('clouds_ceiling_ft').tolist(), [8, 5, 4])
+
+        self.assertEqual(len(pytaf.Query(self.archive).where('visibility_SM', 'in', [1, 2]).run()), 3)
+        self.assertEqual(len(pytaf.Query(self.archive).run()), len(self.archive.groups))
+
+        with self.assertRaises(ValueError):
+            pytaf.Query(self.archive).where('ceiling', '<', 10)
+        with self.assertRaises(ValueError):
+            pytaf.Query(self.archive).where('clouds_ceiling_ft', '~', 10)
+
+    def test_stations_and_times(self):
+        result = self.freezing_low_ceiling().stations(['KDEN', 'KIAH']).run()
+        self.assertEqual(result.reports.tolist(), [0, 2])
+
+        result = self.freezing_low_ceiling().stations('KDEN').issued(datetime(2016, 1, 2)).run()
+        self.assertEqual(result.reports.tolist(), [2])
+
+        result = self.freezing_low_ceiling().valid(datetime(2016, 1, 1, 6), datetime(2016, 1, 1, 12)).run()
+        self.assertEqual(len(result), 0)
+        result = self.freezing_low_ceiling().valid(end=datetime(2016, 1, 1, 12, 1)).run()
+        self.assertEqual(result.reports.tolist(), [1])
+
+    def test_matches_decoded_groups(self):
+        expected = []
+        for decoder in pytaf.decode_many(REPORTS):
+            for group in decoder.groups:
+                if group.forecast.get('visibility_SM', 10) <= 2 and group.forecast.get('weather'):
+                    expected.append((decoder._taf.get_header()['icao_code'], decoder.issued_timestamp,
+                                     group.start_time, group.end_time, group.type))
+        result = pytaf.Query(self.archive).where('visibility_SM', '<=', 2).where('weather', '==', 1).run()
+        self.assertEqual(list(result.rows()), expected)
+
+    def test_absent_features(self):
+        count = len(self.archive.groups)
+        freezing = len(pytaf.Query(self.archive).where('wx_modifier_FZ', '==', 1).run())
+        # Absent indicators are 0
+        self.assertEqual(len(pytaf.Query(self.archive).where('wx_modifier_FZ', '==', 0).run()), count - freezing)
+        self.assertEqual(len(pytaf.Query(self.archive).where('wx_modifier_FZ', '!=', 0).run()), freezing)
+        # Absent measurements are NaN
+        self.assertEqual(len(pytaf.Query(self.archive).where('wind_gust_KT', '==', 0).run()), 0)
+        self.assertEqual(len(pytaf.Query(self.archive).where('wind_gust_KT', '!=', 25).run()), count - 1)
@@ -0,0 +1,81 @@
+import io
+import math
+import unittest
+import pytaf
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from fixtures import decode
+
+
+RUNWAYS = """icao,runway,heading,length_ft
+KIAH,09,90,10000
+KIAH,27,270,10000
+KIAH,15L,150,12001
+KIAH,33R,330,12001
+"""
+
+# Winds from every side of the runways
+KIAH_WINDS = """
+TAF KIAH 230259Z 2303/2406 15010KT P6SM VCSH FEW028 FM230900
+  27015G25KT P6SM -RA SCT015 FM231600 VRB04KT P6SM SKC FM240000
+  00000KT P6SM SKC=
+"""
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class RunwayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pytaf.RunwayTable.from_csv(io.StringIO(RUNWAYS))
+        self.decoder = decode(KIAH_WINDS, datetime(2016, 11, 23, 2, 59))
+
+    def test_table(self):
+        self.assertIn('KIAH', self.table)
+        self.assertNotIn('KMSP', self.table)
+        runways, headings = self.table.runways('KIAH')
+        self.assertEqual(runways, ('09', '27', '15L', '33R'))
+        self.assertEqual(list(headings), [90, 270, 150, 330])
+
+        with self.assertRaises(ValueError):
+            pytaf.RunwayTable.from_csv(io.StringIO("icao,runway,heading\nKIAH,09,east\n"))
+
+    def test_winds(self):
+        winds = self.table.winds(self.decoder)
+        self.assertEqual(winds.headwind.shape, (4, 4))
+
+        # 150 at 10 knots: straight down 15L
+        self.assertAlmostEqual(winds.headwind[0, 2], 10)
+        self.assertAlmostEqual(winds.crosswind[0, 2], 0)
+        self.assertAlmostEqual(winds.headwind[0, 0], 10 * math.cos(math.radians(60)))
+        self.assertAlmostEqual(winds.crosswind[0, 0], 10 * math.sin(math.radians(60)))
+        self.assertTrue(np.isnan(winds.gust_crosswind[0]).all())
+
+        # 270 gusting 25: tailwind on 09, gust across 15L/33R
+        self.assertAlmostEqual(winds.headwind[1, 0], -15)
+        self.assertAlmostEqual(winds.gust_crosswind[1, 2], 25 * math.sin(math.radians(60)))
+
+        # Variable wind is all across
+        self.assertEqual(list(winds.headwind[2]), [0, 0, 0, 0])
+        self.assertEqual(list(winds.crosswind[2]), [4, 4, 4, 4])
+
+        self.assertEqual(winds.best_runways(), ['15L', '27', '09', '09'])
+
+    def test_decoded_taf(self):
+        decoded = pytaf.DecodedTaf.from_decoder(0, self.decoder)
+        expected = self.table.winds(self.decoder)
+        winds = self.table.winds(decoded)
+        np.testing.assert_array_equal(winds.crosswind, expected.crosswind)
+        np.testing.assert_array_equal(winds.best, expected.best)
+
+    def test_meters_per_second(self):
+        forecasts = [{'wind': 1, 'wind_speed_MPS': 10, 'wind_dir': 0}, {'wind': 0}]
+        winds = pytaf.runway_winds(forecasts, [0, 90])
+        self.assertEqual(winds.runways, ('000', '090'))
+        self.assertAlmostEqual(winds.headwind[0, 0], 10 * pytaf.runways.KNOTS_PER_MPS)
+        self.assertTrue(np.isnan(winds.crosswind[1]).all())
+        self.assertEqual(list(winds.best), [0, -1])
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pytaf
+from pytaf.splitter import scan_reports
+
+
+BULLETIN = (b"\x01\r\r\n123\r\r\nFTUS43 KMSP 212348\r\r\nTAFMSP\r\r\n"
+            b"TAF\r\r\nKMSP 212348Z 2200/2306 11010KT P6SM BKN250\r\r\n"
+            b"     FM220600 11011KT P6SM SCT080 BKN110=\r\r\n"
+            b"KMKE 212348Z 2200/2306 13008KT P6SM SCT250=\r\r\n\x03")
+
+AMENDED = (b"\x01\r\r\n124\r\r\nFTUS43 KDEN 220120 AAA\r\r\n"
+           b"TAF AMD\r\r\nKDEN 220120Z 2201/2306 VRB05KT P6SM SKC=\r\r\n\x03")
+
+CYCLE = (b"2016/11/21 23:48\n"
+         b"TAF\n      KMSP 212348Z 2200/2306 11010KT P6SM BKN250\n"
+         b"      FM220600 11011KT P6SM SCT080 BKN110\n\n"
+         b"2016/11/21 23:50\n"
+         b"TAF AMD KDEN 212350Z 2200/2306 VRB05KT P6SM SKC\n\n")
+
+
+class SplitterTests(unittest.TestCase):
+
+    def test_bulletins(self):
+        reports = list(pytaf.iter_reports(BULLETIN + AMENDED))
+        self.assertEqual(reports, [
+            b"TAF\nKMSP 212348Z 2200/2306 11010KT P6SM BKN250\r\r\n     FM220600 11011KT P6SM SCT080 BKN110",
+            b"TAF\nKMKE 212348Z 2200/2306 13008KT P6SM SCT250",
+            b"TAF AMD\nKDEN 220120Z 2201/2306 VRB05KT P6SM SKC",
+        ])
+        header = pytaf.TAF(reports[1].decode('latin-1')).get_header()
+        self.assertEqual(header['icao_code'], 'KMKE')
+
+    def test_cycle_file(self):
+        reports = list(pytaf.iter_reports(CYCLE))
+        self.assertEqual(reports, [
+            b"TAF\nKMSP 212348Z 2200/2306 11010KT P6SM BKN250\n      FM220600 11011KT P6SM SCT080 BKN110",
+            b"TAF AMD KDEN 212350Z 2200/2306 VRB05KT P6SM SKC",
+        ])
+        self.assertEqual(pytaf.TAF(reports[1].decode('latin-1')).get_header()['modifier'], 'AMD')
+
+    def test_not_final(self):
+        data = BULLETIN + AMENDED[:60]
+        spans = list(scan_reports(data, final=False))
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[-1].consumed, BULLETIN.index(b"=\r\r\n\x03") + 1)
+        # The report is complete once its terminator is there
+        spans = list(scan_reports(BULLETIN + AMENDED, spans[-1].consumed, final=False))
+        self.assertEqual([span.prefix for span in spans], [b"TAF AMD"])
+        self.assertEqual(len(list(scan_reports(data))), 3)
+
+    def test_report_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'cycle.txt')
+        with open(path, 'wb') as f:
+            f.write(CYCLE)
+        with pytaf.ReportFile(path) as reports:
+            self.assertEqual(list(reports), list(pytaf.iter_reports(CYCLE)))
+            first, second = reports.spans()
+            self.assertEqual([span.start for span in reports.spans(first.consumed)], [second.start])
+
+        open(path, 'wb').close()
+        with pytaf.ReportFile(path) as reports:
+            self.assertEqual(list(reports), [])
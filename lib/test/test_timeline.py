@@ -0,0 +1,95 @@
+import unittest
+import pytaf
+from datetime import datetime, timedelta
+
+from fixtures import decode
+
+
+ISSUES = [
+    ("TAF KEWR 230232Z 2303/2406 30012G18KT P6SM BKN040 FM231400 31011G17KT P6SM SKC",
+     datetime(2016, 11, 23, 2, 32)),
+    ("TAF KEWR 230820Z 2309/2412 29009KT P6SM SCT040 FM231600 32015KT P6SM SKC",
+     datetime(2016, 11, 23, 8, 20)),
+    ("TAF AMD KEWR 231025Z 2310/2412 28008KT P6SM SCT040 FM231600 32020KT P6SM SKC",
+     datetime(2016, 11, 23, 10, 25)),
+]
+
+
+class TimelineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.timeline = pytaf.StationTimeline()
+        for raw, timestamp in reversed(ISSUES):
+            self.timeline.add(decode(raw, timestamp))
+
+    def wind(self, *args, **kwargs):
+        return self.timeline.forecast_at(*args, **kwargs).forecast['wind_speed_KT']
+
+    def test_forecast_in_force(self):
+        self.assertEqual(self.timeline.icao_code, 'KEWR')
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 5)), 12)
+        # Second issue is not valid until 09:00
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 8, 30)), 12)
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 9, 30)), 9)
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 17)), 20)
+        self.assertIsNone(self.timeline.forecast_at(datetime(2016, 11, 25)))
+
+    def test_lead_time(self):
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 17), lead=timedelta(hours=8)), 15)
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 17), lead=timedelta(hours=12)), 11)
+
+    def test_correction_replaces(self):
+        raw, timestamp = ISSUES[2]
+        self.timeline.add(decode(raw.replace("AMD", "COR").replace("32020KT", "32025KT"), timestamp))
+        self.assertEqual(len(self.timeline), 4)
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 17)), 25)
+        self.timeline.add(decode(raw.replace("AMD", "COR").replace("32020KT", "32030KT"), timestamp))
+        self.assertEqual(len(self.timeline), 4)
+        self.assertEqual(self.wind(datetime(2016, 11, 23, 17)), 30)
+
+    def test_delayed_supersedes_original(self):
+        raw, timestamp = ISSUES[1]
+        delayed = decode(raw.replace("TAF", "TAF RTD").replace("29009KT", "29014KT"), timestamp)
+        for issues in ([decode(raw, timestamp), delayed], [delayed, decode(raw, timestamp)]):
+            timeline = pytaf.StationTimeline()
+            for decoder in issues:
+                timeline.add(decoder)
+            self.assertEqual(len(timeline), 2)
+            self.assertIs(timeline.issue_at(datetime(2016, 11, 23, 9, 30)), delayed)
+
+    def test_expiry(self):
+        timeline = pytaf.StationTimeline(retention=timedelta(hours=1))
+        for raw, timestamp in ISSUES:
+            timeline.add(decode(raw, timestamp))
+        timeline.add(decode(ISSUES[0][0].replace("230232Z 2303/2406", "241432Z 2415/2518"),
+                            datetime(2016, 11, 24, 14, 32)))
+        self.assertEqual(len(timeline), 1)
+        self.assertEqual(timeline.forecast_at(datetime(2016, 11, 24, 16)).forecast['wind_speed_KT'], 12)
+        self.assertIsNone(timeline.forecast_at(datetime(2016, 11, 24, 6)))
+
+    def test_older_issue_outlasting(self):
+        self.timeline.add(decode("TAF KEWR 230520Z 2306/2418 27010KT P6SM SCT040 FM241200 27030KT P6SM SKC",
+                                 datetime(2016, 11, 23, 5, 20)))
+        self.assertEqual(self.wind(datetime(2016, 11, 24, 14)), 30)
+        self.assertEqual(self.wind(datetime(2016, 11, 24, 11)), 20)
+        self.assertIsNone(self.timeline.forecast_at(datetime(2016, 11, 24, 19)))
+
+    def test_undecoded(self):
+        # Decoding fails at the 29th of February 2015, after the first groups
+        decoder = decode("TAF KEWR 272329Z 2800/2906 12008KT P6SM FM280500 VRB03KT 2SM BR FM282200 12008KT P6SM",
+                         datetime(2015, 2, 10))
+        self.assertTrue(decoder.groups)
+        self.assertRaises(pytaf.DecodeError, self.timeline.add, decoder)
+        self.assertRaises(pytaf.DecodeError, pytaf.TimelineIndex().add, decoder)
+        self.assertEqual(len(self.timeline), 3)
+
+    def test_index(self):
+        index = pytaf.TimelineIndex()
+        for raw, timestamp in ISSUES:
+            index.add(decode(raw, timestamp))
+            index.add(decode(raw.replace("KEWR", "KJFK"), timestamp))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(index['KJFK']), 3)
+        self.assertEqual(index.forecast_at('KJFK', datetime(2016, 11, 23, 9, 30)).forecast['wind_speed_KT'], 9)
+        self.assertIsNone(index.forecast_at('KLGA', datetime(2016, 11, 23, 9, 30)))
+        self.assertRaises(pytaf.DecodeError, index['KJFK'].add, decode(*ISSUES[0]))
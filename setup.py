@@ -10,6 +10,7 @@ setup(name='pytaf',
       license='MIT',
       package_dir={'': 'lib'},
       packages=['pytaf'],
+      extras_require={'numpy': ['numpy']},
       zip_safe=True,
       classifiers = [
                         "Development Status :: 5 - Production/Stable",